@@ -1,49 +1,404 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
 import joblib
 import numpy as np
-import pandas as pd
-from feature_engineering import process_text_features
+from artifact_bundle import BUNDLE_PATH, MANIFEST, load_bundle
+from config import (
+    get_max_batch_size, get_prediction_cache_size, get_prediction_cache_ttl,
+    get_micro_batch_max_size, get_micro_batch_window_ms,
+    get_predictor_backend, get_numpy_predictor_max_rows, get_warmup_enabled,
+    get_embedding_store_dir, get_embedding_n_probe, get_metrics_dir
+)
+from embedding_store import EmbeddingStore, comparable_price
+from feature_pipeline import PIPELINE_PATH, FeaturePipeline
+from metrics import CONTENT_TYPE, RequestMetrics
+from micro_batcher import MicroBatcher
+from prediction_cache import PredictionCache, artifact_fingerprint
+from tree_predictor import make_predictor
+
+# Start of this process's boot; serve.py resets it in each forked worker
+BOOT_STARTED = time.perf_counter()
+readiness = {"ready": False, "startup_ms": None, "warmup_ms": None, "warmup_error": None}
+
+# A few representative descriptions, scored once before a worker reports ready
+WARMUP_TEXTS = [
+    "Pack of 12 Apple iPhones 16GB with A15 Bionic chip",
+    "Item Name: McCormick Ground Cinnamon, 2.37 oz (Case of 6)",
+    "Twinings Earl Grey tea, Count: 100 bags",
+]
+
+def process_memory_mb():
+    """RSS and PSS (RSS with shared pages split across sharers) in MB, where /proc allows."""
+    usage = {}
+    for path, fields in (('/proc/self/status', {'VmRSS:': 'rss_mb'}),
+                         ('/proc/self/smaps_rollup', {'Pss:': 'pss_mb', 'Shared_Clean:': 'shared_mb'})):
+        try:
+            with open(path) as f:
+                for line in f:
+                    parts = line.split()
+                    if parts and parts[0] in fields:
+                        usage[fields[parts[0]]] = round(int(parts[1]) / 1024, 1)
+        except OSError:
+            pass
+    return usage
+
+def warm_up():
+    if get_warmup_enabled():
+        start = time.perf_counter()
+        try:
+            # score_texts reports per-item failures as Exception values
+            failed = [p for p in score_texts(WARMUP_TEXTS) if isinstance(p, Exception)]
+            if failed:
+                raise failed[0]
+            readiness["warmup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        except Exception as e:
+            # Serve anyway (warm-up only saves the first requests some latency),
+            # but show why in /readyz instead of staying unready forever
+            readiness["warmup_error"] = f"{type(e).__name__}: {e}"
+            print(f"Worker {os.getpid()} failed to warm up: {e}")
+    readiness["startup_ms"] = round((time.perf_counter() - BOOT_STARTED) * 1000, 1)
+    readiness["ready"] = True
+    print(f"Worker {os.getpid()} ready in {readiness['startup_ms']} ms "
+          f"(warm-up {readiness['warmup_ms']} ms), memory {process_memory_mb()}")
+
+async def publish_metrics():
+    # Keeps this worker's share of the summed /metrics fresh between scrapes
+    while True:
+        await asyncio.sleep(METRICS_PUBLISH_SECONDS)
+        metrics.publish(metrics_histograms())
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm up in the background so /healthz answers while the worker gets ready
+    asyncio.get_running_loop().run_in_executor(None, warm_up)
+    publisher = asyncio.create_task(publish_metrics()) if metrics.shared_dir else None
+    yield
+    if publisher is not None:
+        publisher.cancel()
+        metrics.publish(metrics_histograms())
 
 # 1. Initialize the App
-app = FastAPI(title="Smart Pricing API")
+app = FastAPI(title="Smart Pricing API", lifespan=lifespan)
 
-# 2. Load the Artifacts (Model & Vectorizer)
+# 2. Load the Artifacts (Model, Vectorizer & Feature Pipeline)
 # We load these once when the app starts so it's fast
-print("Loading model artifacts...")
-model = joblib.load('model.pkl')
-vectorizer = joblib.load('vectorizer.pkl')
+MODEL_PATH = 'model.pkl'
+VECTORIZER_PATH = 'vectorizer.pkl'
+_artifact_lock = threading.Lock()
+
+def artifact_paths(bundle_dir=None):
+    # The memory-mapped bundle (written by train.py) is preferred over the pickles.
+    # BUNDLE_PATH is a symlink to the current version, resolved once per load so
+    # the fingerprint and the files read belong to the same version.
+    bundle_dir = bundle_dir or os.path.realpath(BUNDLE_PATH)
+    if os.path.isdir(bundle_dir):
+        return [os.path.join(bundle_dir, MANIFEST)]
+    # feature_pipeline.pkl is optional, but a retrain rewrites it with the others
+    paths = [MODEL_PATH, VECTORIZER_PATH]
+    return paths + [PIPELINE_PATH] if os.path.exists(PIPELINE_PATH) else paths
+
+def load_artifacts():
+    global model, vectorizer, feature_pipeline, artifact_version
+    print("Loading model artifacts...")
+    bundle_dir = os.path.realpath(BUNDLE_PATH)
+    version = artifact_fingerprint(artifact_paths(bundle_dir))
+    if os.path.isdir(bundle_dir):
+        bundle = load_bundle(bundle_dir, get_predictor_backend(), get_numpy_predictor_max_rows())
+        model, vectorizer, feature_pipeline = bundle.model, bundle.pipeline.vectorizer, bundle.pipeline
+        artifact_version = version
+        return
+    # The native model can be swapped for the array-backed tree evaluator
+    new_model = make_predictor(joblib.load(MODEL_PATH), get_predictor_backend(),
+                               get_numpy_predictor_max_rows())
+    new_vectorizer = joblib.load(VECTORIZER_PATH)
+    # Saved by train.py; artifacts from older training runs get one built here
+    if os.path.exists(PIPELINE_PATH):
+        new_pipeline = FeaturePipeline.load(PIPELINE_PATH, new_vectorizer)
+    else:
+        new_pipeline = FeaturePipeline(new_vectorizer)
+    model, vectorizer, feature_pipeline, artifact_version = new_model, new_vectorizer, new_pipeline, version
+
+def refresh_artifacts():
+    """Reload the artifacts (and drop cached prices) if they changed on disk."""
+    if artifact_fingerprint(artifact_paths()) == artifact_version:
+        return
+    with _artifact_lock:
+        if artifact_fingerprint(artifact_paths()) != artifact_version:
+            load_artifacts()
+            prediction_cache.clear()
+
+load_artifacts()
+
+# Optional: built by `python embedding_store.py build`; /similar answers 503 without it
+embedding_store = (EmbeddingStore(get_embedding_store_dir(), get_embedding_n_probe())
+                   if os.path.isdir(get_embedding_store_dir()) else None)
+
+MAX_BATCH_SIZE = get_max_batch_size()
+# Under serve.py --workers N, /metrics sums every worker's published snapshot
+metrics = RequestMetrics(shared_dir=get_metrics_dir())
+METRICS_PUBLISH_SECONDS = 1.0
+prediction_cache = PredictionCache(max_size=get_prediction_cache_size(),
+                                   ttl_seconds=get_prediction_cache_ttl())
 
 # 3. Define the Input Format
 class ProductInput(BaseModel):
     catalog_content: str
 
+class BatchProductInput(BaseModel):
+    catalog_contents: List[Optional[str]]
+
+class SimilarInput(BaseModel):
+    # Either a stored item, or one raw embedding per store source (text, image)
+    sample_id: Optional[int] = None
+    embeddings: Optional[List[List[float]]] = None
+    k: int = Field(10, ge=1, le=100)
+
+def timed_body(model_cls):
+    """Dependency that validates the JSON body as model_cls and times it as the 'parse' stage."""
+    async def parse(request: Request):
+        body = await request.body()
+        start = time.perf_counter()
+        try:
+            return model_cls.model_validate_json(body)
+        except ValidationError as e:
+            metrics.error("RequestValidationError")
+            # Same 422 body FastAPI gives for a declared body parameter
+            raise RequestValidationError([{**err, "loc": ("body", *err["loc"])}
+                                          for err in e.errors(include_url=False)])
+        finally:
+            metrics.observe("parse", time.perf_counter() - start)
+    return parse
+
+def request_body_schema(model_cls):
+    # The body is read by timed_body, so describe it for the OpenAPI docs explicitly
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": model_cls.model_json_schema()}}}}
+
+def timed_response(content):
+    """Serialize content to a JSON response, timed as the 'serialization' stage."""
+    start = time.perf_counter()
+    response = JSONResponse(content)
+    metrics.observe("serialization", time.perf_counter() - start)
+    return response
+
+# Shared scoring helper: one feature/TF-IDF/predict pass over the whole list
+def predict_prices(texts):
+    # A. Regex features and TF-IDF (transform only, do not fit!), joined into one
+    # sparse matrix with the build_features layout, without pandas per request
+    t0 = time.perf_counter()
+    features_parsed = feature_pipeline.parse(texts)
+    t1 = time.perf_counter()
+    features_tfidf = feature_pipeline.vectorize(texts)
+    t2 = time.perf_counter()
+    features_final = feature_pipeline.assemble(features_parsed, features_tfidf)
+    t3 = time.perf_counter()
+
+    # B. Predict
+    log_price = model.predict(features_final)
+    t4 = time.perf_counter()
+    metrics.observe_stages((("process_text_features", t1 - t0), ("vectorizer_transform", t2 - t1),
+                            ("assembly", t3 - t2), ("model_predict", t4 - t3)))
+    return np.expm1(log_price) # Reverse the log transformation
+
+def score_texts(texts):
+    """
+    Price a list of texts in one pass; returns a list aligned with texts
+    holding a float price or the Exception that item raised.
+    """
+    try:
+        return [float(p) for p in predict_prices(texts)]
+    except Exception:
+        # Something in the batch broke the vectorized pass, so score the
+        # items one at a time to pin the error on the offending rows
+        prices = []
+        for text in texts:
+            try:
+                prices.append(float(predict_prices([text])[0]))
+            except Exception as e:
+                prices.append(e)
+        return prices
+
+# Concurrent /predict calls are coalesced into score_texts batches
+batcher = MicroBatcher(score_texts, max_batch_size=get_micro_batch_max_size(),
+                       max_wait_ms=get_micro_batch_window_ms())
+
 # 4. Define the Prediction Endpoint
-@app.post("/predict")
-def predict_price(item: ProductInput):
+@app.post("/predict", openapi_extra=request_body_schema(ProductInput))
+async def predict_price(item: ProductInput = Depends(timed_body(ProductInput))):
+    metrics.request_started("/predict")
+    try:
+        # The stat calls are cheap; a reload is not, so it runs off the event loop
+        if artifact_fingerprint(artifact_paths()) != artifact_version:
+            await run_in_threadpool(refresh_artifacts)
+        version = artifact_version
+        price = prediction_cache.get(item.catalog_content, version)
+        cached = price is not None
+        if not cached:
+            price = await batcher.submit(item.catalog_content)
+            if not np.isfinite(price):
+                metrics.error("NonFinitePrediction")
+                raise HTTPException(status_code=500, detail="Model returned a non-finite price")
+            # A reload while the batch was scored means the price may come from
+            # the new model, so it is not cached under the old version
+            if artifact_version == version:
+                prediction_cache.put(item.catalog_content, version, price)
+
+        return timed_response({
+            "predicted_price": round(price, 2),
+            "currency": "USD",
+            "status": "success",
+            "cached": cached
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        metrics.error(type(e).__name__)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        metrics.request_finished()
+
+# 5. Define the Batch Prediction Endpoint
+@app.post("/predict_batch", openapi_extra=request_body_schema(BatchProductInput))
+def predict_price_batch(batch: BatchProductInput = Depends(timed_body(BatchProductInput))):
+    metrics.request_started("/predict_batch")
     try:
-        # A. Create a Series for processing
-        input_series = pd.Series([item.catalog_content])
+        return score_batch(batch.catalog_contents)
+    finally:
+        metrics.request_finished()
+
+def score_batch(texts):
+    if len(texts) > MAX_BATCH_SIZE:
+        metrics.error("BatchTooLarge")
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(texts)} items exceeds the limit of {MAX_BATCH_SIZE}"
+        )
 
-        # B. Generate Regex Features (using your helper file)
-        features_parsed = process_text_features(input_series)
+    refresh_artifacts()
+    version = artifact_version
+    results = [None] * len(texts)
+    valid_indices = []
+    for i, text in enumerate(texts):
+        if text is None:
+            metrics.error("MissingCatalogContent")
+            results[i] = {"index": i, "predicted_price": None, "status": "error",
+                          "error": "catalog_content is missing"}
+            continue
+        price = prediction_cache.get(text, version)
+        if price is not None:
+            results[i] = {"index": i, "predicted_price": round(price, 2),
+                          "status": "success", "cached": True}
+        else:
+            valid_indices.append(i)
 
-        # C. Generate TF-IDF Features (transform only, do not fit!)
-        features_tfidf = vectorizer.transform(input_series)
+    if valid_indices:
+        prices = score_texts([texts[i] for i in valid_indices])
+        # Not cached if the artifacts were reloaded meanwhile (see predict_price)
+        cacheable = artifact_version == version
 
-        # D. Combine
-        features_final = np.hstack([features_parsed.values, features_tfidf.toarray()])
+        for i, price in zip(valid_indices, prices):
+            if isinstance(price, Exception):
+                metrics.error(type(price).__name__)
+                results[i] = {"index": i, "predicted_price": None, "status": "error",
+                              "error": str(price)}
+            elif not np.isfinite(price):
+                metrics.error("NonFinitePrediction")
+                results[i] = {"index": i, "predicted_price": None, "status": "error",
+                              "error": "Model returned a non-finite price"}
+            else:
+                if cacheable:
+                    prediction_cache.put(texts[i], version, price)
+                results[i] = {"index": i, "predicted_price": round(price, 2),
+                              "status": "success", "cached": False}
 
-        # E. Predict
-        log_price = model.predict(features_final)
-        price = np.expm1(log_price)[0] # Reverse the log transformation
+    return timed_response({
+        "predictions": results,
+        "count": len(results),
+        "currency": "USD"
+    })
 
+# 6. Cache Counters
+@app.get("/cache_stats")
+def cache_stats():
+    return {**prediction_cache.stats(), "artifact_version": artifact_version}
+
+# 7. Micro-Batching Metrics
+@app.get("/batcher_stats")
+def batcher_stats():
+    return batcher.stats()
+
+# 8. Liveness and Readiness
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok", "pid": os.getpid()}
+
+@app.get("/readyz")
+def readyz():
+    body = {"pid": os.getpid(), **readiness, "artifact_version": artifact_version}
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming_up", **body})
+    return {"status": "ready", **body, **process_memory_mb()}
+
+# 9. Prometheus Metrics
+def metrics_histograms():
+    return (
+        ("pricing_micro_batch_size", "Requests coalesced per /predict scoring call.",
+         batcher.batch_sizes, 1.0),
+        ("pricing_micro_batch_queue_wait_seconds", "Time /predict requests wait for their batch.",
+         batcher.queue_wait_ms, 0.001),
+    )
+
+@app.get("/metrics")
+def prometheus_metrics():
+    body = metrics.render(artifact_version, {"backend": get_predictor_backend()},
+                          extra_histograms=metrics_histograms())
+    return Response(body, media_type=CONTENT_TYPE)
+
+# 10. Comparable Products
+@app.post("/similar")
+def similar_products(query: SimilarInput):
+    if embedding_store is None:
+        raise HTTPException(status_code=503, detail="No embedding store is loaded")
+    if (query.sample_id is None) == (query.embeddings is None):
+        raise HTTPException(status_code=422, detail="Give exactly one of sample_id or embeddings")
+    metrics.request_started("/similar")
+    try:
+        exclude = None
+        if query.sample_id is not None:
+            try:
+                exclude = embedding_store.position(query.sample_id)
+            except KeyError:
+                raise HTTPException(status_code=404, detail=f"sample_id {query.sample_id} is not in the store")
+            vector = embedding_store.vector(exclude)
+        else:
+            try:
+                vector = embedding_store.query_vector(query.embeddings)
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+
+        start = time.perf_counter()
+        neighbours = embedding_store.neighbours(vector, query.k, exclude=exclude)
+        search_ms = (time.perf_counter() - start) * 1000
+        price = comparable_price([n["price"] for n in neighbours], [n["similarity"] for n in neighbours])
         return {
-            "predicted_price": round(float(price), 2),
+            "neighbours": neighbours,
+            "count": len(neighbours),
+            "comparable_price": None if price is None else round(price, 2),
             "currency": "USD",
-            "status": "success"
+            "search_ms": round(search_ms, 3)
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        metrics.request_finished()
 
-# To run this: uvicorn app:app --reload
\ No newline at end of file
+# To run this: uvicorn app:app --reload
+# Multi-worker with shared artifacts: python serve.py --workers 4
@@ -0,0 +1,272 @@
+"""
+Memory-mappable model artifact bundle.
+A directory replacing model.pkl/vectorizer.pkl for serving: the TF-IDF
+vocabulary as a sorted term array plus column ids, idf_ and the stop words
+as .npy files, the LightGBM model as text (one file per fold model) and as
+flat tree arrays, and a manifest.json with the format, library versions, the
+feature schema and a SHA-256 checksum per file. Arrays are opened with
+np.load(mmap_mode='r'), so worker processes share their pages through the
+OS page cache and nothing is unpickled.
+
+Each write goes to a new versioned directory next to the bundle path
+(.model_bundle-v<ns>), and the bundle path is a symlink repointed with one
+atomic rename, so a reader never finds it missing or half-written. The
+previous version is kept for readers that resolved the old link just before
+a swap; older ones are removed.
+
+Usage:
+    python artifact_bundle.py export model.pkl vectorizer.pkl model_bundle
+    python artifact_bundle.py verify model_bundle
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from typing import NamedTuple
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import sklearn
+
+from fast_tfidf import VocabularyTfidf, vectorizer_settings
+from feature_pipeline import SCHEMA_VERSION, FeaturePipeline, parsed_columns
+from tree_predictor import ARRAY_FIELDS, HybridPredictor, NumpyTreeEnsemble
+
+# Bump when the bundle layout changes
+BUNDLE_FORMAT = 1
+BUNDLE_PATH = 'model_bundle'
+MANIFEST = 'manifest.json'
+# Versioned bundle directories kept on disk, including the current one
+KEEP_VERSIONS = 2
+
+
+class Bundle(NamedTuple):
+    model: object
+    pipeline: FeaturePipeline
+    manifest: dict
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _publish(tmp: str, path: str) -> None:
+    """Make the finished bundle in tmp the one at path."""
+    parent, name = os.path.split(os.path.abspath(path))
+    version = os.path.join(parent, f'.{name}-v{time.time_ns()}')
+    os.rename(tmp, version)
+    link = version + '.link'
+    try:
+        os.symlink(os.path.basename(version), link)
+    except (OSError, NotImplementedError):
+        link = None  # no symlinks here (e.g. unprivileged Windows): swap the directory instead
+    if os.path.isdir(path) and not os.path.islink(path):
+        # A plain directory (e.g. written before bundles were versioned) cannot be
+        # replaced by a rename, so it is moved aside first; this is the only gap
+        old = tempfile.mkdtemp(dir=parent, prefix='.bundle-old-')
+        os.replace(path, os.path.join(old, 'bundle'))
+        shutil.rmtree(old, ignore_errors=True)
+    if link is None:
+        os.replace(version, path)
+        return
+    os.replace(link, path)
+    prefix = f'.{name}-v'
+    versions = sorted((entry for entry in os.listdir(parent)
+                       if entry.startswith(prefix) and entry[len(prefix):].isdigit()),
+                      key=lambda entry: int(entry[len(prefix):]))
+    for entry in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def _boosters(model) -> list:
+    if hasattr(model, 'boosters'):  # cross_validation.FoldEnsemble
+        return list(model.boosters)
+    return [getattr(model, 'booster_', model)]
+
+
+def write_bundle(model, vectorizer, path: str = BUNDLE_PATH) -> dict:
+    """
+    Write model and vectorizer as a new bundle version and atomically make it the one at path.
+
+    Args:
+        model: LGBMRegressor, Booster or FoldEnsemble
+        vectorizer: The fitted TfidfVectorizer
+        path: Bundle directory
+
+    Returns:
+        dict: The manifest
+
+    Raises:
+        ValueError: If the vectorizer uses custom callables that cannot be stored
+    """
+    settings = vectorizer_settings(vectorizer)
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp = tempfile.mkdtemp(dir=parent, prefix='.bundle-')
+    try:
+        def save(name, array):
+            np.save(os.path.join(tmp, name), np.ascontiguousarray(array), allow_pickle=False)
+
+        # 1. Vocabulary (terms sorted, so lookups could also bisect the mmapped array) and weights
+        terms = sorted(vectorizer.vocabulary_)
+        save('vocab_terms.npy', np.array(terms, dtype=str))
+        save('vocab_ids.npy', np.array([vectorizer.vocabulary_[t] for t in terms], dtype=np.int32))
+        if settings['use_idf']:
+            save('idf.npy', np.asarray(vectorizer.idf_, dtype=np.float64))
+        stop_words = settings.pop('stop_words')
+        save('stop_words.npy', np.array(stop_words, dtype=str))
+
+        # 2. Model: native text for LightGBM and flat tables for the numpy evaluator
+        model_files = []
+        for i, booster in enumerate(_boosters(model)):
+            name = f'model_{i}.txt'
+            booster.save_model(os.path.join(tmp, name))
+            model_files.append(name)
+        ensemble = NumpyTreeEnsemble.from_model(model)
+        arrays = ensemble.to_arrays()
+        for field in ARRAY_FIELDS:
+            save(f'trees_{field}.npy', arrays[field])
+
+        # 3. Manifest with checksums, written last
+        manifest = {
+            'format': BUNDLE_FORMAT,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'versions': {'python': platform.python_version(), 'numpy': np.__version__,
+                         'lightgbm': lgb.__version__, 'scikit-learn': sklearn.__version__},
+            'feature_schema': {'version': SCHEMA_VERSION, 'columns': parsed_columns()},
+            'vectorizer': settings,
+            'model': {'files': model_files, 'n_features': ensemble.n_features_in_,
+                      'max_depth': ensemble.max_depth, 'average_output': ensemble.average_output},
+            'files': {name: {'sha256': _sha256(os.path.join(tmp, name)),
+                             'bytes': os.path.getsize(os.path.join(tmp, name))}
+                      for name in sorted(os.listdir(tmp))},
+        }
+        with open(os.path.join(tmp, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # 4. Publish it by repointing the bundle symlink
+        _publish(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return manifest
+
+
+def read_manifest(path: str = BUNDLE_PATH) -> dict:
+    with open(os.path.join(path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def verify_bundle(path: str = BUNDLE_PATH) -> list:
+    """
+    Check every file against the manifest checksums (reads all files).
+
+    Returns:
+        list: Names of missing or corrupt files (empty when the bundle is intact)
+    """
+    manifest = read_manifest(path)
+    bad = []
+    for name, expected in manifest['files'].items():
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path) or _sha256(file_path) != expected['sha256']:
+            bad.append(name)
+    return bad
+
+
+def load_bundle(path: str = BUNDLE_PATH, backend: str = 'lightgbm', max_numpy_rows: int = 4,
+                verify: bool = False) -> Bundle:
+    """
+    Open a bundle for serving.
+
+    Args:
+        path: Bundle directory
+        backend: 'lightgbm' (native Booster from the model text), 'numpy' (mmapped tree arrays) or 'auto'
+        max_numpy_rows: Largest batch 'auto' sends to the numpy evaluator
+        verify: Check SHA-256 checksums first (reads every file); sizes are always checked
+
+    Returns:
+        Bundle: Predictor, feature pipeline and manifest
+
+    Raises:
+        ValueError: On an unknown format or backend, a schema mismatch or a damaged file
+    """
+    manifest = read_manifest(path)
+    if manifest['format'] != BUNDLE_FORMAT:
+        raise ValueError(f"{path} has bundle format {manifest['format']}, expected {BUNDLE_FORMAT}")
+    schema = manifest['feature_schema']
+    if schema['version'] != SCHEMA_VERSION or schema['columns'] != parsed_columns():
+        raise ValueError(f"{path} was built for feature schema {schema['version']} with columns "
+                         f"{schema['columns']}; retrain with train.py")
+    for name, expected in manifest['files'].items():
+        if os.path.getsize(os.path.join(path, name)) != expected['bytes']:
+            raise ValueError(f"{path}/{name} does not match its manifest size")
+    if verify:
+        bad = verify_bundle(path)
+        if bad:
+            raise ValueError(f"{path} has corrupt files: {', '.join(bad)}")
+
+    def load(name):
+        return np.load(os.path.join(path, name), mmap_mode='r', allow_pickle=False)
+
+    # TF-IDF: the term dict is rebuilt from the arrays; idf stays mapped
+    settings = dict(manifest['vectorizer'], stop_words=load('stop_words.npy').tolist())
+    vocabulary = dict(zip(load('vocab_terms.npy').tolist(), load('vocab_ids.npy').tolist()))
+    idf = load('idf.npy') if settings['use_idf'] else None
+    pipeline = FeaturePipeline(VocabularyTfidf.from_settings(vocabulary, idf, settings))
+
+    info = manifest['model']
+    if backend in ('numpy', 'auto'):
+        ensemble = NumpyTreeEnsemble(**{field: load(f'trees_{field}.npy') for field in ARRAY_FIELDS},
+                                     n_features=info['n_features'], max_depth=info['max_depth'],
+                                     average_output=info['average_output'])
+    if backend in ('lightgbm', 'auto'):
+        boosters = [lgb.Booster(model_file=os.path.join(path, name)) for name in info['files']]
+        if len(boosters) == 1:
+            native = boosters[0]
+        else:
+            from cross_validation import FoldEnsemble
+            native = FoldEnsemble(boosters)
+
+    if backend == 'lightgbm':
+        model = native
+    elif backend == 'numpy':
+        model = ensemble
+    elif backend == 'auto':
+        model = HybridPredictor(native, ensemble, max_numpy_rows)
+    else:
+        raise ValueError(f"Unknown predictor backend: {backend}")
+    return Bundle(model, pipeline, manifest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or verify a model artifact bundle")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help="Convert model.pkl and vectorizer.pkl into a bundle")
+    export.add_argument('model', nargs='?', default='model.pkl')
+    export.add_argument('vectorizer', nargs='?', default='vectorizer.pkl')
+    export.add_argument('output', nargs='?', default=BUNDLE_PATH)
+    verify = sub.add_parser('verify', help="Check a bundle's files against its manifest checksums")
+    verify.add_argument('path', nargs='?', default=BUNDLE_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        manifest = write_bundle(joblib.load(args.model), joblib.load(args.vectorizer), args.output)
+        size = sum(f['bytes'] for f in manifest['files'].values())
+        print(f"✅ Wrote '{args.output}' ({len(manifest['files'])} files, {size / 1e6:.1f} MB)")
+    else:
+        bad = verify_bundle(args.path)
+        if bad:
+            raise SystemExit(f"❌ Corrupt or missing: {', '.join(bad)}")
+        print(f"✅ '{args.path}' matches its manifest")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Performance benchmarks for feature extraction and inference.
+Generates a synthetic catalog in the shape of the real catalog_content
+(item name with brands, "Pack of N"/count phrases, bulk keywords, bullet
+points, value and unit) and times each stage of the prediction path, plus
+the /predict and /predict_batch endpoints through FastAPI's TestClient, at
+several batch sizes. Results are written as JSON and compared against a
+stored baseline; the run fails when any benchmark's median (or another
+chosen statistic) slows down by more than the allowed fraction.
+
+Timings depend on the machine, so refresh the baseline (--update-baseline)
+when the reference hardware changes.
+
+Usage:
+    python benchmark.py --output benchmark_results.json
+    python benchmark.py --update-baseline
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import joblib
+import pandas as pd
+
+from fast_tfidf import VocabularyTfidf
+from feature_engineering import KNOWN_BRANDS, assemble_features, process_text_features
+from feature_pipeline import FeaturePipeline
+
+BASELINE_PATH = 'benchmark_baseline.json'
+DEFAULT_BATCH_SIZES = (1, 32, 256)
+# A benchmark regresses when its median exceeds baseline * (1 + MAX_REGRESSION)...
+MAX_REGRESSION = 0.25
+# ...and the difference is above timer noise
+MIN_REGRESSION_MS = 0.05
+
+PRODUCTS = ['Ground Cinnamon', 'Earl Grey Tea', 'Vanilla Syrup', 'Chicken Noodle Soup',
+            'Whole Bean Coffee', 'Wireless Headphones', 'Running Shoes', 'Building Set',
+            'Olive Oil', 'Baking Mix', 'Sea Salt', 'Protein Bars', 'Paper Towels',
+            'Hot Sauce', 'Almond Butter', 'Smart TV', 'Vinyl Figure', 'Dish Soap']
+ADJECTIVES = ['Organic', 'Premium', 'Classic', 'Original', 'Natural', 'Gluten Free',
+              'Low Sodium', 'Family Size', 'Sugar Free', 'Extra Large', 'Unsweetened']
+GENERIC_BRANDS = ['Acme', 'Northwind', 'Blue Ridge', 'Golden Valley', 'Pure Harvest', 'Summit']
+BULK_PHRASES = ['Bulk Pack', 'Case of 24', 'Value Pack', '6 Bottles', '100 Servings',
+                'Party Supply Kit', 'Bucket', 'Pallet']
+UNITS = ['Ounce', 'Fl Oz', 'Count', 'Pound', 'Gram']
+BULLETS = ['Made with high quality ingredients', 'Perfect for everyday use',
+           'Resealable package keeps it fresh', 'Great for gifting and entertaining',
+           'No artificial colors or flavors', 'Satisfaction guaranteed',
+           'Ideal for restaurants, offices and home kitchens', 'Packed in a facility that also processes nuts']
+
+
+def synthetic_catalog(n: int, seed: int = 0) -> List[str]:
+    """
+    Realistic catalog_content strings.
+
+    Args:
+        n: Number of descriptions
+        seed: RNG seed (same seed, same catalog)
+
+    Returns:
+        List[str]: Descriptions mixing known and unknown brands, pack sizes, bulk keywords and bullets
+    """
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        brand = rng.choice(KNOWN_BRANDS).title() if rng.random() < 0.6 else rng.choice(GENERIC_BRANDS)
+        name = f"{brand} {rng.choice(ADJECTIVES)} {rng.choice(PRODUCTS)}"
+        if rng.random() < 0.4:
+            name += f", {rng.randint(1, 32)} oz"
+        if rng.random() < 0.5:
+            name += f" (Pack of {rng.choice([2, 3, 4, 6, 12, 24])})"
+        if rng.random() < 0.25:
+            name += f" - {rng.choice(BULK_PHRASES)}"
+        lines = [f"Item Name: {name}"]
+        lines += [f"Bullet Point {i + 1}: {bullet}"
+                  for i, bullet in enumerate(rng.sample(BULLETS, rng.randint(0, 5)))]
+        if rng.random() < 0.3:
+            lines.append(f"Count: {rng.randint(1, 200)}")
+        lines.append(f"Value: {round(rng.uniform(0.5, 64), 1)}")
+        lines.append(f"Unit: {rng.choice(UNITS)}")
+        texts.append("\n".join(lines))
+    return texts
+
+
+def time_call(fn: Callable, repeats: int) -> Dict[str, float]:
+    """Median, p95 and best wall time of fn() in milliseconds, after one warm-up call."""
+    fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    return {'median_ms': statistics.median(samples),
+            'p95_ms': samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+            'best_ms': samples[0]}
+
+
+def run_benchmarks(batch_sizes=DEFAULT_BATCH_SIZES, repeats: int = 20, seed: int = 0,
+                   model_path: str = 'model.pkl', vectorizer_path: str = 'vectorizer.pkl',
+                   endpoints: bool = True) -> dict:
+    """
+    Time the inference stages and endpoints.
+
+    Args:
+        batch_sizes: Rows per timed call
+        repeats: Timed calls per benchmark
+        seed: Synthetic catalog seed
+        model_path: Saved model
+        vectorizer_path: Saved TF-IDF vectorizer
+        endpoints: Also time /predict and /predict_batch through TestClient
+
+    Returns:
+        dict: {'meta': {...}, 'results': {'<stage>[<batch size>]': {'median_ms', 'p95_ms', 'best_ms', ...}}}
+    """
+    model = joblib.load(model_path)
+    vectorizer = joblib.load(vectorizer_path)
+    pipeline = FeaturePipeline(vectorizer)
+    fast_tfidf = VocabularyTfidf.from_vectorizer(vectorizer)
+    results = {}
+
+    def record(name, batch_size, fn):
+        results[f'{name}[{batch_size}]'] = {'stage': name, 'batch_size': batch_size,
+                                            **time_call(fn, repeats)}
+
+    for n in batch_sizes:
+        texts = synthetic_catalog(n, seed)
+        series = pd.Series(texts)
+        tfidf = vectorizer.transform(series)
+        parsed = process_text_features(series)
+        X = assemble_features(parsed, tfidf)
+        record('process_text_features', n, lambda: process_text_features(series))
+        record('vectorizer_transform', n, lambda: vectorizer.transform(series))
+        record('vocabulary_tfidf_transform', n, lambda: fast_tfidf.transform(texts))
+        # What app.py runs for the parsed and TF-IDF features together
+        record('feature_pipeline_transform', n, lambda: pipeline.transform(texts))
+        record('model_predict', n, lambda: model.predict(X))
+
+    if endpoints:
+        from fastapi.testclient import TestClient
+
+        import app as api
+        from prediction_cache import PredictionCache
+
+        # Price every request for real: no cached answers
+        cache, api.prediction_cache = api.prediction_cache, PredictionCache(max_size=0)
+        try:
+            with TestClient(api.app) as client:
+                single = synthetic_catalog(1, seed)[0]
+                record('endpoint_predict', 1,
+                       lambda: client.post('/predict', json={'catalog_content': single}).raise_for_status())
+                for n in batch_sizes:
+                    payload = {'catalog_contents': synthetic_catalog(n, seed)}
+                    record('endpoint_predict_batch', n,
+                           lambda: client.post('/predict_batch', json=payload).raise_for_status())
+        finally:
+            api.prediction_cache = cache
+
+    meta = {'python': platform.python_version(), 'machine': platform.machine(),
+            'processor': platform.processor(), 'repeats': repeats, 'batch_sizes': list(batch_sizes),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    return {'meta': meta, 'results': results}
+
+
+def compare(results: dict, baseline: dict, max_regression: float = MAX_REGRESSION,
+            min_regression_ms: float = MIN_REGRESSION_MS, metric: str = 'median_ms') -> List[dict]:
+    """
+    Find benchmarks slower than the baseline.
+
+    Args:
+        results: Output of run_benchmarks
+        baseline: A previous run_benchmarks output
+        max_regression: Allowed relative slowdown (0.25 = 25%)
+        min_regression_ms: Slowdowns smaller than this are treated as noise
+        metric: Timing compared ('median_ms', 'p95_ms' or 'best_ms')
+
+    Returns:
+        List[dict]: One entry per regressed benchmark (name, baseline_ms, current_ms, ratio)
+    """
+    regressions = []
+    for name, current in results['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        before, after = reference[metric], current[metric]
+        if after > before * (1 + max_regression) and after - before > min_regression_ms:
+            regressions.append({'name': name, 'baseline_ms': before, 'current_ms': after,
+                                'ratio': after / before if before else float('inf')})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark feature extraction and inference")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Write this run as the new baseline instead of comparing")
+    parser.add_argument('--max-regression', type=float, default=MAX_REGRESSION)
+    parser.add_argument('--metric', choices=['median_ms', 'p95_ms', 'best_ms'], default='median_ms')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(DEFAULT_BATCH_SIZES))
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--no-endpoints', action='store_true')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.batch_sizes, args.repeats, endpoints=not args.no_endpoints)
+    print(f"{'benchmark':<32} {'median ms':>10} {'p95 ms':>10}")
+    for name, r in report['results'].items():
+        print(f"{name:<32} {r['median_ms']:>10.3f} {r['p95_ms']:>10.3f}")
+
+    path = args.baseline if args.update_baseline else args.output
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {path}")
+    if args.update_baseline:
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    regressions = compare(report, baseline, args.max_regression, metric=args.metric)
+    for r in regressions:
+        print(f"❌ {r['name']}: {r['baseline_ms']:.3f} ms -> {r['current_ms']:.3f} ms ({r['ratio']:.2f}x)")
+    if regressions:
+        return 1
+    print(f"✅ No benchmark slower than the baseline by more than {args.max_regression:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Row-level change tracking for incremental ETL runs.
+Each source row gets a fingerprint (a hash of sample_id, catalog_content and
+price) kept in a watermark table, so a run only transforms and loads rows
+that are new or changed and deletes rows that disappeared from the source.
+"""
+from typing import Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, inspect, text
+
+from db_loader import bulk_upsert
+
+WATERMARK_TABLE = 'etl_watermarks'
+FINGERPRINT_COLUMNS = ('sample_id', 'catalog_content', 'price')
+# The hashed bytes depend on the dtype, and read_csv infers dtypes per chunk
+# (an all-empty catalog_content chunk is float64, integral prices are int64),
+# so tracked columns are cast to these before hashing
+FINGERPRINT_DTYPES = {'sample_id': 'int64', 'catalog_content': 'string', 'price': 'float64'}
+
+# Keys per DELETE statement (stays under SQLite's oldest bind limit of 999)
+DELETE_BATCH_SIZE = 900
+
+
+def row_fingerprints(df: pd.DataFrame, columns: Iterable[str] = FINGERPRINT_COLUMNS) -> pd.Series:
+    """
+    Hash each row's tracked columns.
+
+    Uses pandas' vectorized, fixed-key row hashing on the FINGERPRINT_DTYPES
+    of the columns, so the same values give the same fingerprint on every
+    run, whatever dtypes their chunk was read with.
+
+    Args:
+        df: Source rows
+        columns: Columns whose values define a change
+
+    Returns:
+        pd.Series: int64 fingerprints aligned with df's index
+    """
+    columns = list(columns)
+    tracked = df[columns].astype({c: FINGERPRINT_DTYPES[c] for c in columns if c in FINGERPRINT_DTYPES})
+    hashes = pd.util.hash_pandas_object(tracked, index=False)
+    return pd.Series(hashes.to_numpy().view(np.int64), index=df.index)
+
+
+class ChangeTracker:
+    """
+    Compares source chunks against the fingerprints of the last load.
+
+    Load it once per run, pass every extracted chunk through changed_rows(),
+    record() the fingerprints of each chunk once it is loaded, and finally
+    delete_missing() the keys that no chunk contained.
+    """
+
+    def __init__(self, known: pd.Series, key: str = 'sample_id'):
+        self.key = key
+        self.known = known
+        self._seen = np.zeros(len(known), dtype=bool)
+
+    @classmethod
+    def load(cls, engine, key: str = 'sample_id', table_name: str = WATERMARK_TABLE) -> 'ChangeTracker':
+        """
+        Read the stored fingerprints (none if the watermark table does not exist yet).
+
+        Args:
+            engine: SQLAlchemy engine
+            key: Unique row key
+            table_name: Watermark table
+
+        Returns:
+            ChangeTracker: A tracker for one run
+        """
+        if inspect(engine).has_table(table_name):
+            stored = pd.read_sql(f"SELECT {key}, row_hash FROM {table_name}", engine)
+            known = pd.Series(stored['row_hash'].to_numpy(dtype=np.int64), index=stored[key])
+        else:
+            known = pd.Series([], dtype=np.int64)
+        return cls(known, key)
+
+    def changed_rows(self, df: pd.DataFrame, full_refresh: bool = False) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Pick the rows of a source chunk that are new or changed.
+
+        A key repeated within the chunk keeps only its last row (a single
+        upsert cannot touch the same key twice).
+
+        Args:
+            df: A source chunk
+            full_refresh: Treat every row as changed (keys are still tracked for deletes)
+
+        Returns:
+            Tuple[pd.DataFrame, pd.Series]: The changed rows and their fingerprints
+        """
+        df = df.drop_duplicates(self.key, keep='last')
+        hashes = row_fingerprints(df)
+        positions = self.known.index.get_indexer(df[self.key])
+        found = positions >= 0
+        self._seen[positions[found]] = True
+        if full_refresh:
+            return df, hashes
+
+        stored = np.zeros(len(df), dtype=np.int64)
+        stored[found] = self.known.to_numpy()[positions[found]]
+        changed = ~found | (stored != hashes.to_numpy())
+        return df[changed], hashes[changed]
+
+    def record(self, engine, df: pd.DataFrame, hashes: pd.Series, table_name: str = WATERMARK_TABLE) -> None:
+        """
+        Store the fingerprints of rows that have been loaded.
+
+        Args:
+            engine: SQLAlchemy engine
+            df: The loaded source rows
+            hashes: Their fingerprints, as returned by changed_rows()
+            table_name: Watermark table
+        """
+        watermarks = pd.DataFrame({self.key: df[self.key].to_numpy(), 'row_hash': hashes.to_numpy()})
+        bulk_upsert(watermarks, table_name, engine, key=self.key)
+
+    def missing_keys(self) -> list:
+        """Keys stored by the previous load that no chunk of this run contained."""
+        return self.known.index[~self._seen].tolist()
+
+    def delete_missing(self, engine, table_name: str, watermark_table: str = WATERMARK_TABLE) -> int:
+        """
+        Delete rows that are gone from the source, from the target and watermark tables.
+
+        Args:
+            engine: SQLAlchemy engine
+            table_name: Target table
+            watermark_table: Watermark table
+
+        Returns:
+            int: Number of keys deleted
+        """
+        keys = self.missing_keys()
+        if not keys:
+            return 0
+        with engine.begin() as conn:
+            for table in (table_name, watermark_table):
+                if not inspect(conn).has_table(table):
+                    continue
+                statement = text(f"DELETE FROM {table} WHERE {self.key} IN :keys").bindparams(
+                    bindparam('keys', expanding=True))
+                for start in range(0, len(keys), DELETE_BATCH_SIZE):
+                    conn.execute(statement, {'keys': keys[start:start + DELETE_BATCH_SIZE]})
+        return len(keys)
@@ -0,0 +1,169 @@
+"""
+Parallel K-fold cross-validation for the pricing model.
+The sparse feature matrix and target are copied into shared memory once;
+worker processes attach to them and train folds concurrently with a bounded
+number of LightGBM threads each. Each worker bins the shared matrix into one
+LightGBM Dataset and takes every fold's train and validation sets as
+.subset()s of it, so no worker copies the fold's float rows (only the
+validation rows are sliced out for the OOF predictions). Returns out-of-fold predictions, the fold
+models and SMAPE, and can bundle the folds into one averaged model for the API.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from typing import Callable, List, NamedTuple, Optional
+
+import lightgbm as lgb
+import numpy as np
+from scipy import sparse
+from sklearn.model_selection import KFold
+
+from training import DEFAULT_PARAMS, smape
+
+
+class FoldEnsemble:
+    """Averages the predictions of the fold models; pickles into model.pkl like a single model."""
+
+    def __init__(self, boosters: List[lgb.Booster]):
+        self.boosters = list(boosters)
+        self.n_features_in_ = self.boosters[0].num_feature()
+
+    def predict(self, X, **kwargs):
+        return np.mean([booster.predict(X, **kwargs) for booster in self.boosters], axis=0)
+
+
+class CVResult(NamedTuple):
+    oof: np.ndarray
+    models: List[lgb.Booster]
+    fold_scores: List[float]
+    smape: float
+
+    def ensemble(self) -> FoldEnsemble:
+        return FoldEnsemble(self.models)
+
+
+class SharedArrays:
+    """
+    Named numpy arrays copied into shared memory blocks.
+
+    The parent creates and finally unlinks the blocks; workers attach by spec.
+    """
+
+    def __init__(self, arrays: dict):
+        self._blocks = []
+        self.spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self._blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    @staticmethod
+    def attach(spec: dict):
+        """Map the blocks described by spec; returns (arrays dict, blocks to keep alive)."""
+        arrays, blocks = {}, []
+        for name, (block_name, shape, dtype) in spec.items():
+            # Pool workers share the parent's resource tracker, so attaching
+            # does not hand ownership of the block to this process
+            block = shared_memory.SharedMemory(name=block_name)
+            arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+            blocks.append(block)
+        return arrays, blocks
+
+    def close(self) -> None:
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Set in each worker by _attach_worker
+_X = None
+_y = None
+_blocks = None
+# Binned Dataset over every row, built by the worker's first fold
+_reference = None
+
+
+def _attach_worker(spec: dict, shape) -> None:
+    global _X, _y, _blocks
+    arrays, _blocks = SharedArrays.attach(spec)
+    _X = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=shape, copy=False)
+    _y = arrays['label']
+
+
+def _reference_dataset(params: dict) -> lgb.Dataset:
+    global _reference
+    if _reference is None:
+        # Binned straight from the shared CSR arrays; the raw matrix is not copied
+        _reference = lgb.Dataset(_X, label=_y, params=params).construct()
+    return _reference
+
+
+def _train_fold(fold: int, train_rows: np.ndarray, valid_rows: np.ndarray, params: dict,
+                num_boost_round: int, early_stopping_rounds: Optional[int]):
+    reference = _reference_dataset(params)
+    train = reference.subset(train_rows, params=params)
+    valid = reference.subset(valid_rows, params=params)
+    X_valid = _X[valid_rows]
+    callbacks = [lgb.early_stopping(early_stopping_rounds, verbose=False)] if early_stopping_rounds else []
+    booster = lgb.train(params, train, num_boost_round=num_boost_round, valid_sets=[valid],
+                        valid_names=['valid'], callbacks=callbacks)
+    best = booster.best_iteration or None
+    # Boosters go back to the parent as model text
+    return fold, booster.model_to_string(num_iteration=best), booster.predict(X_valid, num_iteration=best)
+
+
+def cross_validate(X, y, n_splits: int = 5, params: dict = None, num_boost_round: int = 500,
+                   early_stopping_rounds: Optional[int] = None, n_jobs: Optional[int] = None,
+                   seed: int = 42, inverse_transform: Callable = np.expm1) -> CVResult:
+    """
+    Train K folds in parallel processes over shared-memory features.
+
+    Args:
+        X: Feature matrix (sparse or dense), e.g. from assemble_features
+        y: Training target (log price)
+        n_splits: Number of folds
+        params: LightGBM parameters (merged over training.DEFAULT_PARAMS)
+        num_boost_round: Boosting rounds per fold
+        early_stopping_rounds: Stop each fold on its validation part (None: fixed rounds)
+        n_jobs: Folds trained at once (default: min(n_splits, CPU count))
+        seed: KFold shuffle seed
+        inverse_transform: Maps the target back to prices for SMAPE
+
+    Returns:
+        CVResult: OOF predictions (target scale), fold Boosters, per-fold and overall SMAPE
+    """
+    X = sparse.csr_matrix(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    cpus = os.cpu_count() or 1
+    n_jobs = max(1, min(n_splits, n_jobs or cpus))
+    # Bound threads per fold so concurrent folds share the cores instead of oversubscribing
+    params = {**DEFAULT_PARAMS, **(params or {}), 'num_threads': max(1, cpus // n_jobs)}
+    folds = list(KFold(n_splits=n_splits, shuffle=True, random_state=seed).split(np.zeros(len(y))))
+
+    oof = np.zeros(len(y))
+    models = [None] * n_splits
+    with SharedArrays({'data': X.data, 'indices': X.indices, 'indptr': X.indptr, 'label': y}) as shared, \
+            ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach_worker,
+                                initargs=(shared.spec, X.shape),
+                                # Spawned, not forked: the parent may already have started OpenMP threads
+                                mp_context=get_context('spawn')) as pool:
+        futures = [pool.submit(_train_fold, fold, train_rows, valid_rows, params,
+                               num_boost_round, early_stopping_rounds)
+                   for fold, (train_rows, valid_rows) in enumerate(folds)]
+        for future in futures:
+            fold, model_str, pred = future.result()
+            oof[folds[fold][1]] = pred
+            models[fold] = lgb.Booster(model_str=model_str)
+
+    fold_scores = [smape(inverse_transform(y[valid_rows]), inverse_transform(oof[valid_rows]))
+                   for _, valid_rows in folds]
+    return CVResult(oof, models, fold_scores, smape(inverse_transform(y), inverse_transform(oof)))
@@ -0,0 +1,189 @@
+"""
+SQL-side queries for the analytics dashboard.
+KPIs, the price histogram and the top brands are aggregated in the database
+and stored in a small summary table by the ETL, so the dashboard reads a few
+dozen rows no matter how large products_cleaned grows. The raw-data explorer
+pages through the table by sample_id with its filters applied in SQL.
+"""
+import time
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, inspect, text
+
+PRODUCTS_TABLE = 'products_cleaned'
+SUMMARY_TABLE = 'products_summary'
+PREMIUM_PRICE = 100
+HISTOGRAM_BINS = 50
+TOP_BRANDS = 10
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Explorer indexes: each filter column leads, sample_id follows so a filtered
+# page is an ordered index range scan rather than a sort
+EXPLORER_INDEXES = (('brand', 'sample_id'), ('is_bulk', 'sample_id'), 'price')
+
+
+def compute_summary(engine, table_name: str = PRODUCTS_TABLE, bins: int = HISTOGRAM_BINS,
+                    top_n: int = TOP_BRANDS) -> pd.DataFrame:
+    """
+    Aggregate the dashboard's KPIs and chart data in SQL.
+
+    Args:
+        engine: SQLAlchemy engine
+        table_name: Products table
+        bins: Number of equal-width price histogram bins
+        top_n: Number of brands to keep
+
+    Returns:
+        pd.DataFrame: Rows of (kind, label, value, bin_low, bin_high, position),
+        where kind is 'kpi', 'price_bin' or 'top_brand'
+    """
+    rows = []
+    with engine.connect() as conn:
+        kpis = conn.execute(text(
+            f"SELECT COUNT(*), COUNT(price), AVG(price), MIN(price), MAX(price), "
+            f"SUM(CASE WHEN price > :premium THEN 1 ELSE 0 END) FROM {table_name}"),
+            {'premium': PREMIUM_PRICE}).one()
+        total, priced, avg_price, min_price, max_price, premium = kpis
+        for position, (label, value) in enumerate([
+                ('total_products', total), ('avg_price', avg_price), ('min_price', min_price),
+                ('max_price', max_price), ('premium_products', premium or 0)]):
+            rows.append(('kpi', label, value, None, None, position))
+
+        if priced and min_price == max_price:
+            # Every price is the same: one zero-width bin holding all of them
+            rows.append(('price_bin', None, int(priced), float(min_price), float(max_price), 0))
+        elif priced:
+            # One scan counting rows below each inner bin edge; differences of
+            # these cumulative counts are the bin counts (portable, no FLOOR)
+            edges = np.linspace(min_price, max_price, bins + 1)
+            params = {f'e{i}': float(edge) for i, edge in enumerate(edges[1:-1])}
+            cumulative = []
+            if params:
+                below = ", ".join(f"SUM(CASE WHEN price < :{name} THEN 1 ELSE 0 END)" for name in params)
+                cumulative = [c or 0 for c in conn.execute(
+                    text(f"SELECT {below} FROM {table_name}"), params).one()]
+            counts = np.diff([0, *cumulative, priced])
+            for position, count in enumerate(counts):
+                rows.append(('price_bin', None, int(count), float(edges[position]),
+                             float(edges[position + 1]), position))
+
+        brands = conn.execute(text(
+            f"SELECT brand, COUNT(*) AS n FROM {table_name} "
+            f"GROUP BY brand ORDER BY n DESC, brand LIMIT :top_n"), {'top_n': top_n}).all()
+        for position, (brand, count) in enumerate(brands):
+            rows.append(('top_brand', str(brand), count, None, None, position))
+
+    return pd.DataFrame(rows, columns=['kind', 'label', 'value', 'bin_low', 'bin_high', 'position'])
+
+
+def refresh_summary(engine, table_name: str = PRODUCTS_TABLE,
+                    summary_table: str = SUMMARY_TABLE) -> dict:
+    """
+    Recompute the summary and replace the summary table's contents atomically.
+
+    Args:
+        engine: SQLAlchemy engine
+        table_name: Products table
+        summary_table: Summary table to (re)write
+
+    Returns:
+        dict: number of summary rows written and elapsed seconds
+    """
+    start = time.perf_counter()
+    summary = compute_summary(engine, table_name)
+    with engine.begin() as conn:
+        summary.to_sql(summary_table, conn, if_exists='replace', index=False)
+    return {'rows': len(summary), 'seconds': time.perf_counter() - start}
+
+
+def load_summary(engine, table_name: str = PRODUCTS_TABLE,
+                 summary_table: str = SUMMARY_TABLE) -> pd.DataFrame:
+    """
+    Read the precomputed summary, aggregating on the fly if the ETL has not written one yet.
+
+    Args:
+        engine: SQLAlchemy engine
+        table_name: Products table
+        summary_table: Summary table
+
+    Returns:
+        pd.DataFrame: Summary rows as returned by compute_summary
+    """
+    if inspect(engine).has_table(summary_table):
+        return pd.read_sql(f"SELECT * FROM {summary_table} ORDER BY kind, position", engine)
+    return compute_summary(engine, table_name)
+
+
+def fetch_page(engine, after_id=None, brands: Optional[Sequence[str]] = None,
+               min_price: Optional[float] = None, max_price: Optional[float] = None,
+               is_bulk: Optional[bool] = None, page_size: int = PAGE_SIZE,
+               table_name: str = PRODUCTS_TABLE) -> Tuple[pd.DataFrame, Optional[int]]:
+    """
+    Fetch one page of products in sample_id order (keyset pagination).
+
+    Args:
+        engine: SQLAlchemy engine
+        after_id: Last sample_id of the previous page (None for the first page)
+        brands: Keep only these brands
+        min_price: Lowest price to include
+        max_price: Highest price to include
+        is_bulk: Keep only bulk (True) or non-bulk (False) items
+        page_size: Rows per page, capped at MAX_PAGE_SIZE
+        table_name: Products table
+
+    Returns:
+        Tuple[pd.DataFrame, Optional[int]]: The page, and the cursor for the
+        next page (None when this is the last one)
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    conditions, params = [], {'limit': page_size + 1}
+    if after_id is not None:
+        conditions.append("sample_id > :after_id")
+        params['after_id'] = after_id
+    if brands:
+        conditions.append("brand IN :brands")
+        params['brands'] = list(brands)
+    if min_price is not None:
+        conditions.append("price >= :min_price")
+        params['min_price'] = min_price
+    if max_price is not None:
+        conditions.append("price <= :max_price")
+        params['max_price'] = max_price
+    if is_bulk is not None:
+        conditions.append("is_bulk = :is_bulk")
+        params['is_bulk'] = int(is_bulk)
+
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    query = text(f"SELECT * FROM {table_name} {where}ORDER BY sample_id LIMIT :limit")
+    if brands:
+        query = query.bindparams(bindparam('brands', expanding=True))
+    with engine.connect() as conn:
+        page = pd.read_sql(query, conn, params=params)
+
+    # One extra row tells us whether another page exists
+    if len(page) > page_size:
+        page = page.iloc[:page_size]
+        return page, page['sample_id'].iloc[-1].item()
+    return page, None
+
+
+def list_brands(engine, limit: int = 500, table_name: str = PRODUCTS_TABLE) -> list:
+    """
+    List distinct brands for the explorer's filter (served by the brand index).
+
+    Args:
+        engine: SQLAlchemy engine
+        limit: Maximum number of brands returned
+        table_name: Products table
+
+    Returns:
+        list: Brand names in alphabetical order
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            f"SELECT DISTINCT brand FROM {table_name} WHERE brand IS NOT NULL "
+            f"ORDER BY brand LIMIT :limit"), {'limit': limit}).all()
+    return [str(brand) for (brand,) in rows]
@@ -0,0 +1,128 @@
+"""
+Bulk loading helpers for the ETL pipeline.
+Streams a DataFrame into a table in chunks and merges it on a key column:
+PostgreSQL goes through COPY FROM STDIN, other databases (SQLite in tests
+and local runs) through chunked multi-row INSERTs. Indexes are built after
+the first load instead of being maintained row by row.
+"""
+import csv
+import io
+import time
+from typing import Iterable
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+# Bind-parameter ceiling per statement for the multi-row INSERT fallback
+# (SQLite >= 3.32 allows 32766; PostgreSQL allows 65535)
+MAX_BIND_PARAMS = 32766
+
+
+def _csv_payload(chunk: pd.DataFrame) -> str:
+    """
+    CSV text for COPY ... (FORMAT csv).
+
+    In that format only an unquoted empty field is NULL (a quoted "" is an
+    empty string, and fails to load into numeric columns), so NaN and None
+    are written as bare empty fields. Empty strings come out the same way
+    and load as NULL too.
+    """
+    return chunk.to_csv(header=False, index=False, quoting=csv.QUOTE_MINIMAL, na_rep='')
+
+
+def _copy_chunk(conn, chunk: pd.DataFrame, quoted_table: str, quoted_columns: str) -> None:
+    buf = io.StringIO(_csv_payload(chunk))
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {quoted_table} ({quoted_columns}) FROM STDIN WITH (FORMAT csv)", buf)
+    finally:
+        cursor.close()
+
+
+def _stream_rows(conn, df: pd.DataFrame, table_name: str, chunksize: int) -> str:
+    """Append df to an existing table chunk by chunk; returns the method used."""
+    preparer = conn.dialect.identifier_preparer
+    if conn.dialect.name == 'postgresql' and conn.dialect.driver == 'psycopg2':
+        quoted_columns = ", ".join(preparer.quote(c) for c in df.columns)
+        for start in range(0, len(df), chunksize):
+            _copy_chunk(conn, df.iloc[start:start + chunksize], preparer.quote(table_name),
+                        quoted_columns)
+        return 'copy'
+
+    rows_per_statement = max(1, min(chunksize, MAX_BIND_PARAMS // max(1, len(df.columns))))
+    df.to_sql(table_name, conn, if_exists='append', index=False, method='multi',
+              chunksize=rows_per_statement)
+    return 'multi-row insert'
+
+
+def _create_indexes(conn, table_name: str, key: str, index_columns: Iterable) -> None:
+    preparer = conn.dialect.identifier_preparer
+    conn.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {preparer.quote(f'ux_{table_name}_{key}')} "
+        f"ON {preparer.quote(table_name)} ({preparer.quote(key)})"))
+    for columns in index_columns:
+        # A tuple of column names builds one composite index
+        columns = (columns,) if isinstance(columns, str) else tuple(columns)
+        name = f"ix_{table_name}_{'_'.join(columns)}"
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {preparer.quote(name)} "
+            f"ON {preparer.quote(table_name)} ({', '.join(preparer.quote(c) for c in columns)})"))
+
+
+def bulk_upsert(df: pd.DataFrame, table_name: str, engine, key: str = 'sample_id',
+                index_columns: Iterable = (), chunksize: int = 50000) -> dict:
+    """
+    Insert or update df's rows in table_name, matched on key.
+
+    A missing table is created and filled directly, then indexed. An existing
+    table is merged through a staging table with INSERT ... ON CONFLICT (key)
+    DO UPDATE, so rows not in df are left alone. Runs in one transaction.
+
+    Args:
+        df: Rows to load; its columns must match the table's
+        table_name: Target table
+        engine: SQLAlchemy engine (PostgreSQL or SQLite)
+        key: Unique column rows are matched on
+        index_columns: Extra columns to index after loading (a tuple of
+            names makes a composite index)
+        chunksize: Rows per COPY / INSERT batch
+
+    Returns:
+        dict: rows, method ('copy' or 'multi-row insert'), whether the table
+        was created, and elapsed seconds
+    """
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        preparer = conn.dialect.identifier_preparer
+        created = not inspect(conn).has_table(table_name)
+        if created:
+            df.head(0).to_sql(table_name, conn, index=False)
+            method = _stream_rows(conn, df, table_name, chunksize)
+            _create_indexes(conn, table_name, key, index_columns)
+        else:
+            # ON CONFLICT needs a unique index on the key (tables written by the
+            # old to_sql(replace) loader do not have one)
+            _create_indexes(conn, table_name, key, index_columns)
+            # A temporary table goes away with the connection, even after a crash
+            staging = f"{table_name}_staging"
+            columns = [preparer.quote(c) for c in df.columns]
+            conn.execute(text(
+                f"CREATE TEMPORARY TABLE {preparer.quote(staging)} AS "
+                f"SELECT {', '.join(columns)} FROM {preparer.quote(table_name)} LIMIT 0"))
+            method = _stream_rows(conn, df, staging, chunksize)
+            updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != preparer.quote(key))
+            conflict_action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+            # "WHERE true" keeps SQLite from reading ON CONFLICT as a join constraint
+            conn.execute(text(
+                f"INSERT INTO {preparer.quote(table_name)} ({', '.join(columns)}) "
+                f"SELECT {', '.join(columns)} FROM {preparer.quote(staging)} WHERE true "
+                f"ON CONFLICT ({preparer.quote(key)}) {conflict_action}"))
+            conn.execute(text(f"DROP TABLE {preparer.quote(staging)}"))
+
+    return {
+        'rows': len(df),
+        'method': method,
+        'created': created,
+        'seconds': time.perf_counter() - start,
+    }
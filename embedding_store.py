@@ -0,0 +1,400 @@
+"""
+Memory-mapped embedding store with approximate nearest-neighbour search.
+The notebook's text and image embeddings (train_text_embeddings.npy and
+train_image_embeddings.npy, one row per train.csv row) are L2-normalized
+per source, concatenated and written (float16 by default) into a store
+directory with the sample ids and prices. An inverted-file (IVF) index
+assigns every row to its nearest k-means centroid and stores each list
+contiguously, so a query scores the centroids, reads only the n_probe
+closest lists from the memory-mapped matrix and ranks those rows by
+cosine similarity. Forked API workers share the mapped pages.
+
+The neighbours' prices give a "comparable price" for any stored item, and
+comparable_prices() computes it for every training row (leaving the row
+itself out) as a feature.
+
+Usage:
+    python embedding_store.py build train.csv train_text_embeddings.npy train_image_embeddings.npy
+    python embedding_store.py comparable-price --output comparable_price.npy
+    python embedding_store.py benchmark --rows 100000 --dim 512
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+STORE_FORMAT = 1
+STORE_PATH = 'embedding_store'
+MANIFEST = 'manifest.json'
+# Rows normalized, assigned or scanned per step, bounding memory on large matrices
+CHUNK_ROWS = 65536
+
+
+def _normalize_rows(block: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return block / norms
+
+
+def _combined(parts: Sequence[np.ndarray], rows) -> np.ndarray:
+    """Rows of the store vectors: each source L2-normalized, concatenated, scaled back to unit norm."""
+    blocks = [_normalize_rows(np.asarray(part[rows], dtype=np.float32)) for part in parts]
+    return np.hstack(blocks) / np.float32(np.sqrt(len(parts)))
+
+
+def _spherical_kmeans(X: np.ndarray, n_lists: int, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+    # k-means on the unit sphere: assign by dot product, renormalize the means
+    centroids = X[rng.choice(len(X), n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = np.argmax(X @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        counts = np.bincount(labels, minlength=n_lists)
+        empty = counts == 0
+        # Empty lists restart from random points
+        sums[empty] = X[rng.choice(len(X), int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids.astype(np.float32)
+
+
+def build_store(parts: Sequence[np.ndarray], sample_ids, prices, path: str = STORE_PATH,
+                dtype: str = 'float16', n_lists: Optional[int] = None, train_rows: Optional[int] = None,
+                n_iter: int = 10, seed: int = 0) -> dict:
+    """
+    Write the store directory, replacing any previous one.
+
+    Args:
+        parts: Embedding matrices with one row per item (e.g. text and image), mmapped ones included
+        sample_ids: Integer id of each row
+        prices: Price of each row
+        path: Store directory
+        dtype: 'float16' (half the size) or 'float32'
+        n_lists: IVF lists (default sqrt of the row count)
+        train_rows: Rows sampled to fit the centroids (default 64 per list)
+        n_iter: k-means iterations
+        seed: Sampling seed
+
+    Returns:
+        dict: The manifest
+
+    Raises:
+        ValueError: If the inputs do not have the same number of rows
+    """
+    n_rows = len(sample_ids)
+    if any(len(part) != n_rows for part in parts) or len(prices) != n_rows:
+        raise ValueError("Embedding matrices, sample ids and prices must have the same number of rows")
+    dim = sum(part.shape[1] for part in parts)
+    n_lists = min(n_rows, n_lists or max(1, int(round(np.sqrt(n_rows)))))
+    rng = np.random.default_rng(seed)
+
+    # 1. Centroids from a sample, then every row assigned to its nearest list
+    start = time.perf_counter()
+    sample = np.sort(rng.choice(n_rows, min(n_rows, train_rows or 64 * n_lists), replace=False))
+    centroids = _spherical_kmeans(_combined(parts, sample), n_lists, n_iter, rng)
+    labels = np.empty(n_rows, dtype=np.int32)
+    for i in range(0, n_rows, CHUNK_ROWS):
+        labels[i:i + CHUNK_ROWS] = np.argmax(_combined(parts, slice(i, i + CHUNK_ROWS)) @ centroids.T, axis=1)
+    order = np.argsort(labels, kind='stable')
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp = tempfile.mkdtemp(dir=parent, prefix='.embeddings-')
+    try:
+        # 2. Vectors, ids and prices in list order, so each list is one contiguous read
+        vectors = np.lib.format.open_memmap(os.path.join(tmp, 'vectors.npy'), mode='w+',
+                                            dtype=np.dtype(dtype), shape=(n_rows, dim))
+        for i in range(0, n_rows, CHUNK_ROWS):
+            vectors[i:i + CHUNK_ROWS] = _combined(parts, order[i:i + CHUNK_ROWS])
+        vectors.flush()
+        del vectors
+        ids = np.asarray(sample_ids, dtype=np.int64)[order]
+        np.save(os.path.join(tmp, 'rows.npy'), order.astype(np.int64))
+        np.save(os.path.join(tmp, 'sample_ids.npy'), ids)
+        np.save(os.path.join(tmp, 'id_order.npy'), np.argsort(ids, kind='stable'))
+        np.save(os.path.join(tmp, 'prices.npy'), np.asarray(prices, dtype=np.float64)[order])
+        np.save(os.path.join(tmp, 'centroids.npy'), centroids)
+        np.save(os.path.join(tmp, 'list_offsets.npy'), offsets.astype(np.int64))
+
+        manifest = {
+            'format': STORE_FORMAT,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'dtype': np.dtype(dtype).name,
+            'n_rows': n_rows,
+            'part_dims': [int(part.shape[1]) for part in parts],
+            'n_lists': n_lists,
+            'build_seconds': round(time.perf_counter() - start, 3),
+        }
+        with open(os.path.join(tmp, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # 3. Swap in the new directory
+        old = None
+        if os.path.exists(path):
+            old = tempfile.mkdtemp(dir=parent, prefix='.embeddings-old-')
+            os.replace(path, os.path.join(old, 'store'))
+        os.replace(tmp, path)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return manifest
+
+
+class EmbeddingStore:
+    """
+    Read side of a store directory.
+
+    Positions returned by search() index the stored (list-ordered) rows;
+    rows[position] is the item's row in the original embedding matrices.
+    """
+
+    def __init__(self, path: str = STORE_PATH, n_probe: int = 8):
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest['format'] != STORE_FORMAT:
+            raise ValueError(f"{path} has store format {self.manifest['format']}, expected {STORE_FORMAT}")
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode='r', allow_pickle=False)
+
+        self.vectors = load('vectors.npy')
+        self.rows = load('rows.npy')
+        self.sample_ids = load('sample_ids.npy')
+        self.id_order = load('id_order.npy')
+        self.prices = load('prices.npy')
+        # Small and touched by every query, so kept in memory
+        self.centroids = np.load(os.path.join(path, 'centroids.npy'))
+        self.offsets = np.load(os.path.join(path, 'list_offsets.npy'))
+        self.part_dims = self.manifest['part_dims']
+        self.n_probe = n_probe
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def position(self, sample_id: int) -> int:
+        """
+        Stored position of an item.
+
+        Raises:
+            KeyError: If the sample id is not in the store
+        """
+        i = int(np.searchsorted(self.sample_ids, sample_id, sorter=self.id_order))
+        if i == len(self.id_order) or self.sample_ids[self.id_order[i]] != sample_id:
+            raise KeyError(sample_id)
+        return int(self.id_order[i])
+
+    def vector(self, position: int) -> np.ndarray:
+        return np.asarray(self.vectors[position], dtype=np.float32)
+
+    def query_vector(self, parts: Sequence[Sequence[float]]) -> np.ndarray:
+        """
+        Store-format query from one raw embedding per source (text, image, ...).
+
+        Raises:
+            ValueError: If the number or sizes of the embeddings do not match the store,
+                or any value is NaN or infinite (also after the cast to float32)
+        """
+        if [len(part) for part in parts] != self.part_dims:
+            raise ValueError(f"Expected embeddings of sizes {self.part_dims}, "
+                             f"got {[len(part) for part in parts]}")
+        with np.errstate(over='ignore'):
+            arrays = [np.asarray(part, dtype=np.float32)[None, :] for part in parts]
+        if not all(np.isfinite(a).all() for a in arrays):
+            raise ValueError("Embeddings must be finite float32 values")
+        return _combined(arrays, slice(None))[0]
+
+    def search(self, query: np.ndarray, k: int = 10, n_probe: Optional[int] = None,
+               exclude: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate k nearest neighbours by cosine similarity.
+
+        Args:
+            query: Unit-norm vector in store format (see query_vector)
+            k: Neighbours returned
+            n_probe: IVF lists scanned (default self.n_probe); all lists gives the exact answer
+            exclude: Position left out of the results (the query item itself)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Positions and similarities, most similar first
+        """
+        query = np.asarray(query, dtype=np.float32)
+        n_lists = len(self.centroids)
+        n_probe = min(n_probe or self.n_probe, n_lists)
+        lists = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        positions, scores = [], []
+        for l in np.sort(lists):
+            start, stop = self.offsets[l], self.offsets[l + 1]
+            if start < stop:
+                positions.append(np.arange(start, stop))
+                scores.append(np.asarray(self.vectors[start:stop], dtype=np.float32) @ query)
+        if not positions:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return self._top_k(np.concatenate(positions), np.concatenate(scores), k, exclude)
+
+    def search_exact(self, query: np.ndarray, k: int = 10,
+                     exclude: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force k nearest neighbours over every row (the recall reference)."""
+        query = np.asarray(query, dtype=np.float32)
+        scores = np.empty(self.n_rows, dtype=np.float32)
+        for i in range(0, self.n_rows, CHUNK_ROWS):
+            scores[i:i + CHUNK_ROWS] = np.asarray(self.vectors[i:i + CHUNK_ROWS], dtype=np.float32) @ query
+        return self._top_k(np.arange(self.n_rows), scores, k, exclude)
+
+    @staticmethod
+    def _top_k(positions, scores, k, exclude):
+        if exclude is not None:
+            keep = positions != exclude
+            positions, scores = positions[keep], scores[keep]
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            positions, scores = positions[top], scores[top]
+        best = np.argsort(-scores, kind='stable')
+        return positions[best], scores[best]
+
+    def neighbours(self, query: np.ndarray, k: int = 10, n_probe: Optional[int] = None,
+                   exclude: Optional[int] = None) -> List[dict]:
+        """search() results as {'sample_id', 'price', 'similarity'} dicts."""
+        positions, scores = self.search(query, k, n_probe, exclude)
+        return [{'sample_id': int(self.sample_ids[p]), 'price': float(self.prices[p]),
+                 'similarity': round(float(s), 4)} for p, s in zip(positions, scores)]
+
+
+def comparable_price(prices, similarities) -> Optional[float]:
+    """
+    Similarity-weighted geometric mean of the neighbours' prices (the
+    model's log1p space), or None without neighbours.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if not len(prices):
+        return None
+    weights = np.clip(np.asarray(similarities, dtype=np.float64), 0, None)
+    if weights.sum() == 0:
+        weights = np.ones_like(prices)
+    return float(np.expm1(np.average(np.log1p(prices), weights=weights)))
+
+
+def comparable_prices(store: EmbeddingStore, k: int = 10, n_probe: Optional[int] = None) -> np.ndarray:
+    """
+    Comparable price of every stored item from its k nearest other items.
+
+    Returns:
+        np.ndarray: One value per row of the original embedding matrices (train.csv order)
+    """
+    result = np.full(store.n_rows, np.nan)
+    for position in range(store.n_rows):
+        found, scores = store.search(store.vector(position), k, n_probe, exclude=position)
+        value = comparable_price(store.prices[found], scores)
+        if value is not None:
+            result[store.rows[position]] = value
+    return result
+
+
+def synthetic_embeddings(n_rows: int, dim: int, n_clusters: int = 100, noise: float = 0.5,
+                         seed: int = 0) -> np.ndarray:
+    """Clustered random vectors, shaped like real embeddings for benchmarking."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, n_rows)
+    return centers[labels] + noise * rng.normal(size=(n_rows, dim)).astype(np.float32)
+
+
+def benchmark(n_rows: int = 100000, dim: int = 512, k: int = 10, n_probes=(1, 4, 8, 16, 32),
+              n_queries: int = 200, dtype: str = 'float16', seed: int = 0) -> dict:
+    """
+    Build time, recall@k against exact search and query latency on synthetic vectors.
+
+    Returns:
+        dict: {'build_seconds', 'exact_ms', 'n_lists', 'probes': {n_probe: {'recall', 'median_ms', 'p95_ms'}}}
+    """
+    X = synthetic_embeddings(n_rows, dim, seed=seed)
+    half = dim // 2
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'store')
+        start = time.perf_counter()
+        manifest = build_store([X[:, :half], X[:, half:]], np.arange(n_rows), np.ones(n_rows), path, dtype)
+        build_seconds = time.perf_counter() - start
+        store = EmbeddingStore(path)
+
+        rng = np.random.default_rng(seed + 1)
+        queries = _combined([X[:, :half], X[:, half:]], rng.choice(n_rows, n_queries, replace=False))
+        queries += 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+        queries = _normalize_rows(queries)
+
+        exact, exact_ms = [], []
+        for q in queries:
+            t = time.perf_counter()
+            exact.append(set(store.search_exact(q, k)[0].tolist()))
+            exact_ms.append((time.perf_counter() - t) * 1000)
+        probes = {}
+        for n_probe in n_probes:
+            hits, times = 0, []
+            for q, truth in zip(queries, exact):
+                t = time.perf_counter()
+                found = store.search(q, k, n_probe)[0]
+                times.append((time.perf_counter() - t) * 1000)
+                hits += len(truth.intersection(found.tolist()))
+            times.sort()
+            probes[n_probe] = {'recall': hits / (k * n_queries), 'median_ms': statistics.median(times),
+                               'p95_ms': times[int(0.95 * (len(times) - 1))]}
+        del store
+    return {'build_seconds': build_seconds, 'exact_ms': statistics.median(exact_ms),
+            'n_lists': manifest['n_lists'], 'probes': probes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, query-benchmark or derive features from the embedding store")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="Build the store from train.csv and its embedding matrices")
+    build.add_argument('csv', help="train.csv with sample_id and price (rows aligned with the embeddings)")
+    build.add_argument('embeddings', nargs='+', help=".npy matrices, e.g. text then image embeddings")
+    build.add_argument('--output', default=STORE_PATH)
+    build.add_argument('--dtype', choices=['float16', 'float32'], default='float16')
+    build.add_argument('--n-lists', type=int, default=None)
+    feature = sub.add_parser('comparable-price', help="Comparable price of every training row")
+    feature.add_argument('--store', default=STORE_PATH)
+    feature.add_argument('--k', type=int, default=10)
+    feature.add_argument('--n-probe', type=int, default=8)
+    feature.add_argument('--output', default='comparable_price.npy')
+    bench = sub.add_parser('benchmark', help="Build time, recall@k and latency on synthetic vectors")
+    bench.add_argument('--rows', type=int, default=100000)
+    bench.add_argument('--dim', type=int, default=512)
+    bench.add_argument('--k', type=int, default=10)
+    bench.add_argument('--dtype', choices=['float16', 'float32'], default='float16')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        import pandas as pd
+
+        df = pd.read_csv(args.csv, usecols=['sample_id', 'price'])
+        parts = [np.load(path, mmap_mode='r') for path in args.embeddings]
+        manifest = build_store(parts, df['sample_id'].to_numpy(), df['price'].to_numpy(),
+                               args.output, args.dtype, args.n_lists)
+        print(f"✅ Wrote '{args.output}': {manifest['n_rows']} rows, {manifest['n_lists']} lists, "
+              f"{manifest['dtype']} in {manifest['build_seconds']:.1f}s")
+    elif args.command == 'comparable-price':
+        values = comparable_prices(EmbeddingStore(args.store), args.k, args.n_probe)
+        np.save(args.output, values)
+        print(f"✅ Wrote '{args.output}' ({len(values)} rows)")
+    else:
+        report = benchmark(args.rows, args.dim, args.k, dtype=args.dtype)
+        print(f"{args.rows} x {args.dim} {args.dtype}, {report['n_lists']} lists: "
+              f"built in {report['build_seconds']:.2f}s, exact search {report['exact_ms']:.2f} ms")
+        print(f"{'n_probe':>8} {f'recall@{args.k}':>10} {'median ms':>10} {'p95 ms':>10}")
+        for n_probe, r in report['probes'].items():
+            print(f"{n_probe:>8} {r['recall']:>10.3f} {r['median_ms']:>10.3f} {r['p95_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
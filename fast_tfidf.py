@@ -0,0 +1,220 @@
+"""
+Inference-only TF-IDF transform restricted to the fitted vocabulary.
+TfidfVectorizer.transform builds every 1-3 word n-gram of the input as a
+Python string and then looks each one up in a 2000-term vocabulary, throwing
+almost all of them away. VocabularyTfidf numbers the tokens that occur in
+kept terms and indexes the terms (and their prefixes) by token-id
+sequences, so extending an n-gram stops as soon as no kept term can start
+with it, and no n-gram strings are built at all. Counts are weighted with
+the same idf_ and normalization, giving the same CSR matrix as
+vectorizer.transform.
+"""
+import math
+import re
+from typing import Callable, Dict, Iterable, Mapping, Optional, Set
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import strip_accents_ascii, strip_accents_unicode
+from sklearn.preprocessing import normalize
+
+# sklearn's default token_pattern. Its word boundaries are implied when
+# findall takes maximal runs of word characters, and matching without them
+# is about a third faster.
+DEFAULT_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+_WORD_RUN_RE = re.compile(r"\w\w+")
+
+
+def vectorizer_settings(vectorizer) -> dict:
+    """
+    The JSON-serializable settings VocabularyTfidf.from_settings needs (vocabulary and idf_ aside).
+
+    Raises:
+        ValueError: If the vectorizer relies on custom callables, which cannot be stored as settings
+    """
+    if vectorizer.analyzer != 'word' or vectorizer.input != 'content':
+        raise ValueError("Only analyzer='word' with input='content' can be stored as settings")
+    if vectorizer.preprocessor is not None or vectorizer.tokenizer is not None \
+            or callable(vectorizer.strip_accents):
+        raise ValueError("Vectorizers with custom preprocessor/tokenizer/strip_accents cannot be stored as settings")
+    return {
+        'lowercase': bool(vectorizer.lowercase),
+        'strip_accents': vectorizer.strip_accents,
+        'token_pattern': vectorizer.token_pattern,
+        'ngram_range': list(vectorizer.ngram_range),
+        'stop_words': sorted(vectorizer.get_stop_words() or ()),
+        'binary': bool(vectorizer.binary),
+        'sublinear_tf': bool(vectorizer.sublinear_tf),
+        'norm': vectorizer.norm,
+        'use_idf': bool(vectorizer.use_idf),
+        'dtype': np.dtype(vectorizer.dtype).name,
+    }
+
+
+class VocabularyTfidf:
+    """
+    Fast transform() for a fitted word-level TfidfVectorizer.
+
+    Build it with from_vectorizer(), or with from_settings() from the plain
+    arrays and settings of an artifact bundle; transform() takes a batch of
+    strings. vocabulary_ maps terms to columns, as on the vectorizer.
+    """
+
+    def __init__(self, vocabulary: Mapping[str, int], idf: Optional[np.ndarray] = None,
+                 ngram_range=(1, 1), stop_words: Iterable[str] = (), preprocess: Callable = str.lower,
+                 tokenize: Callable = _WORD_RUN_RE.findall, binary: bool = False,
+                 sublinear_tf: bool = False, norm: Optional[str] = 'l2', dtype=np.float64):
+        self.vocabulary_ = vocabulary
+        self.preprocess = preprocess
+        self.tokenize = tokenize
+        self.stop_words = frozenset(stop_words)
+        self.min_n, self.max_n = ngram_range
+        self.n_features = len(vocabulary)
+        self.idf = idf
+        self.idf_list = None if idf is None else idf.tolist()
+        self.binary = binary
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        self.dtype = np.float32 if np.dtype(dtype) == np.float32 else np.float64
+
+        # Token ids start at 1 so a key is the token-id sequence written in base `base`
+        self.token_ids: Dict[str, int] = {}
+        for term in vocabulary:
+            for token in term.split(' '):
+                self.token_ids.setdefault(token, len(self.token_ids) + 1)
+        self.base = len(self.token_ids) + 1
+        self.columns: Dict[int, int] = {}
+        self.prefixes: Set[int] = set()
+        for term, column in vocabulary.items():
+            key = 0
+            for token in term.split(' '):
+                if key:
+                    self.prefixes.add(key)
+                key = key * self.base + self.token_ids[token]
+            self.columns[key] = column
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer) -> 'VocabularyTfidf':
+        """
+        Mirror a fitted TfidfVectorizer (custom preprocessors and tokenizers included).
+
+        Raises:
+            ValueError: If the vectorizer does not analyze words of string input
+        """
+        if vectorizer.analyzer != 'word' or vectorizer.input != 'content':
+            raise ValueError("VocabularyTfidf supports analyzer='word' with input='content' only")
+        if vectorizer.tokenizer is None and vectorizer.token_pattern == DEFAULT_TOKEN_PATTERN:
+            tokenize = _WORD_RUN_RE.findall
+        else:
+            tokenize = vectorizer.build_tokenizer()
+        return cls(vectorizer.vocabulary_, vectorizer.idf_ if vectorizer.use_idf else None,
+                   vectorizer.ngram_range, vectorizer.get_stop_words() or (),
+                   vectorizer.build_preprocessor(), tokenize, vectorizer.binary,
+                   vectorizer.sublinear_tf, vectorizer.norm, vectorizer.dtype)
+
+    @classmethod
+    def from_settings(cls, vocabulary: Mapping[str, int], idf: Optional[np.ndarray],
+                      settings: dict) -> 'VocabularyTfidf':
+        """Rebuild from vectorizer_settings() output, without the pickled vectorizer."""
+        lowercase, strip_accents = settings['lowercase'], settings['strip_accents']
+        if strip_accents is None:
+            preprocess = str.lower if lowercase else str
+        else:
+            strip = strip_accents_ascii if strip_accents == 'ascii' else strip_accents_unicode
+            preprocess = (lambda doc: strip(doc.lower())) if lowercase else strip
+        pattern = settings['token_pattern']
+        tokenize = _WORD_RUN_RE.findall if pattern == DEFAULT_TOKEN_PATTERN else re.compile(pattern).findall
+        return cls(vocabulary, idf if settings['use_idf'] else None, tuple(settings['ngram_range']),
+                   settings['stop_words'], preprocess, tokenize, settings['binary'],
+                   settings['sublinear_tf'], settings['norm'], settings['dtype'])
+
+    def count(self, text: str) -> Dict[int, int]:
+        """Term counts of one document, by vocabulary column."""
+        token_ids, stop_words = self.token_ids, self.stop_words
+        # Tokens outside every kept term (0) end any n-gram that reaches them
+        ids = [token_ids.get(t, 0) for t in self.tokenize(self.preprocess(text)) if t not in stop_words]
+        columns, prefixes, base = self.columns, self.prefixes, self.base
+        min_n, max_n = self.min_n, self.max_n
+        counts: Dict[int, int] = {}
+        n_ids = len(ids)
+        for i, key in enumerate(ids):
+            if not key:
+                continue
+            if min_n == 1:
+                column = columns.get(key)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+            # Extend only while some kept term starts with the tokens so far
+            n, j = 1, i + 1
+            while key in prefixes and n < max_n and j < n_ids and ids[j]:
+                key = key * base + ids[j]
+                n, j = n + 1, j + 1
+                if n >= min_n:
+                    column = columns.get(key)
+                    if column is not None:
+                        counts[column] = counts.get(column, 0) + 1
+        return counts
+
+    def transform(self, texts: Iterable[str]) -> sparse.csr_matrix:
+        """
+        TF-IDF matrix of a batch of documents.
+
+        Args:
+            texts: Strings (missing values should already be replaced, as for vectorizer.transform)
+
+        Returns:
+            sparse.csr_matrix: Same shape, sorted indices and values as vectorizer.transform(texts)
+        """
+        if self.binary or self.sublinear_tf or self.norm not in ('l2', None) or self.dtype != np.float64:
+            return self._transform_generic(texts)
+
+        # Weight and L2-normalize each row in plain Python floats, accumulating the
+        # sum of squares in column order exactly like sklearn's row normalizer
+        idf = self.idf_list
+        l2 = self.norm == 'l2'
+        indptr = [0]
+        indices = []
+        values = []
+        for text in texts:
+            counts = self.count(text)
+            row = [(column, counts[column] * idf[column] if idf else float(counts[column]))
+                   for column in sorted(counts)]
+            scale = 1.0
+            if l2:
+                total = 0.0
+                for _, value in row:
+                    total += value * value
+                if total != 0.0:
+                    scale = math.sqrt(total)
+            for column, value in row:
+                indices.append(column)
+                values.append(value / scale)
+            indptr.append(len(indices))
+        return self._csr(values, indices, indptr)
+
+    def _csr(self, values, indices, indptr) -> sparse.csr_matrix:
+        return sparse.csr_matrix((np.array(values, dtype=self.dtype), np.array(indices, dtype=np.int32),
+                                  np.array(indptr, dtype=np.int32)), shape=(len(indptr) - 1, self.n_features))
+
+    def _transform_generic(self, texts: Iterable[str]) -> sparse.csr_matrix:
+        # Other TfidfVectorizer options (and float32), applied with the same numpy steps as TfidfTransformer
+        indptr = [0]
+        indices = []
+        values = []
+        for text in texts:
+            counts = self.count(text)
+            for column in sorted(counts):
+                indices.append(column)
+                values.append(counts[column])
+            indptr.append(len(indices))
+        X = self._csr(values, indices, indptr)
+        if self.binary:
+            X.data.fill(1)
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.idf is not None:
+            X.data *= self.idf[X.indices]
+        if self.norm is not None:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
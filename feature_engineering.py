@@ -1,81 +1,161 @@
 import re
 import numpy as np
 import pandas as pd
+from scipy import sparse
+
+# 1. The "Elite" List (Your known giants)
+# Order matters: when a text mentions several brands, the first one listed wins.
+KNOWN_BRANDS = [
+    'mccormick', 'rani', 'goya', 'frontier', 'betty', 'starbucks', 
+    'badia', 'amoretti', 'bob\'s', 'campbell\'s', 'kraft', 
+    'gerber', 'eden', 'lorann', 'kirkland', 'bigelow', 'knorr', 
+    'kellogg\'s', 'morton', 'twinings', 'hershey\'s', 'heinz', 
+    'torani', 'celestial', 'quaker', 'apple', 'samsung', 'sony', 
+    'nike', 'adidas', 'lego', 'funko', 'disney'
+]
+
+# "Junk Word" Filter: if the first word is one of these, it's NOT a brand.
+JUNK_WORDS = frozenset([
+    'the', 'a', 'new', 'pack', 'set', 'lot', 'case', 'box', 'of', 'for', 
+    'premium', 'organic', 'fresh', 'natural', 'large', 'small', 'blue', 
+    'red', 'black', 'white', 'green', 'gold', 'silver', 'combo', 'pair',
+    'food', 'item', 'generic', 'unbranded'
+])
+
+BULK_KEYWORDS = ['kit', 'pallet', 'case', 'bucket', 'pack', 'bulk', 'servings', 'supply', 'bottles']
+
+# Hardcoded one-hot columns for production safety
+ONE_HOT_BRANDS = ['apple', 'samsung', 'sony', 'nike', 'dell', 'hp', 'lego', 'adidas']
+
+# Compiled once at import instead of on every call
+_PREFIX_RE = re.compile(r'^(item\s*name|item|product\s*name|description)[:\s-]*')
+_BRAND_RE = re.compile('|'.join(re.escape(b) for b in KNOWN_BRANDS))
+_BULK_RE = re.compile('|'.join(re.escape(k) for k in BULK_KEYWORDS))
+_IPQ_RE = re.compile(r'(?:IPQ|Pack of|Count)[\s:]*(\d+)', re.IGNORECASE)
+# Same pattern for already-lowercased text; dropping IGNORECASE makes it ~3x faster
+_IPQ_LOWER_RE = re.compile(r'(?:ipq|pack of|count)[\s:]*(\d+)')
+
+_BRAND_TITLES = [(b, b.title()) for b in KNOWN_BRANDS]
 
 def find_brand(text):
-    text_lower = str(text).lower()
-    
-    # 1. The "Elite" List (Your known giants)
-    # (Keep your existing list here)
-    known_brands = [
-        'mccormick', 'rani', 'goya', 'frontier', 'betty', 'starbucks', 
-        'badia', 'amoretti', 'bob\'s', 'campbell\'s', 'kraft', 
-        'gerber', 'eden', 'lorann', 'kirkland', 'bigelow', 'knorr', 
-        'kellogg\'s', 'morton', 'twinings', 'hershey\'s', 'heinz', 
-        'torani', 'celestial', 'quaker', 'apple', 'samsung', 'sony', 
-        'nike', 'adidas', 'lego', 'funko', 'disney'
-    ]
-    
+    return find_brand_lower(str(text).lower())
+
+def find_brand_lower(text_lower):
+    """find_brand on already-lowercased text (the per-text path used for serving)."""
     # Check for known brands first (High Confidence)
-    for brand in known_brands:
+    for brand, title in _BRAND_TITLES:
         if brand in text_lower: 
-            return brand.title() # Return capitalized (e.g. "Nike")
+            return title # Return capitalized (e.g. "Nike")
             
     # 2. The "Smart Fallback" (Low Confidence)
     # If we didn't find a known brand, let's guess the first word.
     
     # A. Clean the text (Remove "Item Name:", "Product:", etc.)
-    import re
-    cleaned_text = re.sub(r'^(item\s*name|item|product\s*name|description)[:\s-]*', '', text_lower)
+    cleaned_text = _PREFIX_RE.sub('', text_lower)
     
     # B. Get the first word
-    words = cleaned_text.split()
+    words = cleaned_text.split(maxsplit=1)
     if not words:
         return 'Unknown'
         
     candidate_brand = words[0]
     
     # C. "Junk Word" Filter
-    # If the first word is one of these, it's NOT a brand.
-    junk_words = [
-        'the', 'a', 'new', 'pack', 'set', 'lot', 'case', 'box', 'of', 'for', 
-        'premium', 'organic', 'fresh', 'natural', 'large', 'small', 'blue', 
-        'red', 'black', 'white', 'green', 'gold', 'silver', 'combo', 'pair',
-        'food', 'item', 'generic', 'unbranded'
-    ]
-    
-    if candidate_brand in junk_words or len(candidate_brand) < 2:
+    if candidate_brand in JUNK_WORDS or len(candidate_brand) < 2:
         return 'Unknown'
         
     # If it passed the filter, assume it's a brand!
     return candidate_brand.title()
 
 def check_for_bulk(text):
-    text = str(text).lower()
-    bulk_keywords = ['kit', 'pallet', 'case', 'bucket', 'pack', 'bulk', 'servings', 'supply', 'bottles']
-    for keyword in bulk_keywords:
-        if keyword in text: return 1
-    return 0
+    return check_for_bulk_lower(str(text).lower())
+
+def check_for_bulk_lower(text_lower):
+    """check_for_bulk on already-lowercased text."""
+    return 1 if _BULK_RE.search(text_lower) else 0
 
 def extract_ipq(text):
-    match = re.search(r'(?:IPQ|Pack of|Count)[\s:]*(\d+)', str(text), re.IGNORECASE)
+    match = _IPQ_RE.search(str(text))
+    return int(match.group(1)) if match else 1
+
+def extract_ipq_lower(text_lower):
+    """extract_ipq on already-lowercased text."""
+    match = _IPQ_LOWER_RE.search(text_lower)
     return int(match.group(1)) if match else 1
 
+def _brands_vectorized(text_lower):
+    """
+    Vectorized find_brand over a lowercased object Series with a RangeIndex.
+    Returns an object array of brand names.
+    """
+    brand = np.full(len(text_lower), 'Unknown', dtype=object)
+    
+    # 1. Known brands: one pass of the compiled alternation finds every row that
+    # mentions any brand, then brands are resolved in priority order on that subset.
+    mentions = text_lower.str.contains(_BRAND_RE).to_numpy(dtype=bool)
+    pending = text_lower[mentions]
+    for b in KNOWN_BRANDS:
+        if pending.empty:
+            break
+        hit = pending.str.contains(b, regex=False).to_numpy(dtype=bool)
+        brand[pending.index[hit]] = b.title()
+        pending = pending[~hit]
+    
+    # 2. Smart fallback (first word, junk-filtered) for rows with no known brand
+    rest = text_lower[~mentions]
+    first = rest.str.replace(_PREFIX_RE, '', regex=True).str.split(n=1).str[0]
+    keep = (first.notna() & (first.str.len() >= 2) & ~first.isin(list(JUNK_WORDS))).to_numpy(dtype=bool)
+    brand[first.index[keep]] = first[keep].str.title().to_numpy(dtype=object)
+    return brand
+
 def process_text_features(text_series):
     """
     Takes a pandas Series of text and returns a DataFrame of parsed features.
+    Vectorized equivalent of applying find_brand, check_for_bulk and
+    extract_ipq row by row: the text is lowercased once and each feature is
+    a single .str pass with a precompiled pattern.
     """
-    df = pd.DataFrame()
-    df['brand'] = text_series.apply(find_brand)
-    df['is_bulk'] = text_series.apply(check_for_bulk)
-    df['item_quantity'] = text_series.apply(extract_ipq)
+    # Work on plain Python strings (str(x), like the scalar helpers) so the .str
+    # methods use the re module rather than a backend with different regex rules
+    text = pd.Series(text_series.map(str).to_numpy(dtype=object), dtype=object)
+    text_lower = text.str.lower()
+    
+    df = pd.DataFrame(index=text_series.index)
+    df['brand'] = pd.Series(_brands_vectorized(text_lower).tolist(), index=text_series.index)
+    df['is_bulk'] = text_lower.str.contains(_BULK_RE).to_numpy(dtype=np.int64)
+    quantity = text_lower.str.extract(_IPQ_LOWER_RE, expand=False)
+    df['item_quantity'] = pd.Series(quantity.fillna('1').map(int).tolist(), index=text_series.index)
     
-    # Simple One-Hot Encoding for Brand (Hardcoded columns for production safety)
+    # Simple One-Hot Encoding for Brand, computed from categorical codes
     # In a real system, you'd save the OneHotEncoder object, but this is robust for now.
-    known_brands = ['apple', 'samsung', 'sony', 'nike', 'dell', 'hp', 'lego', 'adidas']
-    for b in known_brands:
-        df[f'brand_{b}'] = (df['brand'] == b).astype(int)
+    # (code -1 means the brand has no column). NB: df['brand'] is title-case and
+    # ONE_HOT_BRANDS lowercase, so the brand_* columns are always zero; the trained
+    # models expect that, so the comparison is deliberately left as it is.
+    codes = pd.Index(ONE_HOT_BRANDS).get_indexer(df['brand'])
+    one_hot = (codes[:, None] == np.arange(len(ONE_HOT_BRANDS))).astype(np.int64)
+    for i, b in enumerate(ONE_HOT_BRANDS):
+        df[f'brand_{b}'] = one_hot[:, i]
         
-    # Drop the raw 'brand' column as models need numbers
+    # The raw 'brand' column is kept for the ETL; assemble_features drops it
     
-    return df
\ No newline at end of file
+    return df
+
+def assemble_features(features_parsed, features_tfidf):
+    """
+    Stacks the parsed features and the TF-IDF matrix into one CSR matrix.
+    This is the column layout the model is trained and served on: the parsed
+    numeric columns first, then the TF-IDF vocabulary. Nothing is densified,
+    so memory grows with the number of nonzeros, not the vocabulary size.
+    """
+    parsed = features_parsed.drop(columns=['brand'], errors='ignore')
+    parsed = sparse.csr_matrix(parsed.values.astype(np.float64))
+    return sparse.hstack([parsed, features_tfidf], format='csr')
+
+def build_features(text_series, vectorizer):
+    """
+    Takes a pandas Series of text and a fitted vectorizer and returns the
+    sparse model input (see assemble_features).
+    """
+    features_parsed = process_text_features(text_series)
+    features_tfidf = vectorizer.transform(text_series.fillna(''))
+    return assemble_features(features_parsed, features_tfidf)
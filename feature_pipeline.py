@@ -0,0 +1,243 @@
+"""
+Pandas-free feature pipeline for serving.
+process_text_features is built for training-sized frames: for one request it
+spends most of its time creating Series and DataFrames and adding columns one
+at a time. FeaturePipeline computes the same parsed columns for each text with
+plain Python and the per-text feature_engineering helpers, writes them
+into a preallocated numpy row and joins them with the TF-IDF part (computed
+by fast_tfidf.VocabularyTfidf), giving the same CSR matrix as build_features.
+It is saved next to the model with the column layout and a schema version,
+and checked against the current feature code when loaded.
+
+Usage:
+    python feature_pipeline.py benchmark vectorizer.pkl
+"""
+import argparse
+import time
+from typing import Iterable, List, Sequence
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from fast_tfidf import VocabularyTfidf
+from feature_engineering import (
+    ONE_HOT_BRANDS, build_features, check_for_bulk_lower, extract_ipq_lower, find_brand_lower,
+    process_text_features
+)
+
+# Bump when the saved state or the meaning of the columns changes
+SCHEMA_VERSION = 1
+
+PIPELINE_PATH = 'feature_pipeline.pkl'
+
+
+def parsed_columns() -> List[str]:
+    """Numeric columns of process_text_features, in the order assemble_features stacks them."""
+    return [c for c in process_text_features(pd.Series(['sample'])).columns if c != 'brand']
+
+
+def _is_missing(text) -> bool:
+    return text is None or (isinstance(text, float) and np.isnan(text))
+
+
+class FeaturePipeline:
+    """
+    Turns raw catalog_content strings into model input without pandas.
+
+    The column layout is taken from process_text_features when the pipeline
+    is built; transform() output matches build_features(pd.Series(texts), vectorizer).
+    """
+
+    def __init__(self, vectorizer):
+        self.schema_version = SCHEMA_VERSION
+        self.columns = parsed_columns()
+        self.n_tfidf = len(vectorizer.vocabulary_)
+        self.vectorizer = vectorizer
+        self._compile()
+
+    def _compile(self) -> None:
+        position = {name: i for i, name in enumerate(self.columns)}
+        self._bulk_col = position['is_bulk']
+        self._quantity_col = position['item_quantity']
+        # NB: find_brand returns title-case names ('Nike') but ONE_HOT_BRANDS is
+        # lowercase, so these columns are always zero -- exactly as in the trained
+        # model's process_text_features. Don't "fix" the lookup: it breaks parity.
+        self._brand_cols = {b: position[f'brand_{b}'] for b in ONE_HOT_BRANDS}
+        # Vocabulary-restricted TF-IDF; vectorizers it cannot mirror use their own transform
+        if isinstance(self.vectorizer, VocabularyTfidf):
+            self._tfidf = self.vectorizer
+        else:
+            try:
+                self._tfidf = VocabularyTfidf.from_vectorizer(self.vectorizer)
+            except ValueError:
+                self._tfidf = None
+
+    @property
+    def n_features(self) -> int:
+        return len(self.columns) + self.n_tfidf
+
+    def parse_one(self, text) -> np.ndarray:
+        """
+        Parsed features of one text as a float64 row.
+
+        Args:
+            text: A catalog_content string (None/NaN are parsed as their str(), like the DataFrame path)
+
+        Returns:
+            np.ndarray: One value per column in self.columns
+        """
+        row = np.zeros(len(self.columns))
+        text_lower = str(text).lower()
+        row[self._bulk_col] = check_for_bulk_lower(text_lower)
+        row[self._quantity_col] = extract_ipq_lower(text_lower)
+        brand_col = self._brand_cols.get(find_brand_lower(text_lower))
+        if brand_col is not None:
+            row[brand_col] = 1.0
+        return row
+
+    def parse(self, texts: Sequence) -> np.ndarray:
+        """Parsed features of several texts, one row per text (process_text_features without 'brand')."""
+        parsed = np.empty((len(texts), len(self.columns)))
+        for i, text in enumerate(texts):
+            parsed[i] = self.parse_one(text)
+        return parsed
+
+    def vectorize(self, texts: Sequence) -> sparse.csr_matrix:
+        """TF-IDF part (missing texts count as empty, like build_features)."""
+        texts = ['' if _is_missing(t) else t for t in texts]
+        if self._tfidf is not None:
+            return self._tfidf.transform(texts)
+        return self.vectorizer.transform(texts)
+
+    @staticmethod
+    def assemble(parsed: np.ndarray, tfidf: sparse.csr_matrix) -> sparse.csr_matrix:
+        """Stack parsed and TF-IDF features in the model's column order."""
+        return sparse.hstack([sparse.csr_matrix(parsed), tfidf], format='csr')
+
+    def transform(self, texts: Iterable) -> sparse.csr_matrix:
+        """
+        Model input for a list of texts.
+
+        Args:
+            texts: catalog_content strings
+
+        Returns:
+            sparse.csr_matrix: Same layout and values as build_features
+        """
+        texts = list(texts)
+        return self.assemble(self.parse(texts), self.vectorize(texts))
+
+    def transform_one(self, text) -> sparse.csr_matrix:
+        """Model input for a single text (a 1-row CSR matrix)."""
+        return self.transform([text])
+
+    def __getstate__(self):
+        # The vectorizer is saved separately (vectorizer.pkl) and rebound on load
+        state = self.__dict__.copy()
+        for name in ('vectorizer', '_bulk_col', '_quantity_col', '_brand_cols', '_tfidf'):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.vectorizer = None
+
+    def save(self, path: str = PIPELINE_PATH) -> None:
+        joblib.dump(self, path)
+
+    @classmethod
+    def load(cls, path: str, vectorizer) -> 'FeaturePipeline':
+        """
+        Load a saved pipeline and bind it to the fitted vectorizer.
+
+        Args:
+            path: File written by save()
+            vectorizer: The vectorizer saved with the model
+
+        Returns:
+            FeaturePipeline: Ready to transform
+
+        Raises:
+            ValueError: If the saved schema or columns no longer match the feature code or vectorizer
+        """
+        pipeline = joblib.load(path)
+        if getattr(pipeline, 'schema_version', None) != SCHEMA_VERSION:
+            raise ValueError(f"{path} has schema version {getattr(pipeline, 'schema_version', None)}, "
+                             f"expected {SCHEMA_VERSION}; retrain with train.py")
+        if pipeline.columns != parsed_columns():
+            raise ValueError(f"{path} was saved for columns {pipeline.columns}, "
+                             f"but feature_engineering now produces {parsed_columns()}")
+        if pipeline.n_tfidf != len(vectorizer.vocabulary_):
+            raise ValueError(f"{path} expects {pipeline.n_tfidf} TF-IDF features, "
+                             f"the vectorizer has {len(vectorizer.vocabulary_)}")
+        pipeline.vectorizer = vectorizer
+        pipeline._compile()
+        return pipeline
+
+
+def benchmark(vectorizer, texts: List[str], batch_sizes=(1, 32, 1024), repeats=20):
+    """
+    Time build_features (pandas) against FeaturePipeline.transform.
+
+    Args:
+        vectorizer: A fitted TfidfVectorizer
+        texts: Sample catalog_content strings (cycled to fill each batch)
+        batch_sizes: Batch sizes to time
+        repeats: Timed calls per batch size (best-of is reported)
+
+    Returns:
+        list: One dict per batch size with per-call milliseconds and whether the outputs match
+    """
+    pipeline = FeaturePipeline(vectorizer)
+    results = []
+    for n in batch_sizes:
+        batch = [texts[i % len(texts)] for i in range(n)]
+        paths = (('pandas', lambda: build_features(pd.Series(batch), vectorizer)),
+                 ('pipeline', lambda: pipeline.transform(batch)),
+                 ('pipeline_parse', lambda: [pipeline.parse_one(t) for t in batch]),
+                 ('pandas_parse', lambda: process_text_features(pd.Series(batch))))
+        timings = {}
+        for name, fn in paths:
+            fn()  # warm-up
+            best = float('inf')
+            for _ in range(repeats):
+                start = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - start)
+            timings[f'{name}_ms'] = best * 1000.0
+        same = (pipeline.transform(batch) != build_features(pd.Series(batch), vectorizer)).nnz == 0
+        results.append({'batch_size': n, **timings, 'identical': same})
+    return results
+
+
+SAMPLE_TEXTS = [
+    "Pack of 12 Apple iPhones 16GB with A15 Bionic chip",
+    "Item Name: McCormick Ground Cinnamon, 2.37 oz (Case of 6)",
+    "Twinings Earl Grey tea, Count: 100 bags",
+    "Samsung 55 inch 4K Smart TV",
+    "Organic green tea, IPQ: 3",
+    "Bulk supply of copy paper, 10 reams",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pandas-free feature pipeline")
+    sub = parser.add_subparsers(dest='command', required=True)
+    bench = sub.add_parser('benchmark', help="Compare build_features and FeaturePipeline latency")
+    bench.add_argument('vectorizer', nargs='?', default='vectorizer.pkl')
+    bench.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 1024])
+    bench.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    vectorizer = joblib.load(args.vectorizer)
+    print(f"{'batch':>6} {'pandas ms':>10} {'pipeline ms':>12} {'parse only: pandas':>19} "
+          f"{'pipeline':>9} {'identical':>10}")
+    for r in benchmark(vectorizer, SAMPLE_TEXTS, args.batch_sizes, args.repeats):
+        print(f"{r['batch_size']:>6} {r['pandas_ms']:>10.3f} {r['pipeline_ms']:>12.3f} "
+              f"{r['pandas_parse_ms']:>19.3f} {r['pipeline_parse_ms']:>9.3f} {str(r['identical']):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+On-disk cache of feature matrices, shared by training, the ETL and batch scoring.
+Parsing catalog_content and fitting TF-IDF is most of a training run, yet it
+only changes when the input text, the feature code or the vectorizer settings
+do. Entries are keyed by a hash of all three and hold the parsed features as
+one .npy file per column plus the TF-IDF CSR arrays and the fitted vectorizer,
+all loaded memory-mapped. The ETL and score_csv.py transform with an already
+fitted vectorizer, so they cache the parsed features alone (parse()), keyed by
+the text and the feature code. The least recently used entries are evicted
+once the store grows past its size limit.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import NamedTuple, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import feature_engineering
+from feature_engineering import process_text_features
+
+# Bump when the on-disk layout changes
+STORE_FORMAT = 1
+
+
+def feature_code_version() -> str:
+    """Hash of feature_engineering.py, so editing the parsing code invalidates entries."""
+    with open(feature_engineering.__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+class FeatureSet(NamedTuple):
+    parsed: pd.DataFrame
+    # None for parsed-only entries (see FeatureStore.parse)
+    tfidf: Optional[sparse.csr_matrix]
+    vectorizer: object
+
+
+class FeatureStore:
+    """
+    Directory of cached feature sets, one subdirectory per key.
+
+    Use fit_transform() in place of process_text_features + vectorizer.fit_transform,
+    and parse() in place of process_text_features alone.
+    """
+
+    def __init__(self, root: str = '.feature_store', max_bytes: int = 5 * 1024 ** 3):
+        self.root = root
+        self.max_bytes = max_bytes
+        # Running estimate of the store size; the directory is only scanned
+        # once per instance and again when the estimate passes max_bytes
+        self._bytes = None
+        os.makedirs(root, exist_ok=True)
+
+    def make_key(self, texts: pd.Series, vectorizer) -> str:
+        """
+        Key a feature set by its input text, feature code and vectorizer settings.
+
+        Args:
+            texts: The raw catalog_content column
+            vectorizer: The (unfitted) vectorizer whose parameters shape the TF-IDF
+
+        Returns:
+            str: Hex digest naming the entry
+        """
+        h = hashlib.sha256()
+        h.update(f"format={STORE_FORMAT};code={feature_code_version()};".encode())
+        h.update(json.dumps(vectorizer.get_params(), sort_keys=True, default=repr).encode())
+        h.update(pd.util.hash_pandas_object(texts, index=False).to_numpy().tobytes())
+        return h.hexdigest()[:32]
+
+    def make_parsed_key(self, texts: pd.Series) -> str:
+        """
+        Key parsed-only features by their input text and the feature code.
+
+        Args:
+            texts: The raw catalog_content column
+
+        Returns:
+            str: Hex digest naming the entry
+        """
+        h = hashlib.sha256()
+        h.update(f"format={STORE_FORMAT};code={feature_code_version()};parsed;".encode())
+        h.update(pd.util.hash_pandas_object(texts, index=False).to_numpy().tobytes())
+        return h.hexdigest()[:32]
+
+    def path(self, key: str) -> str:
+        """Directory of the entry for key (other per-entry artifacts may live there too)."""
+        return os.path.join(self.root, key)
+
+    def get(self, key: str) -> Optional[FeatureSet]:
+        """
+        Load an entry memory-mapped, or None if it is not stored.
+
+        Args:
+            key: Entry key from make_key
+
+        Returns:
+            Optional[FeatureSet]: Parsed features, TF-IDF matrix and fitted vectorizer
+        """
+        path = self.path(key)
+        try:
+            with open(os.path.join(path, 'manifest.json')) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:  # not stored, or just evicted by another process
+            return None
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r', allow_pickle=False)
+
+        parsed = pd.DataFrame({col: load(f"parsed_{i}") for i, col in enumerate(manifest['columns'])},
+                              index=load('index'), copy=False)
+        os.utime(path)  # mark as recently used for eviction
+        if 'tfidf_shape' not in manifest:
+            return FeatureSet(parsed, None, None)
+        tfidf = sparse.csr_matrix((load('tfidf_data'), load('tfidf_indices'), load('tfidf_indptr')),
+                                  shape=tuple(manifest['tfidf_shape']), copy=False)
+        vectorizer = joblib.load(os.path.join(path, 'vectorizer.pkl'))
+        return FeatureSet(parsed, tfidf, vectorizer)
+
+    def put(self, key: str, features: FeatureSet) -> None:
+        """
+        Write an entry atomically, then evict old entries beyond max_bytes.
+
+        Args:
+            key: Entry key from make_key
+            features: The feature set to store
+        """
+        tmp = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        try:
+            columns = list(features.parsed.columns)
+            for i, col in enumerate(columns):
+                values = features.parsed[col].to_numpy()
+                if values.dtype == object:
+                    values = values.astype(str)  # fixed-width unicode, so it can be mmapped
+                np.save(os.path.join(tmp, f"parsed_{i}.npy"), values, allow_pickle=False)
+            np.save(os.path.join(tmp, 'index.npy'), features.parsed.index.to_numpy(), allow_pickle=False)
+            manifest = {'columns': columns, 'created': time.time()}
+            if features.tfidf is not None:
+                tfidf = features.tfidf.tocsr()
+                for part in ('data', 'indices', 'indptr'):
+                    np.save(os.path.join(tmp, f"tfidf_{part}.npy"), getattr(tfidf, part))
+                joblib.dump(features.vectorizer, os.path.join(tmp, 'vectorizer.pkl'))
+                manifest['tfidf_shape'] = list(tfidf.shape)
+            with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f)
+            size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+            os.replace(tmp, self.path(key))
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(self.path(key)):  # lost a race with another writer
+                raise
+            return
+        if self._bytes is None:
+            self._bytes = sum(entry_size for _, entry_size, _ in self._entries())
+        else:
+            self._bytes += size
+        if self._bytes > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path) and not name.startswith('.tmp-'):
+                try:
+                    size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                    yield os.path.getmtime(path), size, path
+                except FileNotFoundError:  # evicted by another process meanwhile
+                    continue
+
+    def evict(self) -> list:
+        """
+        Remove least recently used entries until the store fits in max_bytes.
+
+        Returns:
+            list: Paths of the removed entries
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        # The newest entry is always kept, even if it alone exceeds the limit
+        for _, size, path in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed.append(path)
+        self._bytes = total
+        return removed
+
+    def fit_transform(self, texts: pd.Series, vectorizer, key: Optional[str] = None) -> FeatureSet:
+        """
+        Parse texts and fit the vectorizer on them, or load the result of an identical earlier run.
+
+        Args:
+            texts: The raw catalog_content column
+            vectorizer: An unfitted TfidfVectorizer
+            key: make_key(texts, vectorizer), if the caller already has it (saves hashing the texts again)
+
+        Returns:
+            FeatureSet: Parsed features, TF-IDF matrix and the fitted vectorizer
+        """
+        key = key or self.make_key(texts, vectorizer)
+        cached = self.get(key)
+        if cached is not None:
+            print(f"Loaded cached features {key}")
+            return cached
+        features = FeatureSet(process_text_features(texts),
+                              vectorizer.fit_transform(texts.fillna('')), vectorizer)
+        self.put(key, features)
+        return features
+
+    def parse(self, texts: pd.Series) -> pd.DataFrame:
+        """
+        Parse texts, or load the parsed features of an identical earlier call.
+
+        Args:
+            texts: The raw catalog_content column
+
+        Returns:
+            pd.DataFrame: process_text_features(texts), indexed like texts
+        """
+        key = self.make_parsed_key(texts)
+        cached = self.get(key)
+        if cached is not None:
+            # The key ignores the index, so the entry may come from other row labels
+            return cached.parsed.set_axis(texts.index)
+        parsed = process_text_features(texts)
+        self.put(key, FeatureSet(parsed, None, None))
+        return parsed
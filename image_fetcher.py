@@ -0,0 +1,262 @@
+"""
+Concurrent product image downloader with a content-addressed cache.
+Replaces the notebook's _download_worker loop. A bounded thread pool shares
+one pooled requests.Session (keep-alive connections, retries with backoff
+on connection errors, 429 and 5xx), and a semaphore per host caps the
+requests in flight to each image server. Images are stored under their
+SHA-256 (images/ab/ab12....jpg), so the same picture linked from several
+listings is written once. Every result is appended to a JSON-lines
+manifest (sample_id, url, sha256, path, status) that embedding steps can
+stream with iter_manifest(); a rerun skips items the manifest already has.
+
+Usage:
+    python image_fetcher.py train.csv --output images --workers 32 --per-host 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+MANIFEST = 'manifest.jsonl'
+CONTENT_EXTENSIONS = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/gif': '.gif', 'image/webp': '.webp'}
+# Larger responses are not product images
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+
+def _extension(url: str, content_type: str) -> str:
+    ext = CONTENT_EXTENSIONS.get(content_type.split(';')[0].strip().lower())
+    if ext:
+        return ext
+    ext = os.path.splitext(urlsplit(url).path)[1].lower()
+    return ext if ext in CONTENT_EXTENSIONS.values() or ext == '.jpeg' else '.img'
+
+
+def iter_manifest(path: str, status: Optional[str] = 'ok') -> Iterator[dict]:
+    """
+    Stream manifest records without loading the whole file.
+
+    Args:
+        path: The manifest.jsonl
+        status: Only records with this status ('ok' or 'failed'); None for all
+
+    Yields:
+        dict: sample_id, url, sha256, path (relative to the image root), bytes, status, error
+    """
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if status is None or record['status'] == status:
+                    yield record
+
+
+class ImageFetcher:
+    """
+    Download (sample_id, url) pairs into a content-addressed directory.
+
+    fetch() can be called repeatedly; counters accumulate and stats()
+    reports them.
+    """
+
+    def __init__(self, root: str = 'images', workers: int = 16, per_host: int = 8,
+                 timeout: float = 20, retries: int = 3, backoff: float = 0.5,
+                 session: Optional[requests.Session] = None):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST)
+        self.workers = workers
+        self.per_host = per_host
+        self.timeout = timeout
+        os.makedirs(root, exist_ok=True)
+
+        if session is None:
+            session = requests.Session()
+            retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=frozenset(['GET']), raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        # Resume state: finished items, and where each URL's image already is
+        self._done = {}
+        self._by_url = {}
+        if os.path.exists(self.manifest_path):
+            for record in iter_manifest(self.manifest_path):
+                if os.path.exists(os.path.join(root, record['path'])):
+                    self._done[str(record['sample_id'])] = record['url']
+                    self._by_url[record['url']] = record
+        self._counts = {'requested': 0, 'downloaded': 0, 'duplicates': 0, 'cached': 0, 'failed': 0}
+        self._bytes = 0
+        self._seconds = 0.0
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def _count(self, key: str, n_bytes: int = 0) -> None:
+        with self._lock:
+            self._counts[key] += 1
+            self._bytes += n_bytes
+
+    def _download(self, url: str) -> Tuple[str, str, int, bool]:
+        """Fetch url into the store; returns (sha256, relative path, bytes, already stored)."""
+        with self._slot(url):
+            with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                content_type = response.headers.get('Content-Type', '')
+                h = hashlib.sha256()
+                chunks, size = [], 0
+                for chunk in response.iter_content(chunk_size=65536):
+                    size += len(chunk)
+                    if size > MAX_IMAGE_BYTES:
+                        raise ValueError(f"Image is larger than {MAX_IMAGE_BYTES} bytes")
+                    h.update(chunk)
+                    chunks.append(chunk)
+        sha = h.hexdigest()
+        # The content is known by its hash alone, whatever extension it was first stored under
+        directory = os.path.join(self.root, sha[:2])
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if name.startswith(sha + '.'):
+                    return sha, os.path.join(sha[:2], name), size, True
+        relative = os.path.join(sha[:2], sha + _extension(url, content_type))
+        path = os.path.join(self.root, relative)
+        os.makedirs(directory, exist_ok=True)
+        # Written under a temporary name, so a crash never leaves a partial image
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+        return sha, relative, size, False
+
+    def fetch_one(self, sample_id, url) -> Optional[dict]:
+        """
+        Fetch one item.
+
+        Returns:
+            Optional[dict]: The new manifest record, or None if the manifest already had the item
+        """
+        self._count('requested')
+        key = str(sample_id)
+        if not isinstance(url, str) or not url:
+            self._count('failed')
+            return {'sample_id': sample_id, 'url': url, 'status': 'failed', 'error': 'missing url'}
+        if self._done.get(key) == url:
+            self._count('cached')
+            return None
+        known = self._by_url.get(url)
+        if known is not None:
+            self._count('cached')
+            return {**known, 'sample_id': sample_id}
+        try:
+            sha, relative, size, stored = self._download(url)
+        except (requests.RequestException, ValueError, OSError) as e:
+            self._count('failed')
+            return {'sample_id': sample_id, 'url': url, 'status': 'failed', 'error': str(e)}
+        self._count('duplicates' if stored else 'downloaded', size)
+        record = {'sample_id': sample_id, 'url': url, 'sha256': sha, 'path': relative,
+                  'bytes': size, 'status': 'ok'}
+        with self._lock:
+            self._by_url[url] = record
+        return record
+
+    def fetch(self, items: Iterable[Tuple[object, str]]) -> dict:
+        """
+        Fetch (sample_id, url) pairs concurrently, appending results to the manifest
+        in completion order (not input order).
+
+        Items are pulled lazily, with at most 4 per worker in flight, so a
+        generator over a large CSV is never fully materialized.
+
+        Returns:
+            dict: stats() after the run
+        """
+        start = time.perf_counter()
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool, \
+                open(self.manifest_path, 'a') as manifest:
+            def drain(return_when):
+                nonlocal pending
+                done, pending = wait(pending, return_when=return_when)
+                for future in done:
+                    record = future.result()
+                    if record is not None:
+                        manifest.write(json.dumps(record) + '\n')
+                        if record['status'] == 'ok':
+                            self._done[str(record['sample_id'])] = record['url']
+                manifest.flush()
+
+            for sample_id, url in items:
+                pending.add(pool.submit(self.fetch_one, sample_id, url))
+                if len(pending) >= 4 * self.workers:
+                    drain(FIRST_COMPLETED)
+            drain(ALL_COMPLETED)
+        self._seconds += time.perf_counter() - start
+        return self.stats()
+
+    def stats(self) -> dict:
+        """Counters, throughput and cache hit rate (manifest and content-hash hits over requests)."""
+        with self._lock:
+            counts = dict(self._counts)
+            n_bytes, seconds = self._bytes, self._seconds
+        fetched = counts['downloaded'] + counts['duplicates']
+        return {
+            **counts,
+            'bytes': n_bytes,
+            'seconds': round(seconds, 3),
+            'images_per_second': round(fetched / seconds, 1) if seconds else 0.0,
+            'megabytes_per_second': round(n_bytes / seconds / 1e6, 2) if seconds else 0.0,
+            'cache_hit_rate': round((counts['cached'] + counts['duplicates']) / counts['requested'], 4)
+            if counts['requested'] else 0.0,
+        }
+
+
+def csv_items(csv_path: str, url_column: str = 'image_link', id_column: str = 'sample_id',
+              chunksize: int = 10000) -> Iterator[Tuple[object, str]]:
+    """(sample_id, url) pairs from a CSV, read in chunks."""
+    import pandas as pd
+
+    for chunk in pd.read_csv(csv_path, usecols=[id_column, url_column], chunksize=chunksize):
+        for sample_id, url in zip(chunk[id_column].tolist(), chunk[url_column].tolist()):
+            yield sample_id, url if isinstance(url, str) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download product images into a content-addressed cache")
+    parser.add_argument('csv', help="CSV with sample_id and image_link columns")
+    parser.add_argument('--output', default='images')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--per-host', type=int, default=8, help="Concurrent requests per image host")
+    parser.add_argument('--timeout', type=float, default=20)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--url-column', default='image_link')
+    parser.add_argument('--id-column', default='sample_id')
+    args = parser.parse_args()
+
+    fetcher = ImageFetcher(args.output, args.workers, args.per_host, args.timeout, args.retries)
+    stats = fetcher.fetch(csv_items(args.csv, args.url_column, args.id_column))
+    print(f"✅ {stats['downloaded']} downloaded, {stats['duplicates']} duplicate images, "
+          f"{stats['cached']} already cached, {stats['failed']} failed "
+          f"in {stats['seconds']:.1f}s ({stats['images_per_second']} images/s, "
+          f"{stats['megabytes_per_second']} MB/s, cache hit rate {stats['cache_hit_rate']:.1%})")
+    print(f"Manifest: {fetcher.manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Hot-path latency and error metrics for the pricing API.
+Each request stage (body parsing, regex features, TF-IDF transform, matrix
+assembly, model predict, response serialization) is timed with
+time.perf_counter and recorded in a fixed-bucket histogram; in-flight
+requests, errors by type and the loaded model version are tracked alongside.
+Recording is a few list/dict updates under one lock, so it stays on in
+production. render() writes everything in the Prometheus text format.
+
+Under serve.py --workers N a scrape reaches an arbitrary worker, so each
+worker's counters alone would jump around between scrapes. With a shared
+directory, every worker publishes a JSON snapshot of its metrics there
+(periodically and on each scrape) and render() reports the sum over all
+workers' snapshots. Snapshots of exited workers are kept, so totals never go
+backwards when a worker is restarted; only their in-flight gauge is dropped.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Sequence
+
+from micro_batcher import Histogram
+
+STAGES = ('parse', 'process_text_features', 'vectorizer_transform', 'assembly',
+          'model_predict', 'serialization')
+
+# Upper bounds in seconds: 50us .. 2.5s
+LATENCY_BUCKETS_SECONDS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                           0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _render_histogram(lines: list, name: str, histogram: Histogram, labels: str = '',
+                      scale: float = 1.0) -> None:
+    """Append a histogram's cumulative buckets, sum and count (values multiplied by scale)."""
+    prefix = f'{labels},' if labels else ''
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound * scale:g}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    suffix = f'{{{labels}}}' if labels else ''
+    lines.append(f'{name}_sum{suffix} {histogram.sum * scale:.9g}')
+    lines.append(f'{name}_count{suffix} {histogram.count}')
+
+
+class RequestMetrics:
+    """
+    Per-stage latency histograms, in-flight gauge and error counters.
+
+    Feature and predict stages are timed per scoring call, which covers a
+    whole micro-batch or /predict_batch request rather than one item.
+    shared_dir turns on cross-worker aggregation (see the module docstring).
+    """
+
+    def __init__(self, stages: Sequence[str] = STAGES,
+                 buckets: Sequence[float] = LATENCY_BUCKETS_SECONDS, shared_dir: Optional[str] = None):
+        self.shared_dir = shared_dir
+        self._lock = threading.Lock()
+        self.latency = {stage: Histogram(buckets) for stage in stages}
+        self.errors: Dict[str, int] = {}
+        self.requests: Dict[str, int] = {}
+        self.in_flight = 0
+        self.started = time.time()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.latency[stage].observe(seconds)
+
+    def observe_stages(self, timings: Iterable) -> None:
+        """Record several (stage, seconds) pairs under one lock acquisition."""
+        with self._lock:
+            for stage, seconds in timings:
+                self.latency[stage].observe(seconds)
+
+    def error(self, error_type: str, count: int = 1) -> None:
+        with self._lock:
+            self.errors[error_type] = self.errors.get(error_type, 0) + count
+
+    def request_started(self, endpoint: str) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def request_finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def snapshot(self, extra_histograms: Iterable = ()) -> dict:
+        """
+        This process's metrics as plain, JSON-serializable data.
+
+        Args:
+            extra_histograms: (name, help, Histogram, scale) tuples to include
+
+        Returns:
+            dict: Counters, the in-flight gauge and histogram buckets (see render_snapshot)
+        """
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'started': self.started,
+                'in_flight': self.in_flight,
+                'requests': dict(self.requests),
+                'errors': dict(self.errors),
+                'latency': {stage: _histogram_state(h) for stage, h in self.latency.items()},
+                'extra': [{'name': name, 'help': help_text, 'scale': scale, **_histogram_state(h)}
+                          for name, help_text, h, scale in extra_histograms],
+            }
+
+    def publish(self, extra_histograms: Iterable = ()) -> None:
+        """Write this process's snapshot into shared_dir (no-op without one)."""
+        if self.shared_dir:
+            write_snapshot(self.shared_dir, self.snapshot(extra_histograms))
+
+    def render(self, model_version: str, model_info: Optional[dict] = None,
+               extra_histograms: Iterable = ()) -> str:
+        """
+        Everything in the Prometheus text exposition format.
+
+        With a shared_dir this is the sum over every worker's published snapshot.
+
+        Args:
+            model_version: Fingerprint of the loaded artifacts
+            model_info: Extra labels for the model info metric (e.g. predictor backend)
+            extra_histograms: (name, help, Histogram, scale) tuples rendered as-is
+
+        Returns:
+            str: The /metrics response body
+        """
+        state = self.snapshot(extra_histograms)
+        if self.shared_dir:
+            write_snapshot(self.shared_dir, state)
+            state = merge_snapshots(read_snapshots(self.shared_dir))
+        return render_snapshot(state, model_version, model_info)
+
+
+def _histogram_state(histogram: Histogram) -> dict:
+    return {'buckets': list(histogram.buckets), 'counts': list(histogram.counts),
+            'count': histogram.count, 'sum': histogram.sum}
+
+
+def _histogram_from_state(state: dict) -> Histogram:
+    histogram = Histogram(state['buckets'])
+    histogram.counts = list(state['counts'])
+    histogram.count = state['count']
+    histogram.sum = state['sum']
+    return histogram
+
+
+def _add_histogram_state(total: dict, state: dict) -> None:
+    total['counts'] = [a + b for a, b in zip(total['counts'], state['counts'])]
+    total['count'] += state['count']
+    total['sum'] += state['sum']
+
+
+def write_snapshot(directory: str, snapshot: dict) -> None:
+    """Atomically write a snapshot as <directory>/<pid>.json."""
+    path = os.path.join(directory, f"{snapshot['pid']}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+
+
+def read_snapshots(directory: str) -> list:
+    """All workers' snapshots in directory (files removed or half-read meanwhile are skipped)."""
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots: Sequence[dict]) -> dict:
+    """
+    Sum several workers' snapshots into one.
+
+    Counters and histograms are summed over every snapshot; the in-flight
+    gauge only over workers that are still running. 'workers' is the number
+    of running workers and 'started' the earliest start time.
+
+    Args:
+        snapshots: Snapshots from RequestMetrics.snapshot
+
+    Returns:
+        dict: A snapshot render_snapshot accepts
+    """
+    merged = {'started': None, 'in_flight': 0, 'workers': 0, 'requests': {}, 'errors': {},
+              'latency': {}, 'extra': []}
+    extra = {}
+    for snapshot in sorted(snapshots, key=lambda s: s['pid']):
+        if _pid_alive(snapshot['pid']):
+            merged['workers'] += 1
+            merged['in_flight'] += snapshot['in_flight']
+        merged['started'] = (snapshot['started'] if merged['started'] is None
+                             else min(merged['started'], snapshot['started']))
+        for key in ('requests', 'errors'):
+            for name, count in snapshot[key].items():
+                merged[key][name] = merged[key].get(name, 0) + count
+        for stage, state in snapshot['latency'].items():
+            if stage in merged['latency']:
+                _add_histogram_state(merged['latency'][stage], state)
+            else:
+                merged['latency'][stage] = dict(state)
+        for state in snapshot['extra']:
+            if state['name'] in extra:
+                _add_histogram_state(extra[state['name']], state)
+            else:
+                extra[state['name']] = dict(state)
+                merged['extra'].append(extra[state['name']])
+    return merged
+
+
+def render_snapshot(state: dict, model_version: str, model_info: Optional[dict] = None) -> str:
+    """
+    A (possibly merged) snapshot in the Prometheus text exposition format.
+
+    Args:
+        state: From RequestMetrics.snapshot or merge_snapshots
+        model_version: Fingerprint of the loaded artifacts
+        model_info: Extra labels for the model info metric (e.g. predictor backend)
+
+    Returns:
+        str: The /metrics response body
+    """
+    lines = ['# HELP pricing_stage_latency_seconds Latency of each request stage.',
+             '# TYPE pricing_stage_latency_seconds histogram']
+    for stage, histogram in state['latency'].items():
+        _render_histogram(lines, 'pricing_stage_latency_seconds', _histogram_from_state(histogram),
+                          f'stage="{stage}"')
+    lines += ['# HELP pricing_requests_in_flight Prediction requests being handled.',
+              '# TYPE pricing_requests_in_flight gauge',
+              f'pricing_requests_in_flight {state["in_flight"]}',
+              '# HELP pricing_requests_total Prediction requests received.',
+              '# TYPE pricing_requests_total counter']
+    lines += [f'pricing_requests_total{{endpoint="{_escape(endpoint)}"}} {count}'
+              for endpoint, count in sorted(state['requests'].items())]
+    lines += ['# HELP pricing_errors_total Failed requests and items by error type.',
+              '# TYPE pricing_errors_total counter']
+    lines += [f'pricing_errors_total{{type="{_escape(kind)}"}} {count}'
+              for kind, count in sorted(state['errors'].items())]
+    for histogram in state['extra']:
+        name = histogram['name']
+        lines += [f'# HELP {name} {histogram["help"]}', f'# TYPE {name} histogram']
+        _render_histogram(lines, name, _histogram_from_state(histogram), scale=histogram['scale'])
+
+    labels = {'version': model_version, **(model_info or {})}
+    label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    lines += ['# HELP pricing_model_info Loaded model artifacts.',
+              '# TYPE pricing_model_info gauge',
+              f'pricing_model_info{{{label_text}}} 1']
+    if 'workers' in state:
+        lines += ['# HELP pricing_workers Running worker processes whose metrics are summed here.',
+                  '# TYPE pricing_workers gauge',
+                  f'pricing_workers {state["workers"]}']
+    lines += ['# HELP pricing_process_start_time_seconds Start time of the process since the epoch.',
+              '# TYPE pricing_process_start_time_seconds gauge',
+              f'pricing_process_start_time_seconds {state["started"]:.3f}']
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,156 @@
+"""
+Dynamic micro-batching for the pricing API.
+Coalesces concurrent single-item requests into one batched predict call,
+so the vectorized feature/predict path is used even for /predict traffic.
+"""
+import asyncio
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Sequence
+
+# Histogram bucket upper bounds
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+QUEUE_WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and max."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> dict:
+        labels = [str(b) for b in self.buckets] + ['+Inf']
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'max': self.max,
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class MicroBatcher:
+    """
+    Asyncio request coalescer.
+
+    Callers await submit(item). A collector task gathers queued items until
+    max_batch_size is reached or max_wait_ms has passed since the first one,
+    then runs predict_fn on the whole batch in a worker thread and resolves
+    each caller's future with its own result.
+
+    predict_fn takes a list of items and returns a sequence of results in
+    the same order; an Exception instance in that sequence is raised to the
+    matching caller only. A sequence of the wrong length fails every caller
+    in the batch.
+    """
+
+    def __init__(self, predict_fn: Callable[[List], Sequence], max_batch_size: int = 64,
+                 max_wait_ms: float = 2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='micro-batcher')
+        self._loop = None
+        self._queue = None
+        self._task = None
+        self._stats_lock = threading.Lock()
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+
+    def _ensure_started(self) -> None:
+        # Bind to the running loop; rebind if the app is now served by a new one
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._task = loop.create_task(self._collect())
+
+    async def submit(self, item):
+        """
+        Queue one item for the next batch and wait for its result.
+
+        Args:
+            item: A single predict_fn input (e.g. a catalog_content string)
+
+        Returns:
+            The result predict_fn produced for this item
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000.0
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    # Window closed: still take anything that is already waiting
+                    try:
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._run_batch(batch)
+
+    async def _run_batch(self, batch) -> None:
+        dispatched = time.perf_counter()
+        with self._stats_lock:
+            self.batch_sizes.observe(len(batch))
+            for _, _, enqueued in batch:
+                self.queue_wait_ms.observe((dispatched - enqueued) * 1000.0)
+
+        items = [item for item, _, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.predict_fn, items)
+        except Exception as e:
+            results = [e] * len(batch)
+        if len(results) != len(batch):
+            # Results can no longer be matched to callers; fail them all rather than leave any waiting
+            error = RuntimeError(f"predict_fn returned {len(results)} results for {len(batch)} items")
+            results = [error] * len(batch)
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():  # caller went away (e.g. client disconnect)
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """
+        Report batching metrics.
+
+        Returns:
+            dict: batch size and queue wait (ms) histograms plus the settings
+        """
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_ms,
+                'queued': self._queue.qsize() if self._queue is not None else 0,
+                'batch_size': self.batch_sizes.snapshot(),
+                'queue_wait_ms': self.queue_wait_ms.snapshot(),
+            }
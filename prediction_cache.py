@@ -0,0 +1,143 @@
+"""
+In-process prediction cache for the pricing API.
+Maps a hash of the normalized catalog_content (plus the model artifact
+version) to the predicted price, with LRU eviction and an optional TTL.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+
+def normalize_catalog_content(text: str) -> str:
+    """
+    Normalize a description for use as a cache key.
+
+    Every feature the model sees (brand, bulk flag, quantity, TF-IDF) is
+    computed from the lowercased text and ignores trailing whitespace, so
+    texts that differ only in those respects always get the same price.
+
+    Args:
+        text: The raw catalog_content
+
+    Returns:
+        str: The normalized text
+    """
+    return text.lower().rstrip()
+
+
+def artifact_fingerprint(paths: Iterable[str]) -> str:
+    """
+    Build a cheap version string for the model artifacts on disk.
+
+    Uses each file's size and modification time, so it changes whenever
+    model.pkl or vectorizer.pkl is rewritten, without reading the files.
+
+    Args:
+        paths: The artifact file paths
+
+    Returns:
+        str: A short hex digest identifying the current artifact version
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        st = os.stat(path)
+        h.update(f"{path}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()[:16]
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of predicted prices.
+
+    Entries are keyed by (artifact version, sha256 of the normalized text).
+    A size bound evicts the least recently used entry; an optional TTL
+    expires entries on read.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: Optional[float] = None, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(text: str, version: str) -> Tuple[str, str]:
+        digest = hashlib.sha256(normalize_catalog_content(text).encode('utf-8')).hexdigest()
+        return version, digest
+
+    def get(self, text: str, version: str) -> Optional[float]:
+        """
+        Look up a cached price.
+
+        Args:
+            text: The raw catalog_content
+            version: The artifact version the caller is serving
+
+        Returns:
+            Optional[float]: The cached price, or None on a miss
+        """
+        if self.max_size <= 0:
+            return None
+        key = self.make_key(text, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None \
+                    and self._clock() - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, text: str, version: str, price: float) -> None:
+        """
+        Store a predicted price, evicting the least recently used entries if full.
+
+        Args:
+            text: The raw catalog_content
+            version: The artifact version that produced the price
+            price: The predicted price
+        """
+        if self.max_size <= 0:
+            return
+        key = self.make_key(text, version)
+        with self._lock:
+            self._entries[key] = (price, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Report cache counters.
+
+        Returns:
+            dict: hits, misses, hit_rate, evictions, size, max_size and ttl_seconds
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+            }
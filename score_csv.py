@@ -0,0 +1,199 @@
+"""
+Streaming bulk scoring for catalog CSVs.
+Reads the input in chunks, prices them in a process pool with the saved
+model and vectorizer, and appends sample_id,price rows to the output in
+input order (the format of test_out.csv). Memory stays bounded by the
+chunk size and the number of chunks in flight, not by the file size.
+
+With --feature-store, parsed text features are cached in the shared
+feature store (see feature_store.py), so rescoring the same file with a
+retrained model skips the parsing. It is off by default: a one-off run over
+new rows would only write entries that are never read.
+
+A progress file next to the output records the last completed chunk, so
+an interrupted run picks up where it stopped when started again.
+
+Usage:
+    python score_csv.py test.csv test_out.csv --chunksize 20000 --workers 4
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from config import get_feature_store_max_bytes
+from feature_engineering import assemble_features, process_text_features
+from feature_store import FeatureStore
+
+# Set in each pool worker by _init_worker
+_model = None
+_vectorizer = None
+_num_threads = 0
+_store = None
+
+
+def _init_worker(model_path: str, vectorizer_path: str, num_threads: int,
+                 feature_store_dir: str = None) -> None:
+    global _model, _vectorizer, _num_threads, _store
+    _model = joblib.load(model_path)
+    _vectorizer = joblib.load(vectorizer_path)
+    _num_threads = num_threads
+    _store = (FeatureStore(feature_store_dir, get_feature_store_max_bytes())
+              if feature_store_dir else None)
+
+
+def score_chunk(ids: np.ndarray, texts: np.ndarray) -> pd.DataFrame:
+    """
+    Price one chunk in a pool worker.
+
+    Args:
+        ids: The chunk's sample ids
+        texts: The chunk's catalog_content values
+
+    Returns:
+        pd.DataFrame: sample_id and price columns, in chunk order
+    """
+    text_series = pd.Series(texts)
+    parsed = _store.parse(text_series) if _store is not None else process_text_features(text_series)
+    features = assemble_features(parsed, _vectorizer.transform(text_series.fillna('')))
+    log_price = _model.predict(features, num_threads=_num_threads)
+    return pd.DataFrame({'sample_id': ids, 'price': np.expm1(log_price)})
+
+
+def _progress_path(output_path: str) -> str:
+    return output_path + '.progress'
+
+
+def _load_progress(output_path: str, input_path: str, chunksize: int) -> dict:
+    fresh = {'input': os.path.abspath(input_path), 'chunksize': chunksize,
+             'chunks_done': 0, 'rows_done': 0, 'output_bytes': 0}
+    path = _progress_path(output_path)
+    if not os.path.exists(path) or not os.path.exists(output_path):
+        return fresh
+    with open(path) as f:
+        progress = json.load(f)
+    if progress['input'] != fresh['input'] or progress['chunksize'] != chunksize:
+        raise ValueError(
+            f"{path} belongs to a run over {progress['input']} with chunksize "
+            f"{progress['chunksize']}; delete it (or the output) to start over")
+    return progress
+
+
+def _save_progress(output_path: str, progress: dict) -> None:
+    path = _progress_path(output_path)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(progress, f)
+    os.replace(tmp, path)
+
+
+def score_csv(input_path: str, output_path: str, model_path: str = 'model.pkl',
+              vectorizer_path: str = 'vectorizer.pkl', chunksize: int = 10000,
+              workers: int = None, id_column: str = 'sample_id',
+              text_column: str = 'catalog_content', feature_store_dir: str = None) -> dict:
+    """
+    Score a catalog CSV chunk by chunk, resuming a previous partial run.
+
+    Args:
+        input_path: CSV with id_column and text_column
+        output_path: Where sample_id,price rows are written
+        model_path: Saved LightGBM model
+        vectorizer_path: Saved TF-IDF vectorizer
+        chunksize: Rows per chunk
+        workers: Scoring processes (default: CPU count)
+        id_column: Name of the id column in the input
+        text_column: Name of the description column in the input
+        feature_store_dir: Feature store for the parsed features (None: no caching)
+
+    Returns:
+        dict: rows and chunks scored in this run, chunks skipped on resume,
+        elapsed seconds and rows per second
+    """
+    workers = workers or os.cpu_count() or 1
+    # Split the cores between processes instead of letting each one use all of them
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+    progress = _load_progress(output_path, input_path, chunksize)
+    skipped = progress['chunks_done']
+
+    if skipped:
+        # Drop anything written after the last checkpoint (e.g. a torn chunk)
+        with open(output_path, 'r+b') as f:
+            f.truncate(progress['output_bytes'])
+        print(f"Resuming after chunk {skipped} ({progress['rows_done']} rows already scored)")
+    else:
+        with open(output_path, 'w', newline='') as f:
+            f.write("sample_id,price\n")
+        progress['output_bytes'] = os.path.getsize(output_path)
+        _save_progress(output_path, progress)
+
+    start = time.perf_counter()
+    rows = chunks = 0
+    reader = pd.read_csv(input_path, usecols=[id_column, text_column], chunksize=chunksize)
+    pending = deque()
+
+    def write_next():
+        nonlocal rows, chunks
+        result = pending.popleft().result()
+        with open(output_path, 'a', newline='') as f:
+            result.to_csv(f, header=False, index=False)
+        rows += len(result)
+        chunks += 1
+        progress['chunks_done'] += 1
+        progress['rows_done'] += len(result)
+        progress['output_bytes'] = os.path.getsize(output_path)
+        _save_progress(output_path, progress)
+        elapsed = time.perf_counter() - start
+        print(f"Chunk {progress['chunks_done']}: {progress['rows_done']} rows, "
+              f"{rows / elapsed:,.0f} rows/s")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, vectorizer_path, num_threads, feature_store_dir)) as pool:
+        for i, chunk in enumerate(reader):
+            if i < skipped:
+                continue
+            pending.append(pool.submit(score_chunk, chunk[id_column].to_numpy(),
+                                       chunk[text_column].to_numpy(dtype=object)))
+            # Keep at most two chunks per worker in memory
+            if len(pending) >= 2 * workers:
+                write_next()
+        while pending:
+            write_next()
+
+    os.remove(_progress_path(output_path))
+    elapsed = time.perf_counter() - start
+    stats = {
+        'rows': rows,
+        'chunks': chunks,
+        'skipped_chunks': skipped,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed > 0 else 0.0,
+    }
+    print(f"Scored {rows} rows in {elapsed:.1f}s ({stats['rows_per_second']:,.0f} rows/s)")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a catalog CSV with the saved model")
+    parser.add_argument('input', help="CSV with sample_id and catalog_content columns")
+    parser.add_argument('output', help="Output CSV (sample_id,price)")
+    parser.add_argument('--model', default='model.pkl')
+    parser.add_argument('--vectorizer', default='vectorizer.pkl')
+    parser.add_argument('--chunksize', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--id-column', default='sample_id')
+    parser.add_argument('--text-column', default='catalog_content')
+    parser.add_argument('--feature-store', default=None,
+                        help="Cache parsed features in this feature store directory (e.g. .feature_store)")
+    args = parser.parse_args(argv)
+    score_csv(args.input, args.output, args.model, args.vectorizer, args.chunksize,
+              args.workers, args.id_column, args.text_column, args.feature_store)
+
+
+if __name__ == '__main__':
+    main()
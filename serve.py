@@ -0,0 +1,183 @@
+"""
+Pre-fork launcher for the pricing API.
+Loads model.pkl / vectorizer.pkl once in the parent, then forks the uvicorn
+workers so they share the artifact pages copy-on-write instead of each
+worker unpickling its own copy.
+
+Usage:
+    python serve.py --host 0.0.0.0 --port 8000 --workers 4
+"""
+import argparse
+import gc
+import glob
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import Optional
+
+import uvicorn
+
+from config import get_web_concurrency
+
+# A worker that keeps dying (e.g. on boot) is restarted with a growing delay,
+# and the server gives up once this many exits fall within the window
+MAX_RESTARTS = 5
+RESTART_WINDOW_SECONDS = 60.0
+RESTART_BASE_DELAY_SECONDS = 0.5
+RESTART_MAX_DELAY_SECONDS = 30.0
+
+
+class RestartLimiter:
+    """Exponential restart backoff with a cap on worker exits per time window."""
+
+    def __init__(self, max_restarts: int = MAX_RESTARTS, window_seconds: float = RESTART_WINDOW_SECONDS,
+                 base_delay: float = RESTART_BASE_DELAY_SECONDS,
+                 max_delay: float = RESTART_MAX_DELAY_SECONDS, clock=time.monotonic):
+        self.max_restarts = max_restarts
+        self.window_seconds = window_seconds
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self._exits = deque()
+
+    def record_exit(self) -> Optional[float]:
+        """
+        Register a worker exit.
+
+        Returns:
+            Optional[float]: Seconds to wait before restarting, or None when
+            more than max_restarts exits fell within the window
+        """
+        now = self.clock()
+        self._exits.append(now)
+        while self._exits and self._exits[0] < now - self.window_seconds:
+            self._exits.popleft()
+        recent = len(self._exits)
+        if recent > self.max_restarts:
+            return None
+        return min(self.max_delay, self.base_delay * 2 ** (recent - 1))
+
+
+def run_worker(app_module, config, sock) -> None:
+    # Startup time reported by /readyz is measured from the fork
+    app_module.BOOT_STARTED = time.perf_counter()
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int) -> None:
+    """
+    Load the artifacts, bind the socket and supervise forked workers.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind
+        workers: Number of worker processes
+    """
+    start = time.perf_counter()
+    multi_process = workers > 1 and hasattr(os, 'fork')
+    own_metrics_dir = None
+    if multi_process:
+        # Workers publish metrics snapshots here and /metrics sums them; must be
+        # set before app is imported. Snapshots from an earlier run are dropped.
+        if not os.getenv('METRICS_MULTIPROC_DIR'):
+            own_metrics_dir = tempfile.mkdtemp(prefix='pricing-metrics-')
+            os.environ['METRICS_MULTIPROC_DIR'] = own_metrics_dir
+        for path in glob.glob(os.path.join(os.environ['METRICS_MULTIPROC_DIR'], '*.json')):
+            os.remove(path)
+    # Importing app loads the artifacts. Nothing is scored here: LightGBM's
+    # OpenMP pool must not be started before forking, so each worker warms up
+    # on its own before it reports ready.
+    import app as app_module
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"Parent {os.getpid()} loaded artifacts in {load_ms:.0f} ms, "
+          f"memory {app_module.process_memory_mb()}")
+
+    if not multi_process:
+        uvicorn.run(app_module.app, host=host, port=port)
+        return
+
+    # Move everything loaded so far out of the GC's reach, so collections in
+    # the workers do not touch (and un-share) the artifact pages
+    gc.collect()
+    gc.freeze()
+
+    config = uvicorn.Config(app_module.app, host=host, port=port)
+    sock = config.bind_socket()
+    children = {}
+    stopping = False
+
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 1
+            try:
+                run_worker(app_module, config, sock)
+                code = 0
+            finally:
+                os._exit(code)
+        children[pid] = slot
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(workers):
+        spawn(slot)
+    print(f"Parent {os.getpid()} started {workers} workers: {sorted(children)}")
+
+    limiter = RestartLimiter()
+    gave_up = False
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is None or stopping:
+            continue
+        delay = limiter.record_exit()
+        if delay is None:
+            print(f"Worker {pid} exited with status {status}; more than {limiter.max_restarts} "
+                  f"exits in {limiter.window_seconds:.0f}s, shutting down")
+            gave_up = True
+            stop(None, None)
+            continue
+        print(f"Worker {pid} exited with status {status}; restarting in {delay:.1f}s")
+        time.sleep(delay)
+        if not stopping:
+            spawn(slot)
+    sock.close()
+    if own_metrics_dir:
+        shutil.rmtree(own_metrics_dir, ignore_errors=True)
+    if gave_up:
+        sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the pricing API with pre-loaded, shared artifacts")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '8000')))
+    parser.add_argument('--workers', type=int, default=get_web_concurrency())
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,8 +1,10 @@
+import os
 import streamlit as st
 import joblib
 import numpy as np
 import pandas as pd
-from feature_engineering import process_text_features
+from artifact_bundle import BUNDLE_PATH, load_bundle
+from feature_pipeline import PIPELINE_PATH, FeaturePipeline
 
 # Page Config
 st.set_page_config(
@@ -14,30 +16,32 @@ st.set_page_config(
 # Load Model Artifacts (cached for performance)
 @st.cache_resource
 def load_model():
-    """Load the trained model and vectorizer"""
+    """Load the trained model and the feature pipeline (bound to its vectorizer)"""
     try:
+        # Memory-mapped bundle from train.py when present, else the pickles
+        if os.path.isdir(BUNDLE_PATH):
+            model, pipeline, _ = load_bundle(BUNDLE_PATH)
+            return model, pipeline
         model = joblib.load('model.pkl')
         vectorizer = joblib.load('vectorizer.pkl')
-        return model, vectorizer
+        if os.path.exists(PIPELINE_PATH):
+            pipeline = FeaturePipeline.load(PIPELINE_PATH, vectorizer)
+        else:
+            pipeline = FeaturePipeline(vectorizer)
+        return model, pipeline
     except Exception as e:
         st.error(f"Error loading model: {e}")
         return None, None
 
+# Rows featurized and predicted per step of a bulk upload
+BULK_CHUNK_SIZE = 1000
+
 # Prediction Function
-def predict_price(catalog_content, model, vectorizer):
+def predict_price(catalog_content, model, pipeline):
     """Generate price prediction from product description"""
     try:
-        # Create a Series for processing
-        input_series = pd.Series([catalog_content])
-        
-        # Generate Regex Features
-        features_parsed = process_text_features(input_series)
-        
-        # Generate TF-IDF Features
-        features_tfidf = vectorizer.transform(input_series)
-        
-        # Combine features
-        features_final = np.hstack([features_parsed.values, features_tfidf.toarray()])
+        # Generate Regex + TF-IDF Features as one sparse row (no pandas round trip)
+        features_final = pipeline.transform_one(catalog_content)
         
         # Predict
         log_price = model.predict(features_final)
@@ -47,6 +51,67 @@ def predict_price(catalog_content, model, vectorizer):
     except Exception as e:
         raise Exception(f"Prediction error: {str(e)}")
 
+# Reruns with text already scored skip the feature pipeline; the leading
+# underscores keep the model and pipeline out of the cache key
+@st.cache_data(max_entries=10000, show_spinner=False)
+def cached_predict_price(catalog_content, _model, _pipeline):
+    return predict_price(catalog_content, _model, _pipeline)
+
+def score_catalog(texts, model, pipeline, chunk_size=BULK_CHUNK_SIZE, on_progress=None):
+    """
+    Price many descriptions, one vectorized feature/predict pass per chunk.
+    
+    Args:
+        texts: catalog_content values (missing values are priced as empty text)
+        model: The loaded model
+        pipeline: The loaded FeaturePipeline
+        chunk_size: Rows per pass
+        on_progress: Called with the fraction of rows done after each chunk
+        
+    Returns:
+        np.ndarray: Prices aligned with texts
+    """
+    texts = list(texts)
+    prices = np.empty(len(texts))
+    for start in range(0, len(texts), chunk_size):
+        chunk = texts[start:start + chunk_size]
+        prices[start:start + len(chunk)] = np.expm1(model.predict(pipeline.transform(chunk)))
+        if on_progress:
+            on_progress(min(1.0, (start + len(chunk)) / len(texts)))
+    return prices
+
+def bulk_scoring(model, pipeline):
+    """CSV upload, chunked scoring with a progress bar and a results download"""
+    st.header("Bulk CSV Scoring")
+    uploaded = st.file_uploader("CSV with a catalog_content column", type="csv")
+    if uploaded is None:
+        return
+    try:
+        df = pd.read_csv(uploaded)
+    except Exception as e:
+        st.error(f"🚨 Could not read the CSV: {str(e)}")
+        return
+    if 'catalog_content' not in df.columns:
+        st.error("The CSV needs a catalog_content column.")
+        return
+    
+    st.write(f"{len(df)} rows")
+    if st.button("Score CSV 🚀"):
+        progress = st.progress(0.0, text="Scoring...")
+        try:
+            prices = score_catalog(df['catalog_content'].tolist(), model, pipeline,
+                                   on_progress=lambda done: progress.progress(done, text=f"Scoring... {done:.0%}"))
+        except Exception as e:
+            st.error(f"🚨 Scoring failed: {str(e)}")
+            return
+        progress.progress(1.0, text="Done")
+        
+        result = df.assign(predicted_price=np.round(prices, 2))
+        st.success(f"Scored {len(result)} rows")
+        st.dataframe(result.head(100))
+        st.download_button("Download results ⬇️", result.to_csv(index=False).encode('utf-8'),
+                           file_name="priced_catalog.csv", mime="text/csv")
+
 # Main App
 def main():
     # Title and Description
@@ -55,12 +120,19 @@ def main():
     st.info("This system uses a Multi-Modal AI (Text + Specs) to suggest optimal pricing.")
     
     # Load model
-    model, vectorizer = load_model()
+    model, pipeline = load_model()
     
-    if model is None or vectorizer is None:
+    if model is None or pipeline is None:
         st.error("⚠️ Failed to load model artifacts. Please ensure model.pkl and vectorizer.pkl are present.")
         return
     
+    single_tab, bulk_tab = st.tabs(["Single Product", "Bulk CSV"])
+    with single_tab:
+        single_prediction(model, pipeline)
+    with bulk_tab:
+        bulk_scoring(model, pipeline)
+
+def single_prediction(model, pipeline):
     # Input Form
     with st.form("prediction_form"):
         st.header("Product Details")
@@ -81,7 +153,7 @@ def main():
             with st.spinner("Analyzing market data..."):
                 try:
                     # Get prediction
-                    price = predict_price(product_desc, model, vectorizer)
+                    price = cached_predict_price(product_desc, model, pipeline)
                     
                     # Display Result
                     st.success("Prediction Complete!")
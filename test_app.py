@@ -0,0 +1,366 @@
+"""
+Unit tests for the FastAPI prediction service.
+Tests the single and batch prediction endpoints against the bundled artifacts.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+import app as api
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(api.app)
+
+
+class TestPredictEndpoint:
+    """Test suite for the single-item /predict endpoint."""
+    
+    def test_predict_returns_price(self, client):
+        """Test that a description is priced successfully."""
+        # Given: A product description
+        payload = {"catalog_content": "Pack of 12 Apple iPhones 16GB"}
+        
+        # When: Calling /predict
+        response = client.post("/predict", json=payload)
+        
+        # Then: Should return a positive price
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "success"
+        assert body["predicted_price"] > 0
+
+
+class TestMicroBatchedPredict:
+    """Test suite for /predict going through the micro-batcher."""
+    
+    def test_concurrent_predicts_are_coalesced(self, client, monkeypatch):
+        """Test that parallel /predict calls share batches and keep their own prices."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        # Given: An empty cache, a wide batching window and distinct descriptions
+        api.prediction_cache.clear()
+        monkeypatch.setattr(api.batcher, "max_wait_ms", 200)
+        texts = [f"Pack of {n} Bigelow green tea bags" for n in range(1, 9)]
+        expected = api.score_texts(texts)
+        batches_before = api.batcher.stats()["batch_size"]["count"]
+        
+        # When: Sending them concurrently
+        with client, ThreadPoolExecutor(max_workers=len(texts)) as pool:
+            responses = list(pool.map(
+                lambda t: client.post("/predict", json={"catalog_content": t}).json(), texts))
+        
+        # Then: Each caller gets its own price, using fewer predict calls than requests
+        assert [r["predicted_price"] for r in responses] == [round(p, 2) for p in expected]
+        assert api.batcher.stats()["batch_size"]["count"] - batches_before < len(texts)
+
+
+class TestPredictionCaching:
+    """Test suite for cached responses."""
+    
+    def test_repeat_request_is_served_from_cache(self, client):
+        """Test that the second identical request reports a cache hit with the same price."""
+        # Given: A fresh cache
+        api.prediction_cache.clear()
+        payload = {"catalog_content": "Twinings Earl Grey tea, 100 count"}
+        
+        # When: Sending the same request twice
+        first = client.post("/predict", json=payload).json()
+        second = client.post("/predict", json=payload).json()
+        
+        # Then: Only the second should be cached, with an identical price
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert first["predicted_price"] == second["predicted_price"]
+    
+    def test_batch_uses_and_fills_cache(self, client):
+        """Test that batch scoring reads and populates the shared cache."""
+        # Given: One description already priced through /predict
+        api.prediction_cache.clear()
+        client.post("/predict", json={"catalog_content": "Heinz ketchup"})
+        
+        # When: Scoring a batch containing it and a new description
+        batch = client.post("/predict_batch",
+                            json={"catalog_contents": ["Heinz ketchup", "Morton salt"]}).json()
+        
+        # Then: Only the first should be a cache hit
+        assert [p["cached"] for p in batch["predictions"]] == [True, False]
+        assert client.get("/cache_stats").json()["size"] == 2
+    
+    def test_artifact_change_reloads_and_clears_cache(self, client, monkeypatch):
+        """Test that a new artifact version empties the cache."""
+        # Given: A populated cache
+        client.post("/predict", json={"catalog_content": "Quaker oats"})
+        assert api.prediction_cache.stats()["size"] > 0
+        
+        # When: The artifacts on disk report a new version
+        monkeypatch.setattr(api, "artifact_version", "stale")
+        response = client.post("/predict", json={"catalog_content": "Quaker oats"}).json()
+        
+        # Then: Should reload, miss, and keep only the fresh entry
+        assert response["cached"] is False
+        assert api.artifact_version != "stale"
+        assert api.prediction_cache.stats()["size"] == 1
+    
+    def test_pickle_fingerprint_covers_the_feature_pipeline(self, monkeypatch, tmp_path):
+        """Test that rewriting feature_pipeline.pkl alone changes the artifact version."""
+        # Given: Serving from the pickles, with a saved feature pipeline
+        pipeline = tmp_path / "feature_pipeline.pkl"
+        pipeline.write_bytes(b"v1")
+        monkeypatch.setattr(api, "BUNDLE_PATH", str(tmp_path / "no_bundle"))
+        monkeypatch.setattr(api, "PIPELINE_PATH", str(pipeline))
+        before = api.artifact_fingerprint(api.artifact_paths())
+
+        # When: A retrain rewrites only the pipeline
+        pipeline.write_bytes(b"version 2")
+
+        # Then: The fingerprint moves
+        assert str(pipeline) in api.artifact_paths()
+        assert api.artifact_fingerprint(api.artifact_paths()) != before
+
+    def test_reload_runs_off_the_event_loop(self, client, monkeypatch):
+        """Test that /predict reloads changed artifacts in a worker thread."""
+        import asyncio
+        
+        # Given: A stale version and a reload that notes whether a loop is running in its thread
+        seen = []
+        original = api.load_artifacts
+        def load_artifacts():
+            try:
+                asyncio.get_running_loop()
+                seen.append("event loop")
+            except RuntimeError:
+                seen.append("worker thread")
+            original()
+        monkeypatch.setattr(api, "load_artifacts", load_artifacts)
+        monkeypatch.setattr(api, "artifact_version", "stale")
+        
+        # When: Calling /predict
+        client.post("/predict", json={"catalog_content": "Quaker oats"})
+        
+        # Then: The reload happened outside the event loop
+        assert seen == ["worker thread"]
+    
+    def test_non_finite_price_is_an_error_and_not_cached(self, client, monkeypatch):
+        """Test that /predict rejects a non-finite prediction like /predict_batch does."""
+        # Given: A model that returns infinity
+        api.prediction_cache.clear()
+        monkeypatch.setattr(api.batcher, "predict_fn", lambda texts: [float("inf")] * len(texts))
+        
+        # When: Calling /predict
+        response = client.post("/predict", json={"catalog_content": "Mystery item"})
+        
+        # Then: A 500 with a clear message, and nothing cached
+        assert response.status_code == 500
+        assert response.json()["detail"] == "Model returned a non-finite price"
+        assert api.prediction_cache.stats()["size"] == 0
+    
+    def test_price_scored_across_a_reload_is_not_cached(self, client, monkeypatch):
+        """Test that a reload during scoring keeps the price out of the old version's cache."""
+        # Given: Models that swap in new artifacts while they score
+        api.prediction_cache.clear()
+        original = api.score_texts
+        reloads = []
+        def reloading_score(texts):
+            reloads.append(texts)
+            monkeypatch.setattr(api, "artifact_version", f"reload {len(reloads)}")
+            return original(texts)
+        monkeypatch.setattr(api.batcher, "predict_fn", reloading_score)
+        monkeypatch.setattr(api, "score_texts", reloading_score)
+        monkeypatch.setattr(api, "refresh_artifacts", lambda: None)
+        
+        # When: Scoring through /predict and /predict_batch
+        single = client.post("/predict", json={"catalog_content": "Quaker oats"})
+        batch = client.post("/predict_batch", json={"catalog_contents": ["Kirkland olive oil"]})
+        
+        # Then: Both are answered but nothing is cached
+        assert single.status_code == 200
+        assert batch.json()["predictions"][0]["status"] == "success"
+        assert api.prediction_cache.stats()["size"] == 0
+
+
+class TestPredictBatchEndpoint:
+    """Test suite for the /predict_batch endpoint."""
+    
+    def test_batch_matches_single_predictions_in_order(self, client):
+        """Test that batch prices equal the single-item prices, in input order."""
+        # Given: Several different descriptions
+        texts = [
+            "Pack of 12 Apple iPhones 16GB",
+            "McCormick Ground Cinnamon, 2.37 oz",
+            "Item Name: Organic green tea, Count: 100 bags",
+        ]
+        
+        # When: Scoring them as one batch and one by one
+        batch = client.post("/predict_batch", json={"catalog_contents": texts}).json()
+        singles = [client.post("/predict", json={"catalog_content": t}).json() for t in texts]
+        
+        # Then: Prices should line up item for item
+        assert batch["count"] == len(texts)
+        assert [p["index"] for p in batch["predictions"]] == [0, 1, 2]
+        assert [p["predicted_price"] for p in batch["predictions"]] == \
+            [s["predicted_price"] for s in singles]
+    
+    def test_batch_reports_per_item_errors(self, client):
+        """Test that a missing item fails on its own without failing the batch."""
+        # Given: A batch with a null entry in the middle
+        texts = ["Pack of 2 Nike socks", None, "Kirkland olive oil"]
+        
+        # When: Scoring the batch
+        response = client.post("/predict_batch", json={"catalog_contents": texts})
+        
+        # Then: Only the null item should be an error
+        assert response.status_code == 200
+        statuses = [p["status"] for p in response.json()["predictions"]]
+        assert statuses == ["success", "error", "success"]
+        assert response.json()["predictions"][1]["predicted_price"] is None
+    
+    def test_batch_over_limit_is_rejected(self, client, monkeypatch):
+        """Test that batches above MAX_BATCH_SIZE are rejected with 413."""
+        # Given: A small batch limit
+        monkeypatch.setattr(api, "MAX_BATCH_SIZE", 2)
+        
+        # When: Sending a larger batch
+        response = client.post("/predict_batch", json={"catalog_contents": ["a", "b", "c"]})
+        
+        # Then: Should be rejected
+        assert response.status_code == 413
+    
+    def test_empty_batch(self, client):
+        """Test that an empty batch returns no predictions."""
+        response = client.post("/predict_batch", json={"catalog_contents": []})
+        
+        assert response.status_code == 200
+        assert response.json()["predictions"] == []
+
+
+class TestHealthEndpoints:
+    """Test suite for the /healthz and /readyz probes."""
+    
+    def test_healthz_is_always_ok(self, client):
+        """Test that liveness does not depend on warm-up."""
+        response = client.get("/healthz")
+        
+        assert response.status_code == 200
+        assert response.json()["status"] == "ok"
+    
+    def test_readyz_waits_for_warm_up(self, client, monkeypatch):
+        """Test that /readyz is 503 before warm-up and 200 with timings after."""
+        # Given: A worker that has not warmed up yet
+        monkeypatch.setattr(api, "readiness", {"ready": False, "startup_ms": None, "warmup_ms": None,
+                                                "warmup_error": None})
+        assert client.get("/readyz").status_code == 503
+        
+        # When: The warm-up runs
+        api.warm_up()
+        
+        # Then: The worker reports ready with its startup and warm-up times
+        response = client.get("/readyz")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "ready"
+        assert body["warmup_ms"] > 0
+        assert body["startup_ms"] >= body["warmup_ms"]
+    
+    def test_failed_warm_up_is_reported_not_fatal(self, client, monkeypatch):
+        """Test that a warm-up error still lets the worker serve and shows up in /readyz."""
+        # Given: A worker whose scoring fails
+        monkeypatch.setattr(api, "readiness", {"ready": False, "startup_ms": None, "warmup_ms": None,
+                                                "warmup_error": None})
+        monkeypatch.setattr(api, "score_texts", lambda texts: [RuntimeError("model unavailable")] * len(texts))
+        
+        # When: The warm-up runs
+        api.warm_up()
+        
+        # Then: Ready, with the error in the body
+        body = client.get("/readyz").json()
+        assert body["ready"] is True
+        assert body["warmup_error"] == "RuntimeError: model unavailable"
+    
+    def test_startup_marks_worker_ready(self, monkeypatch):
+        """Test that the app lifespan warms the worker up in the background."""
+        import time
+        
+        # Given: A fresh, not-ready worker
+        monkeypatch.setattr(api, "readiness", {"ready": False, "startup_ms": None, "warmup_ms": None,
+                                                "warmup_error": None})
+        
+        # When: Starting the app
+        with TestClient(api.app) as started:
+            deadline = time.monotonic() + 30
+            while started.get("/readyz").status_code != 200 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            
+            # Then: It becomes ready on its own
+            assert started.get("/readyz").json()["ready"] is True
+
+
+class TestMetricsEndpoint:
+    """Test suite for the Prometheus /metrics endpoint."""
+    
+    def test_stage_latencies_and_errors_are_exposed(self, client, monkeypatch):
+        """Test that scoring fills every stage histogram and failures are counted by type."""
+        from metrics import STAGES, RequestMetrics
+        
+        # Given: Fresh counters
+        monkeypatch.setattr(api, "metrics", RequestMetrics())
+        
+        # When: Scoring one item, a batch with a missing item and an invalid body
+        client.post("/predict", json={"catalog_content": "Sony headphones, metrics test"})
+        client.post("/predict_batch", json={"catalog_contents": ["Apple iPad", None]})
+        assert client.post("/predict", json={"wrong": 1}).status_code == 422
+        response = client.get("/metrics")
+        
+        # Then: Prometheus text with all stages, errors and the model version
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        for stage in STAGES:
+            assert f'pricing_stage_latency_seconds_count{{stage="{stage}"}}' in text
+        assert 'pricing_stage_latency_seconds_count{stage="parse"} 3' in text
+        assert 'pricing_errors_total{type="MissingCatalogContent"} 1' in text
+        assert 'pricing_errors_total{type="RequestValidationError"} 1' in text
+        assert "pricing_requests_in_flight 0" in text
+        assert f'version="{api.artifact_version}"' in text
+
+
+class TestSimilarEndpoint:
+    """Test suite for the /similar comparable-products endpoint."""
+    
+    @pytest.fixture
+    def store(self, tmp_path, monkeypatch):
+        import numpy as np
+        from embedding_store import EmbeddingStore, build_store, synthetic_embeddings
+        
+        X = synthetic_embeddings(500, 8, n_clusters=10, seed=2)
+        build_store([X[:, :4], X[:, 4:]], np.arange(500), np.full(500, 20.0), str(tmp_path / "store"))
+        store = EmbeddingStore(str(tmp_path / "store"))
+        monkeypatch.setattr(api, "embedding_store", store)
+        return X
+    
+    def test_neighbours_of_a_stored_item(self, client, store):
+        """Test that k other items come back with their prices and a comparable price."""
+        # When: Asking for neighbours of item 3
+        response = client.post("/similar", json={"sample_id": 3, "k": 4})
+        
+        # Then: Four neighbours, not including item 3
+        assert response.status_code == 200
+        body = response.json()
+        assert body["count"] == 4
+        assert 3 not in [n["sample_id"] for n in body["neighbours"]]
+        assert body["comparable_price"] == 20.0
+    
+    def test_query_by_embeddings_and_errors(self, client, store):
+        """Test raw embedding queries and the error statuses."""
+        raw = {"embeddings": [store[0, :4].tolist(), store[0, 4:].tolist()], "k": 1}
+        assert client.post("/similar", json=raw).json()["neighbours"][0]["sample_id"] == 0
+        assert client.post("/similar", json={"sample_id": 9999}).status_code == 404
+        assert client.post("/similar", json={"embeddings": [[1.0]]}).status_code == 422
+        overflow = {"embeddings": [[1e39] + store[0, 1:4].tolist(), store[0, 4:].tolist()]}
+        assert client.post("/similar", json=overflow).status_code == 422
+        assert client.post("/similar", json={}).status_code == 422
+    
+    def test_unavailable_without_a_store(self, client, monkeypatch):
+        """Test that the endpoint answers 503 when no store was built."""
+        monkeypatch.setattr(api, "embedding_store", None)
+        
+        assert client.post("/similar", json={"sample_id": 1}).status_code == 503
@@ -0,0 +1,136 @@
+"""
+Unit tests for the memory-mappable model artifact bundle.
+Tests parity with the pickled artifacts, memory mapping, corruption checks and atomic replacement.
+"""
+import json
+import os
+import threading
+
+import joblib
+import numpy as np
+import pytest
+
+from artifact_bundle import (KEEP_VERSIONS, MANIFEST, load_bundle, read_manifest, verify_bundle,
+                             write_bundle)
+from benchmark import synthetic_catalog
+from feature_pipeline import FeaturePipeline
+
+
+@pytest.fixture(scope="module")
+def artifacts():
+    return joblib.load('model.pkl'), joblib.load('vectorizer.pkl')
+
+
+@pytest.fixture(scope="module")
+def bundle_dir(artifacts, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("bundle") / "model_bundle")
+    write_bundle(*artifacts, path)
+    return path
+
+
+class TestBundleParity:
+    """Test suite for serving from the bundle instead of the pickles."""
+
+    @pytest.mark.parametrize("backend", ["lightgbm", "numpy", "auto"])
+    def test_predictions_match_pickles(self, artifacts, bundle_dir, backend):
+        """Test that features and predictions equal the pickled model's."""
+        # Given: The pickled artifacts and a bundle written from them
+        model, vectorizer = artifacts
+        texts = synthetic_catalog(50, seed=3)
+        expected_X = FeaturePipeline(vectorizer).transform(texts)
+
+        # When: Loading the bundle with each backend
+        bundle = load_bundle(bundle_dir, backend)
+        X = bundle.pipeline.transform(texts)
+
+        # Then: Same feature matrix and the same prices
+        assert (X != expected_X).nnz == 0
+        np.testing.assert_allclose(bundle.model.predict(X), model.predict(expected_X), rtol=0, atol=1e-9)
+
+    def test_arrays_are_memory_mapped(self, bundle_dir):
+        """Test that idf and tree tables are read-only maps of the bundle files."""
+        bundle = load_bundle(bundle_dir, 'numpy')
+
+        assert isinstance(bundle.pipeline.vectorizer.idf, np.memmap)
+        assert isinstance(bundle.model.threshold, np.memmap)
+        assert not bundle.model.threshold.flags.writeable
+
+
+class TestBundleIntegrity:
+    """Test suite for manifest checks."""
+
+    def test_manifest_records_files_and_versions(self, bundle_dir):
+        """Test the manifest lists every file with its checksum and the library versions."""
+        manifest = read_manifest(bundle_dir)
+
+        assert set(manifest['files']) == set(os.listdir(bundle_dir)) - {MANIFEST}
+        assert {'numpy', 'lightgbm', 'scikit-learn'} <= set(manifest['versions'])
+        assert verify_bundle(bundle_dir) == []
+
+    def test_corrupt_file_is_detected(self, artifacts, tmp_path):
+        """Test that a changed byte fails verification and a verified load."""
+        # Given: A bundle with one byte of idf.npy flipped
+        path = str(tmp_path / "bundle")
+        write_bundle(*artifacts, path)
+        with open(os.path.join(path, 'idf.npy'), 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+
+        # When/Then: The file is reported and the load refuses it
+        assert verify_bundle(path) == ['idf.npy']
+        with pytest.raises(ValueError, match="corrupt"):
+            load_bundle(path, verify=True)
+
+    def test_schema_mismatch_is_rejected(self, artifacts, tmp_path):
+        """Test that a bundle for another feature layout is refused."""
+        # Given: A bundle whose manifest lists different columns
+        path = str(tmp_path / "bundle")
+        write_bundle(*artifacts, path)
+        manifest = read_manifest(path)
+        manifest['feature_schema']['columns'] = ['is_bulk']
+        with open(os.path.join(path, MANIFEST), 'w') as f:
+            json.dump(manifest, f)
+
+        # When/Then: Loading raises
+        with pytest.raises(ValueError, match="feature schema"):
+            load_bundle(path)
+
+
+class TestBundleReplacement:
+    """Test suite for publishing a new bundle over an existing one."""
+
+    def test_rewrite_is_never_visible_as_missing(self, artifacts, tmp_path):
+        """Test that readers always find a complete bundle while it is rewritten."""
+        # Given: A bundle in the old plain-directory layout and a reader polling it
+        path = str(tmp_path / "model_bundle")
+        write_bundle(*artifacts, path)
+        os.unlink(path)
+        versions = [e for e in os.listdir(tmp_path) if e.startswith('.model_bundle-v')]
+        os.rename(str(tmp_path / versions[0]), path)
+        write_bundle(*artifacts, path)  # migrates to the symlink layout
+        errors, stop = [], threading.Event()
+
+        def read():
+            while not stop.is_set():
+                try:
+                    read_manifest(path)
+                except OSError as e:
+                    errors.append(e)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+
+        # When: Writing several new versions
+        for _ in range(3):
+            write_bundle(*artifacts, path)
+        stop.set()
+        reader.join()
+
+        # Then: No failed read, a symlink to the newest version, older versions pruned
+        assert errors == []
+        assert os.path.islink(path) and verify_bundle(path) == []
+        versions = sorted(e for e in os.listdir(tmp_path) if e.startswith('.model_bundle-v'))
+        assert len(versions) == KEEP_VERSIONS
+        assert os.readlink(path) == max(versions, key=lambda e: int(e.split('-v')[1]))
@@ -0,0 +1,77 @@
+"""
+Unit tests for the benchmark suite.
+Tests the synthetic catalog, the regression check against a baseline and a
+small end-to-end run.
+"""
+import json
+
+import pandas as pd
+
+import benchmark
+from benchmark import compare, run_benchmarks, synthetic_catalog
+from feature_engineering import process_text_features
+
+
+def report(**medians):
+    return {'results': {name: {'median_ms': ms, 'best_ms': ms} for name, ms in medians.items()}}
+
+
+class TestSyntheticCatalog:
+    """Test suite for the synthetic catalog generator."""
+
+    def test_is_deterministic_and_exercises_the_parser(self):
+        """Test that a seed fixes the catalog and that brands, pack sizes and bulk words occur."""
+        # Given: A generated catalog
+        texts = synthetic_catalog(500, seed=3)
+
+        # When: Parsing it
+        parsed = process_text_features(pd.Series(texts))
+
+        # Then: Same seed, same text; the features are not degenerate
+        assert texts == synthetic_catalog(500, seed=3)
+        assert all(t.startswith("Item Name: ") for t in texts)
+        assert 0.1 < parsed['is_bulk'].mean() < 0.9
+        assert (parsed['item_quantity'] > 1).mean() > 0.3
+        assert parsed['brand'].nunique() > 20
+
+
+class TestRegressionCheck:
+    """Test suite for compare() and the CLI exit code."""
+
+    def test_only_slowdowns_past_threshold_and_noise_fail(self):
+        """Test the relative threshold, the absolute noise floor and new benchmarks."""
+        baseline = report(fast=1.0, slow=1.0, tiny=0.01, gone=5.0)
+        current = report(fast=1.2, slow=1.5, tiny=0.03, new=9.0)
+
+        regressions = compare(current, baseline, max_regression=0.25, min_regression_ms=0.05)
+
+        assert [r['name'] for r in regressions] == ['slow']
+        assert regressions[0]['ratio'] == 1.5
+
+    def test_main_fails_on_regression(self, tmp_path, monkeypatch):
+        """Test that the CLI writes JSON results and exits 1 when the baseline is beaten."""
+        # Given: A baseline no real run can match
+        baseline_path = tmp_path / 'baseline.json'
+        baseline_path.write_text(json.dumps(report(**{'vectorizer_transform[1]': 1e-6})))
+        output = tmp_path / 'results.json'
+
+        # When: Running a tiny suite without the endpoints
+        code = benchmark.main(['--output', str(output), '--baseline', str(baseline_path),
+                               '--batch-sizes', '1', '--repeats', '2', '--no-endpoints'])
+
+        # Then: Results are saved and the run fails
+        assert code == 1
+        assert 'vectorizer_transform[1]' in json.loads(output.read_text())['results']
+
+
+class TestRunBenchmarks:
+    """Test suite for the timed stages."""
+
+    def test_every_stage_and_endpoint_is_timed(self):
+        """Test that stages are timed per batch size and endpoints through TestClient."""
+        results = run_benchmarks(batch_sizes=(1, 4), repeats=2)['results']
+
+        for stage in ('process_text_features', 'vectorizer_transform', 'model_predict',
+                      'endpoint_predict_batch'):
+            assert {f'{stage}[1]', f'{stage}[4]'} <= set(results)
+        assert results['endpoint_predict[1]']['median_ms'] > 0
@@ -0,0 +1,134 @@
+"""
+Unit tests for incremental ETL change tracking.
+Runs the fingerprint / watermark cycle against SQLite.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from change_tracking import ChangeTracker, row_fingerprints
+from db_loader import bulk_upsert
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'pricing.db'}")
+
+
+def catalog(n=10):
+    return pd.DataFrame({
+        'sample_id': np.arange(1, n + 1),
+        'catalog_content': [f"Pack of {i} tea bags" for i in range(1, n + 1)],
+        'price': np.arange(1, n + 1) * 1.5,
+    })
+
+
+def run_incremental(engine, df, chunksize=4):
+    """Mimic main_pipeline: diff each chunk, load the changes, delete what is gone."""
+    tracker = ChangeTracker.load(engine)
+    loaded = skipped = 0
+    for start in range(0, len(df), chunksize):
+        chunk = df.iloc[start:start + chunksize]
+        changed, hashes = tracker.changed_rows(chunk)
+        skipped += len(chunk) - len(changed)
+        if len(changed):
+            bulk_upsert(changed, 'products_cleaned', engine)
+            tracker.record(engine, changed, hashes)
+            loaded += len(changed)
+    deleted = tracker.delete_missing(engine, 'products_cleaned')
+    return loaded, skipped, deleted
+
+
+class TestRowFingerprints:
+    """Test suite for row_fingerprints."""
+
+    def test_fingerprint_changes_with_any_tracked_column(self):
+        """Test that editing text or price changes only that row's fingerprint."""
+        # Given: A catalog and a copy with one text and one price edit
+        df = catalog(4)
+        edited = df.copy()
+        edited.loc[1, 'catalog_content'] += " (new)"
+        edited.loc[2, 'price'] = 99.0
+
+        # When: Fingerprinting both
+        before, after = row_fingerprints(df), row_fingerprints(edited)
+
+        # Then: Exactly the edited rows differ
+        assert (before != after).tolist() == [False, True, True, False]
+
+    def test_fingerprint_ignores_untracked_columns_and_index(self):
+        """Test that extra columns and the row index do not affect fingerprints."""
+        df = catalog(3)
+        shifted = df.assign(image_link="http://x").set_axis([10, 11, 12])
+
+        assert row_fingerprints(df).tolist() == row_fingerprints(shifted).tolist()
+
+    def test_fingerprint_ignores_per_chunk_dtype_inference(self):
+        """Test that a row hashes the same whatever dtypes its chunk was read with."""
+        # Given: One row read alone (empty text -> float64, integral price -> int64) and with others
+        alone = pd.DataFrame({'sample_id': [1], 'catalog_content': [np.nan], 'price': [5]})
+        mixed = pd.DataFrame({'sample_id': [2, 1], 'catalog_content': ["Tea", None], 'price': [1.5, 5.0]})
+
+        # When/Then: The shared row gets one fingerprint
+        assert row_fingerprints(alone).iloc[0] == row_fingerprints(mixed).iloc[1]
+
+
+class TestIncrementalLoad:
+    """Test suite for the ChangeTracker load cycle."""
+
+    def test_duplicate_keys_in_a_chunk_keep_the_last_row(self, engine):
+        """Test that a repeated sample_id does not break the upsert and the later row wins."""
+        # Given: A chunk listing sample_id 2 twice
+        df = catalog(3)
+        df = pd.concat([df, df.iloc[[1]].assign(price=42.0)], ignore_index=True)
+
+        # When: Loading it
+        loaded, _, _ = run_incremental(engine, df, chunksize=10)
+
+        # Then: One row per key, with the last price
+        table = pd.read_sql("SELECT sample_id, price FROM products_cleaned ORDER BY sample_id", engine)
+        assert loaded == 3 and table['sample_id'].tolist() == [1, 2, 3]
+        assert table['price'].tolist() == [1.5, 42.0, 4.5]
+
+    def test_unchanged_rerun_skips_everything(self, engine):
+        """Test that a second run over the same catalog loads nothing."""
+        # Given: A first full load
+        assert run_incremental(engine, catalog()) == (10, 0, 0)
+
+        # When: Running again on identical data
+        result = run_incremental(engine, catalog())
+
+        # Then: Every row is skipped
+        assert result == (0, 10, 0)
+
+    def test_only_new_changed_and_removed_rows_are_touched(self, engine):
+        """Test that edits, additions and removals are applied incrementally."""
+        # Given: A loaded catalog
+        run_incremental(engine, catalog())
+        df = catalog(11)
+        df.loc[4, 'price'] = 100.0  # changed
+        df = df.drop(index=7)       # sample_id 8 removed; sample_id 11 is new
+
+        # When: Running on the edited catalog
+        loaded, skipped, deleted = run_incremental(engine, df)
+
+        # Then: Work is proportional to the change and the table matches the source
+        assert (loaded, skipped, deleted) == (2, 8, 1)
+        table = pd.read_sql("SELECT * FROM products_cleaned ORDER BY sample_id", engine)
+        pd.testing.assert_frame_equal(table, df.reset_index(drop=True))
+        watermarks = pd.read_sql("SELECT sample_id FROM etl_watermarks ORDER BY sample_id", engine)
+        assert watermarks['sample_id'].tolist() == df['sample_id'].tolist()
+
+    def test_full_refresh_reloads_but_still_deletes(self, engine):
+        """Test that full_refresh returns every row while tracking removed keys."""
+        # Given: A loaded catalog
+        run_incremental(engine, catalog())
+        tracker = ChangeTracker.load(engine)
+
+        # When: Diffing a smaller, unchanged catalog with full_refresh
+        changed, _ = tracker.changed_rows(catalog(6), full_refresh=True)
+
+        # Then: All rows come back and the dropped keys are reported missing
+        assert len(changed) == 6
+        assert tracker.missing_keys() == [7, 8, 9, 10]
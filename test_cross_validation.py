@@ -0,0 +1,69 @@
+"""
+Unit tests for parallel K-fold cross-validation.
+Tests SMAPE, OOF coverage, parallel/sequential agreement and the fold ensemble.
+"""
+import numpy as np
+import pytest
+from scipy import sparse
+
+from cross_validation import FoldEnsemble, cross_validate, smape
+from tree_predictor import make_predictor
+
+
+@pytest.fixture(scope="module")
+def data():
+    X = sparse.random(1200, 40, density=0.2, format='csr', random_state=5)
+    y = np.log1p(10 * np.asarray(X[:, :5].sum(axis=1)).ravel())
+    return X, y
+
+
+class TestSmape:
+    """Test suite for the SMAPE metric."""
+
+    def test_known_values(self):
+        """Test SMAPE on hand-computed cases, including the both-zero convention."""
+        assert smape([100, 200], [100, 200]) == 0.0
+        assert smape([100], [50]) == pytest.approx(100 * 50 / 75)
+        assert smape([0, 10], [0, 10]) == 0.0
+        assert smape([1], [0]) == 200.0
+
+
+class TestCrossValidate:
+    """Test suite for cross_validate."""
+
+    def test_parallel_folds_match_sequential(self, data):
+        """Test that running folds in parallel processes changes nothing but speed."""
+        # Given: The same data, folds and parameters
+        X, y = data
+
+        # When: Cross-validating with 3 worker processes and with 1
+        parallel = cross_validate(X, y, n_splits=3, num_boost_round=40, n_jobs=3)
+        sequential = cross_validate(X, y, n_splits=3, num_boost_round=40, n_jobs=1)
+
+        # Then: OOF predictions and scores agree, and every row got an OOF prediction
+        np.testing.assert_allclose(parallel.oof, sequential.oof, rtol=1e-9)
+        assert parallel.smape == pytest.approx(sequential.smape)
+        assert len(parallel.models) == len(parallel.fold_scores) == 3
+        assert np.all(parallel.oof != 0)
+
+    def test_oof_predictions_are_out_of_fold(self, data):
+        """Test that each OOF prediction comes from the fold model that did not see the row."""
+        X, y = data
+        result = cross_validate(X, y, n_splits=3, num_boost_round=40, n_jobs=3)
+
+        fold_preds = np.array([m.predict(X) for m in result.models])
+        owner = np.argmin(np.abs(fold_preds - result.oof), axis=0)
+
+        assert np.allclose(fold_preds[owner, np.arange(len(y))], result.oof)
+        assert sorted(np.bincount(owner)) == [400, 400, 400]
+
+    def test_fold_ensemble_is_servable(self, data):
+        """Test that the averaged ensemble predicts the fold mean, natively and via numpy."""
+        X, y = data
+        ensemble = cross_validate(X, y, n_splits=3, num_boost_round=40, n_jobs=3).ensemble()
+
+        expected = np.mean([b.predict(X) for b in ensemble.boosters], axis=0)
+
+        assert isinstance(ensemble, FoldEnsemble)
+        np.testing.assert_allclose(ensemble.predict(X), expected)
+        np.testing.assert_allclose(make_predictor(ensemble, 'numpy').predict(X), expected, rtol=1e-9)
@@ -0,0 +1,140 @@
+"""
+Unit tests for the dashboard's SQL aggregates.
+Checks compute_summary against the pandas logic it replaced, using SQLite.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from dashboard_queries import (
+    MAX_PAGE_SIZE, compute_summary, fetch_page, list_brands, load_summary, refresh_summary
+)
+
+
+@pytest.fixture
+def products():
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({
+        'sample_id': np.arange(2000),
+        'price': rng.lognormal(3, 1.2, 2000),
+        'brand': rng.choice(['Apple', 'Sony', 'Nike', 'Unknown', 'Hp'], 2000, p=[.4, .3, .15, .1, .05]),
+        'is_bulk': rng.integers(0, 2, 2000),
+    })
+
+
+@pytest.fixture
+def engine(tmp_path, products):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pricing.db'}")
+    products.to_sql('products_cleaned', engine, index=False)
+    return engine
+
+
+class TestComputeSummary:
+    """Test suite for compute_summary."""
+
+    def test_matches_pandas_aggregates(self, engine, products):
+        """Test that SQL KPIs, histogram and top brands equal the old pandas results."""
+        # When: Aggregating in SQL
+        summary = compute_summary(engine, bins=50, top_n=3)
+
+        # Then: Every figure matches the in-memory computation
+        kpis = summary[summary['kind'] == 'kpi'].set_index('label')['value']
+        assert kpis['total_products'] == len(products)
+        assert kpis['avg_price'] == pytest.approx(products['price'].mean())
+        assert kpis['premium_products'] == (products['price'] > 100).sum()
+
+        bins = summary[summary['kind'] == 'price_bin']
+        counts, edges = np.histogram(products['price'], bins=50)
+        assert bins['value'].tolist() == counts.tolist()
+        np.testing.assert_allclose(bins['bin_low'], edges[:-1])
+
+        brands = summary[summary['kind'] == 'top_brand']
+        expected = products['brand'].value_counts().head(3)
+        assert brands['label'].tolist() == expected.index.tolist()
+        assert brands['value'].tolist() == expected.tolist()
+
+    def test_empty_table(self, tmp_path, products):
+        """Test that an empty table yields zero KPIs and no chart rows."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+        products.head(0).to_sql('products_cleaned', engine, index=False)
+
+        summary = compute_summary(engine)
+
+        assert set(summary['kind']) == {'kpi'}
+        assert summary.set_index('label')['value']['total_products'] == 0
+
+    def test_single_price_is_one_bin(self, tmp_path, products):
+        """Test that a zero-width price range gives one bin holding every row."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'flat.db'}")
+        products.head(5).assign(price=9.99).to_sql('products_cleaned', engine, index=False)
+
+        bins = compute_summary(engine, bins=10).query("kind == 'price_bin'")
+
+        assert bins['value'].tolist() == [5]
+        assert bins['bin_low'].tolist() == bins['bin_high'].tolist() == [9.99]
+
+
+class TestSummaryTable:
+    """Test suite for the precomputed summary table."""
+
+    def test_refresh_then_load(self, engine):
+        """Test that the dashboard reads the stored summary written by the ETL."""
+        # Given: A refreshed summary table
+        stats = refresh_summary(engine)
+
+        # When: Loading it
+        summary = load_summary(engine)
+
+        # Then: It holds a few dozen rows, not the product table
+        assert 'products_summary' in inspect(engine).get_table_names()
+        assert len(summary) == stats['rows'] < 100
+        assert summary[summary['kind'] == 'price_bin']['value'].sum() == 2000
+
+    def test_load_falls_back_to_live_aggregates(self, engine):
+        """Test that the dashboard works before the ETL has written a summary."""
+        summary = load_summary(engine)
+
+        assert summary[summary['kind'] == 'kpi'].set_index('label')['value']['total_products'] == 2000
+
+
+class TestFetchPage:
+    """Test suite for the keyset-paginated raw-data explorer."""
+
+    def test_pages_cover_filtered_rows_in_order(self, engine, products):
+        """Test that following cursors walks every matching row exactly once."""
+        # Given: Brand, price and bulk filters
+        filters = dict(brands=['Apple', 'Nike'], min_price=10, max_price=80, is_bulk=True)
+        expected = products[products['brand'].isin(['Apple', 'Nike'])
+                            & products['price'].between(10, 80) & (products['is_bulk'] == 1)]
+
+        # When: Paging through with 37 rows per page
+        seen, cursor, pages = [], None, 0
+        while True:
+            page, cursor = fetch_page(engine, after_id=cursor, page_size=37, **filters)
+            assert len(page) <= 37
+            seen.extend(page['sample_id'])
+            pages += 1
+            if cursor is None:
+                break
+
+        # Then: The pages concatenate to the filtered table in sample_id order
+        assert seen == expected['sample_id'].tolist()
+        assert pages == -(-len(expected) // 37)
+
+    def test_unfiltered_first_page(self, engine):
+        """Test that the first page starts at the smallest sample_id and has a cursor."""
+        page, cursor = fetch_page(engine, page_size=10)
+
+        assert page['sample_id'].tolist() == list(range(10))
+        assert cursor == 9
+
+    def test_page_size_is_capped(self, engine):
+        """Test that callers cannot request unbounded pages."""
+        page, _ = fetch_page(engine, page_size=10 ** 6)
+
+        assert len(page) == MAX_PAGE_SIZE
+
+    def test_list_brands(self, engine):
+        """Test that the brand filter options are distinct and sorted."""
+        assert list_brands(engine) == ['Apple', 'Hp', 'Nike', 'Sony', 'Unknown']
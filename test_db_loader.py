@@ -0,0 +1,112 @@
+"""
+Unit tests for the bulk ETL loader.
+Runs bulk_upsert against SQLite (the multi-row INSERT path).
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from db_loader import _csv_payload, bulk_upsert
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'pricing.db'}")
+
+
+def products(ids, price=1.0):
+    return pd.DataFrame({
+        'sample_id': ids,
+        'catalog_content': [f"item {i}" for i in ids],
+        'brand': ['Apple' if i % 2 else 'Sony' for i in ids],
+        'price': [price * i for i in ids],
+    })
+
+
+def read_table(engine):
+    return pd.read_sql("SELECT * FROM products_cleaned ORDER BY sample_id", engine)
+
+
+class TestBulkUpsert:
+    """Test suite for bulk_upsert."""
+
+    def test_first_load_creates_table_and_indexes(self, engine):
+        """Test that a new table is filled in chunks and indexed afterwards."""
+        # Given: No table yet and more rows than one chunk
+        df = products(range(1, 251))
+
+        # When: Loading with small chunks
+        stats = bulk_upsert(df, 'products_cleaned', engine, index_columns=('brand',), chunksize=40)
+
+        # Then: All rows are there, with the key and extra indexes
+        assert stats['created'] is True
+        assert stats['method'] == 'multi-row insert'
+        pd.testing.assert_frame_equal(read_table(engine), df)
+        indexes = {ix['name']: ix for ix in inspect(engine).get_indexes('products_cleaned')}
+        assert indexes['ux_products_cleaned_sample_id']['unique']
+        assert 'ix_products_cleaned_brand' in indexes
+
+    def test_composite_indexes(self, engine):
+        """Test that a tuple in index_columns builds one multi-column index."""
+        bulk_upsert(products(range(1, 5)), 'products_cleaned', engine,
+                    index_columns=(('brand', 'sample_id'), 'price'))
+
+        indexes = {ix['name']: ix['column_names'] for ix in inspect(engine).get_indexes('products_cleaned')}
+        assert indexes['ix_products_cleaned_brand_sample_id'] == ['brand', 'sample_id']
+        assert indexes['ix_products_cleaned_price'] == ['price']
+
+    def test_upsert_updates_changed_and_keeps_other_rows(self, engine):
+        """Test that reloading merges on sample_id instead of replacing the table."""
+        # Given: A loaded table
+        bulk_upsert(products(range(1, 11)), 'products_cleaned', engine)
+
+        # When: Loading overlapping rows with new prices
+        stats = bulk_upsert(products(range(6, 16), price=2.0), 'products_cleaned', engine, chunksize=3)
+
+        # Then: Old rows are kept, overlapping rows updated, new rows inserted
+        result = read_table(engine)
+        assert stats['created'] is False
+        assert result['sample_id'].tolist() == list(range(1, 16))
+        assert result.set_index('sample_id')['price'].to_dict() == {
+            **{i: 1.0 * i for i in range(1, 6)}, **{i: 2.0 * i for i in range(6, 16)}}
+        assert 'products_cleaned_staging' not in inspect(engine).get_table_names()
+
+    def test_upsert_into_table_without_unique_key(self, engine):
+        """Test that tables written by the old to_sql(replace) loader can be upserted into."""
+        # Given: A table with no unique index on sample_id
+        products(range(1, 4)).to_sql('products_cleaned', engine, index=False)
+
+        # When: Upserting
+        bulk_upsert(products(range(3, 5), price=3.0), 'products_cleaned', engine)
+
+        # Then: The key row is updated rather than duplicated
+        assert read_table(engine)['price'].tolist() == [1.0, 2.0, 9.0, 12.0]
+
+    def test_wide_frames_stay_under_bind_limit(self, engine, monkeypatch):
+        """Test that rows per INSERT shrink with the column count."""
+        # Given: A tight bind-parameter limit
+        monkeypatch.setattr('db_loader.MAX_BIND_PARAMS', 10)
+        df = products(range(1, 21))
+
+        # When: Loading 4-column rows
+        bulk_upsert(df, 'products_cleaned', engine)
+
+        # Then: Every row still lands
+        assert len(read_table(engine)) == 20
+
+
+class TestCopyPayload:
+    """Test suite for the CSV sent to PostgreSQL COPY."""
+
+    def test_missing_values_are_bare_empty_fields(self):
+        """Test that NaN and None are unquoted empty fields, which COPY (FORMAT csv) loads as NULL."""
+        # Given: Missing numbers and text, plus text that needs quoting
+        chunk = pd.DataFrame({'price': [1.5, np.nan], 'catalog_content': ['a, "b"', None],
+                              'sample_id': [1, 2]})
+
+        # When: Writing the payload
+        payload = _csv_payload(chunk)
+
+        # Then: No quoted "" for the missing cells
+        assert payload == '1.5,"a, ""b""",1\n,,2\n'
@@ -0,0 +1,135 @@
+"""
+Unit tests for the memory-mapped embedding store.
+Tests the IVF index against exact search, storage format and comparable prices.
+"""
+import numpy as np
+import pytest
+
+from embedding_store import (EmbeddingStore, benchmark, build_store, comparable_price,
+                             comparable_prices, synthetic_embeddings)
+
+
+@pytest.fixture(scope="module")
+def store_parts():
+    X = synthetic_embeddings(2000, 32, n_clusters=20, seed=1)
+    return [X[:, :16], X[:, 16:]]
+
+
+@pytest.fixture(scope="module")
+def store(store_parts, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("embeddings") / "store")
+    prices = np.linspace(1, 100, 2000)
+    build_store(store_parts, np.arange(1000, 3000), prices, path, n_lists=16)
+    return EmbeddingStore(path, n_probe=4)
+
+
+class TestEmbeddingStoreBuild:
+    """Test suite for the stored format."""
+
+    def test_vectors_are_memory_mapped_float16(self, store):
+        """Test that vectors are a read-only float16 map with unit-norm rows."""
+        assert isinstance(store.vectors, np.memmap)
+        assert store.vectors.dtype == np.float16
+        assert store.dim == 32
+        np.testing.assert_allclose(np.linalg.norm(store.vectors.astype(np.float32), axis=1), 1, atol=1e-2)
+
+    def test_lists_keep_every_row_once(self, store):
+        """Test that the list-ordered rows are a permutation of the input rows."""
+        assert store.offsets[-1] == store.n_rows
+        assert sorted(store.rows.tolist()) == list(range(2000))
+        np.testing.assert_array_equal(store.sample_ids, np.asarray(store.rows) + 1000)
+
+    def test_mismatched_inputs_are_rejected(self, store_parts, tmp_path):
+        """Test that row counts must agree."""
+        with pytest.raises(ValueError, match="same number of rows"):
+            build_store(store_parts, np.arange(10), np.ones(10), str(tmp_path / "store"))
+
+
+class TestEmbeddingStoreSearch:
+    """Test suite for nearest-neighbour queries."""
+
+    def test_probing_every_list_is_exact(self, store):
+        """Test that n_probe equal to the list count gives the brute-force answer."""
+        # Given: A stored item's vector
+        query = store.vector(store.position(1500))
+
+        # When: Searching every list and scanning every row
+        positions, scores = store.search(query, k=10, n_probe=len(store.centroids))
+        exact_positions, exact_scores = store.search_exact(query, k=10)
+
+        # Then: Same neighbours, best first, the item itself on top
+        np.testing.assert_array_equal(positions, exact_positions)
+        assert np.all(np.diff(scores) <= 0)
+        assert store.sample_ids[positions[0]] == 1500
+
+    def test_recall_with_few_probes(self, store):
+        """Test that probing a quarter of the lists finds most true neighbours."""
+        hits = 0
+        for sample_id in range(1000, 3000, 40):
+            query = store.vector(store.position(sample_id))
+            truth = set(store.search_exact(query, k=10)[0].tolist())
+            hits += len(truth.intersection(store.search(query, k=10)[0].tolist()))
+
+        assert hits / (10 * 50) > 0.9
+
+    def test_query_vector_and_exclusion(self, store, store_parts):
+        """Test raw per-source embeddings as queries and leaving an item out."""
+        # Given: The raw embeddings of the item at row 7
+        raw = [part[7].tolist() for part in store_parts]
+        position = store.position(1007)
+
+        # When: Querying with them, excluding the item
+        neighbours = store.neighbours(store.query_vector(raw), k=5, exclude=position)
+
+        # Then: Five other items, with prices
+        assert len(neighbours) == 5
+        assert 1007 not in [n['sample_id'] for n in neighbours]
+        assert all(n['price'] > 0 for n in neighbours)
+        with pytest.raises(ValueError, match="sizes"):
+            store.query_vector([raw[0]])
+
+    @pytest.mark.parametrize("bad", [float("nan"), float("inf"), 1e39])
+    def test_non_finite_query_is_rejected(self, store, store_parts, bad):
+        """Test that NaN, infinity and float32 overflow are refused, not searched."""
+        # Given: Raw embeddings with one bad value
+        raw = [part[7].tolist() for part in store_parts]
+        raw[0][0] = bad
+
+        # When / Then: Building the query fails up front
+        with pytest.raises(ValueError, match="finite"):
+            store.query_vector(raw)
+
+    def test_unknown_sample_id_raises(self, store):
+        """Test that ids outside the store are reported."""
+        with pytest.raises(KeyError):
+            store.position(5)
+
+
+class TestComparablePrice:
+    """Test suite for the comparable-price feature."""
+
+    def test_weighted_geometric_mean(self):
+        """Test the log-space average and its edge cases."""
+        assert comparable_price([10.0, 10.0], [0.9, 0.1]) == pytest.approx(10.0)
+        assert comparable_price([], []) is None
+        # Non-positive similarities fall back to equal weights
+        assert comparable_price([0.0, 3.0], [-1.0, 0.0]) == pytest.approx(1.0)
+
+    def test_feature_for_every_row(self, store):
+        """Test that every training row gets a price from its neighbours."""
+        values = comparable_prices(store, k=5)
+
+        assert values.shape == (2000,)
+        assert np.all(np.isfinite(values))
+        assert values.min() >= 1 and values.max() <= 100
+
+
+class TestEmbeddingBenchmark:
+    """Test suite for the synthetic benchmark."""
+
+    def test_benchmark_reports_recall_and_latency(self):
+        """Test the synthetic benchmark on a small store."""
+        report = benchmark(n_rows=2000, dim=16, n_probes=(1, 1000), n_queries=20)
+
+        assert report['probes'][1000]['recall'] == 1.0
+        assert report['build_seconds'] > 0
@@ -0,0 +1,80 @@
+"""
+Unit tests for the vocabulary-restricted TF-IDF transform.
+Tests that VocabularyTfidf reproduces TfidfVectorizer.transform exactly.
+"""
+import joblib
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from benchmark import synthetic_catalog
+from fast_tfidf import VocabularyTfidf, vectorizer_settings
+
+EDGE_TEXTS = ["", "   ", "of the and", "tea tea tea tea", "Ünïcode café crème_brûlée",
+              "pack of 12 pack of 12", "x y z", "item_name: earl grey tea\tcount: 100"]
+
+
+def assert_identical(result, expected):
+    assert result.shape == expected.shape
+    assert result.dtype == expected.dtype
+    np.testing.assert_array_equal(result.indptr, expected.indptr)
+    np.testing.assert_array_equal(result.indices, expected.indices)
+    np.testing.assert_array_equal(result.data, expected.data)
+
+
+class TestVocabularyTfidf:
+    """Test suite for VocabularyTfidf parity with the fitted vectorizer."""
+
+    def test_matches_saved_vectorizer(self):
+        """Test bit-identical output for the served vectorizer on catalog and edge-case text."""
+        # Given: The trained vectorizer and catalog-like documents, including a long one
+        vectorizer = joblib.load('vectorizer.pkl')
+        texts = synthetic_catalog(1000, seed=5) + EDGE_TEXTS
+        texts.append(" ".join(texts[:50]))
+
+        # When: Transforming with both
+        expected = vectorizer.transform(texts)
+        result = VocabularyTfidf.from_vectorizer(vectorizer).transform(texts)
+
+        # Then: Same CSR arrays
+        assert_identical(result, expected)
+
+    @pytest.mark.parametrize("params", [
+        dict(ngram_range=(2, 3)),
+        dict(ngram_range=(1, 2), binary=True, norm='l1'),
+        dict(ngram_range=(1, 3), sublinear_tf=True, use_idf=False),
+        dict(ngram_range=(1, 1), norm=None, token_pattern=r"(?u)\b\w+\b"),
+        dict(ngram_range=(1, 3), max_features=50, dtype=np.float32),
+    ])
+    def test_matches_other_vectorizer_settings(self, params):
+        """Test parity for n-gram ranges, weighting options, token patterns and dtypes."""
+        train = synthetic_catalog(300, seed=1)
+        vectorizer = TfidfVectorizer(stop_words='english', **params).fit(train)
+        texts = synthetic_catalog(200, seed=2) + EDGE_TEXTS
+
+        assert_identical(VocabularyTfidf.from_vectorizer(vectorizer).transform(texts), vectorizer.transform(texts))
+
+    @pytest.mark.parametrize("params", [
+        dict(ngram_range=(1, 3)),
+        dict(ngram_range=(1, 2), strip_accents='unicode', sublinear_tf=True),
+        dict(ngram_range=(1, 1), lowercase=False, strip_accents='ascii', token_pattern=r"(?u)\b\w+\b"),
+    ])
+    def test_from_settings_matches_vectorizer(self, params):
+        """Test that stored settings, vocabulary and idf_ rebuild the same transform."""
+        # Given: A fitted vectorizer reduced to its plain settings
+        vectorizer = TfidfVectorizer(stop_words='english', **params).fit(synthetic_catalog(300, seed=1))
+        settings = vectorizer_settings(vectorizer)
+        texts = synthetic_catalog(200, seed=2) + EDGE_TEXTS
+
+        # When: Rebuilding without the vectorizer object
+        fast = VocabularyTfidf.from_settings(dict(vectorizer.vocabulary_), vectorizer.idf_, settings)
+
+        # Then: Same CSR arrays
+        assert_identical(fast.transform(texts), vectorizer.transform(texts))
+
+    def test_rejects_character_analyzers(self):
+        """Test that analyzers it cannot mirror are refused."""
+        vectorizer = TfidfVectorizer(analyzer='char', ngram_range=(2, 3)).fit(["abc", "bcd"])
+
+        with pytest.raises(ValueError, match="analyzer='word'"):
+            VocabularyTfidf.from_vectorizer(vectorizer)
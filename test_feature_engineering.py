@@ -0,0 +1,160 @@
+"""
+Unit tests for feature extraction and model-input assembly.
+Tests that the vectorized parser matches the row-by-row helpers and that
+the sparse feature path matches the legacy dense layout.
+"""
+import random
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from feature_engineering import (
+    process_text_features, assemble_features, build_features,
+    find_brand, check_for_bulk, extract_ipq, ONE_HOT_BRANDS
+)
+
+
+SAMPLE_TEXTS = pd.Series([
+    "Pack of 12 Apple iPhones 16GB with A15 Bionic chip",
+    "McCormick Ground Cinnamon, 2.37 oz (Case of 6)",
+    "Item Name: Organic green tea, Count: 100 bags",
+    "The best kitchen bucket ever",
+    "",
+])
+
+
+def process_text_features_rowwise(text_series):
+    """The original apply-based implementation, kept as the parity reference."""
+    df = pd.DataFrame(index=text_series.index)
+    df['brand'] = text_series.apply(find_brand)
+    df['is_bulk'] = text_series.apply(check_for_bulk)
+    df['item_quantity'] = text_series.apply(extract_ipq)
+    for b in ONE_HOT_BRANDS:
+        df[f'brand_{b}'] = (df['brand'] == b).astype(int)
+    return df
+
+
+def random_catalog_texts(n, seed=0):
+    """Random texts mixing brands, prefixes, quantities and edge-case tokens."""
+    rng = random.Random(seed)
+    vocab = [
+        "Item Name:", "item", "Product Name -", "description", "-", ":", "Pack of", "PACK OF",
+        "count", "Count:", "IPQ", "12", "3", "torani", "rani", "sweden", "Apple", "SONY",
+        "hp", "the", "a", "new", "Nike", "kit", "bulk", "bottles", "x", "ab", "\t", "\n",
+        "Ünïcode", "Kirkland's", "Bob's",
+    ]
+    return [" ".join(rng.choice(vocab) for _ in range(rng.randint(0, 12))) for _ in range(n)]
+
+
+@pytest.fixture(scope="module")
+def artifacts():
+    return joblib.load('model.pkl'), joblib.load('vectorizer.pkl')
+
+
+class TestProcessTextFeaturesParity:
+    """Test suite for the vectorized process_text_features engine."""
+    
+    def test_matches_rowwise_helpers_on_sample_texts(self):
+        """Test parity with find_brand/check_for_bulk/extract_ipq on catalog-like text."""
+        # Given: Realistic catalog descriptions
+        texts = SAMPLE_TEXTS
+        
+        # When: Parsing with both implementations
+        expected = process_text_features_rowwise(texts)
+        result = process_text_features(texts)
+        
+        # Then: Should be identical
+        pd.testing.assert_frame_equal(result, expected)
+    
+    def test_matches_rowwise_helpers_on_random_texts(self):
+        """Test parity on randomized texts, including overlapping brand names."""
+        # Given: Thousands of random texts plus degenerate inputs
+        texts = pd.Series(random_catalog_texts(5000) + ["", "   ", "item --", "Item Name:", "x"])
+        
+        # When: Parsing with both implementations
+        expected = process_text_features_rowwise(texts)
+        result = process_text_features(texts)
+        
+        # Then: Should be identical
+        pd.testing.assert_frame_equal(result, expected)
+    
+    def test_brand_priority_follows_list_order(self):
+        """Test that the first listed brand wins, not the first one in the text."""
+        # Given: 'torani' contains 'rani', which is listed earlier
+        texts = pd.Series(["Torani syrup", "Sony and Apple bundle"])
+        
+        # When: Parsing
+        result = process_text_features(texts)
+        
+        # Then: Should follow KNOWN_BRANDS order
+        assert result['brand'].tolist() == ["Rani", "Apple"]
+    
+    def test_missing_values_and_index_are_preserved(self):
+        """Test that NaN/None are handled like str(x) and the input index is kept."""
+        # Given: A Series with missing values and a non-default, duplicated index
+        texts = pd.Series(["Pack of 3 kits", None, np.nan], index=[7, 7, 9], dtype=object)
+        
+        # When: Parsing with both implementations
+        expected = process_text_features_rowwise(texts)
+        result = process_text_features(texts)
+        
+        # Then: Should be identical, with the original index
+        pd.testing.assert_frame_equal(result, expected)
+        assert result.index.tolist() == [7, 7, 9]
+
+
+class TestSparseFeatureAssembly:
+    """Test suite for the shared CSR feature assembly."""
+    
+    def test_build_features_is_csr_with_model_width(self, artifacts):
+        """Test that the assembled matrix is CSR and as wide as the model input."""
+        # Given: The trained model and vectorizer
+        model, vectorizer = artifacts
+        
+        # When: Building features for a batch of texts
+        X = build_features(SAMPLE_TEXTS, vectorizer)
+        
+        # Then: Should be sparse with one row per text and the trained width
+        assert sparse.isspmatrix_csr(X)
+        assert X.shape == (len(SAMPLE_TEXTS), model.n_features_in_)
+    
+    def test_sparse_matches_legacy_dense_layout(self, artifacts):
+        """Test that the CSR matrix holds the same values as the old np.hstack layout."""
+        # Given: The trained vectorizer
+        _, vectorizer = artifacts
+        
+        # When: Building the sparse matrix and the legacy dense matrix
+        X_sparse = build_features(SAMPLE_TEXTS, vectorizer)
+        parsed = process_text_features(SAMPLE_TEXTS).drop(columns=['brand'])
+        X_dense = np.hstack([parsed.values, vectorizer.transform(SAMPLE_TEXTS).toarray()])
+        
+        # Then: Should be identical
+        assert np.array_equal(X_sparse.toarray(), X_dense.astype(np.float64))
+    
+    def test_sparse_and_dense_predictions_identical(self, artifacts):
+        """Test that LightGBM predicts exactly the same from CSR and dense input."""
+        # Given: Features for a batch of texts
+        model, vectorizer = artifacts
+        X = build_features(SAMPLE_TEXTS, vectorizer)
+        
+        # When: Predicting from both representations
+        sparse_pred = model.predict(X)
+        dense_pred = model.predict(X.toarray())
+        
+        # Then: Predictions should be bit-for-bit identical
+        assert np.array_equal(sparse_pred, dense_pred)
+    
+    def test_assemble_features_without_brand_column(self):
+        """Test that assembly works when the parsed frame has no raw brand column."""
+        # Given: Parsed features without 'brand' and a small TF-IDF block
+        parsed = pd.DataFrame({'is_bulk': [1, 0], 'item_quantity': [12, 1]})
+        tfidf = sparse.csr_matrix(np.array([[0.0, 0.5], [1.0, 0.0]]))
+        
+        # When: Assembling
+        X = assemble_features(parsed, tfidf)
+        
+        # Then: Parsed columns come first
+        assert X.toarray().tolist() == [[1.0, 12.0, 0.0, 0.5], [0.0, 1.0, 1.0, 0.0]]
@@ -0,0 +1,91 @@
+"""
+Unit tests for the pandas-free serving feature pipeline.
+Tests parity with build_features, the saved schema checks and the benchmark.
+"""
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import feature_pipeline
+from feature_engineering import build_features
+from feature_pipeline import FeaturePipeline, benchmark, parsed_columns
+from test_feature_engineering import SAMPLE_TEXTS, random_catalog_texts
+
+
+@pytest.fixture(scope="module")
+def vectorizer():
+    return joblib.load('vectorizer.pkl')
+
+
+def assert_same_matrix(a, b):
+    assert a.shape == b.shape
+    np.testing.assert_array_equal(a.toarray(), b.toarray())
+
+
+class TestFeaturePipelineParity:
+    """Test suite for FeaturePipeline output against the DataFrame path."""
+
+    def test_matches_build_features_on_random_texts(self, vectorizer):
+        """Test identical matrices on randomized and degenerate catalog texts."""
+        # Given: Random texts plus edge cases
+        texts = SAMPLE_TEXTS.tolist() + random_catalog_texts(2000, seed=1) + ["   ", "item --", "x"]
+
+        # When: Featurizing with both paths
+        expected = build_features(pd.Series(texts), vectorizer)
+        result = FeaturePipeline(vectorizer).transform(texts)
+
+        # Then: Same layout and values
+        assert_same_matrix(result, expected)
+
+    def test_single_row_and_missing_values(self, vectorizer):
+        """Test that one text, None and NaN are featurized like the DataFrame path."""
+        pipeline = FeaturePipeline(vectorizer)
+
+        for text in ["Pack of 12 Apple iPhones", None, np.nan]:
+            expected = build_features(pd.Series([text, "Sony TV"], dtype=object), vectorizer)[:1]
+            assert_same_matrix(pipeline.transform_one(text), expected)
+
+    def test_parse_one_follows_column_layout(self, vectorizer):
+        """Test that the parsed row is in process_text_features column order."""
+        pipeline = FeaturePipeline(vectorizer)
+
+        row = pipeline.parse_one("Bulk pack, Count: 24")
+
+        assert pipeline.columns == parsed_columns()
+        assert row[pipeline.columns.index('is_bulk')] == 1
+        assert row[pipeline.columns.index('item_quantity')] == 24
+
+
+class TestFeaturePipelinePersistence:
+    """Test suite for saving and loading the pipeline."""
+
+    def test_round_trip_without_vectorizer(self, vectorizer, tmp_path):
+        """Test that the saved file omits the vectorizer and reloads bound to it."""
+        path = str(tmp_path / 'feature_pipeline.pkl')
+        FeaturePipeline(vectorizer).save(path)
+
+        assert joblib.load(path).vectorizer is None
+        loaded = FeaturePipeline.load(path, vectorizer)
+        assert_same_matrix(loaded.transform(SAMPLE_TEXTS), build_features(SAMPLE_TEXTS, vectorizer))
+
+    def test_schema_mismatch_is_rejected(self, vectorizer, tmp_path, monkeypatch):
+        """Test that a pipeline saved under another schema version or layout fails to load."""
+        path = str(tmp_path / 'feature_pipeline.pkl')
+        FeaturePipeline(vectorizer).save(path)
+
+        monkeypatch.setattr(feature_pipeline, 'SCHEMA_VERSION', 2)
+        with pytest.raises(ValueError, match="schema version"):
+            FeaturePipeline.load(path, vectorizer)
+
+        monkeypatch.setattr(feature_pipeline, 'SCHEMA_VERSION', 1)
+        monkeypatch.setattr(feature_pipeline, 'parsed_columns', lambda: ['is_bulk'])
+        with pytest.raises(ValueError, match="columns"):
+            FeaturePipeline.load(path, vectorizer)
+
+    def test_benchmark_reports_identical_outputs(self, vectorizer):
+        """Test that the microbenchmark times both paths and confirms parity."""
+        results = benchmark(vectorizer, SAMPLE_TEXTS.tolist(), batch_sizes=(1, 8), repeats=2)
+
+        assert [r['batch_size'] for r in results] == [1, 8]
+        assert all(r['identical'] and r['pipeline_ms'] > 0 for r in results)
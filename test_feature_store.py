@@ -0,0 +1,112 @@
+"""
+Unit tests for the on-disk training feature store.
+Tests cache hits, key invalidation, memory-mapped loading and eviction.
+"""
+import os
+
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import feature_store as fs
+from feature_engineering import assemble_features, process_text_features
+from feature_store import FeatureStore
+
+TEXTS = pd.Series([
+    "Pack of 12 Apple iPhones 16GB",
+    "Item Name: McCormick Ground Cinnamon, 2.37 oz (Case of 6)",
+    "Twinings Earl Grey tea, Count: 100 bags",
+    None,
+    "Value: 3, Bulk pack of Kirkland's paper towels",
+] * 20)
+
+
+def make_vectorizer(**params):
+    return TfidfVectorizer(**{'ngram_range': (1, 2), 'max_features': 50, **params})
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore(str(tmp_path / "store"))
+
+
+class TestFeatureStore:
+    """Test suite for FeatureStore."""
+
+    def test_cached_features_match_fresh_extraction(self, store, monkeypatch):
+        """Test that a second run loads identical features without refitting."""
+        # Given: A first run that extracted and stored features
+        fresh = store.fit_transform(TEXTS, make_vectorizer())
+
+        # When: Running again with the same inputs (and a counting parser)
+        calls = []
+        original = fs.process_text_features
+        monkeypatch.setattr(fs, 'process_text_features', lambda s: calls.append(1) or original(s))
+        cached = store.fit_transform(TEXTS, make_vectorizer())
+
+        # Then: Nothing is recomputed and the model input is identical
+        assert calls == []
+        # (read-only views over the memory-mapped files, not copies)
+        assert not cached.tfidf.data.flags.writeable and not cached.tfidf.data.flags.owndata
+        assert (assemble_features(cached.parsed, cached.tfidf)
+                != assemble_features(fresh.parsed, fresh.tfidf)).nnz == 0
+        assert cached.vectorizer.vocabulary_ == fresh.vectorizer.vocabulary_
+        assert list(cached.parsed['brand']) == list(fresh.parsed['brand'])
+
+    def test_key_changes_with_data_settings_and_code(self, store, monkeypatch):
+        """Test that the key covers input text, vectorizer params and feature code."""
+        key = store.make_key(TEXTS, make_vectorizer())
+
+        assert store.make_key(TEXTS, make_vectorizer()) == key
+        assert store.make_key(TEXTS.str.upper(), make_vectorizer()) != key
+        assert store.make_key(TEXTS, make_vectorizer(max_features=60)) != key
+        monkeypatch.setattr(fs, 'feature_code_version', lambda: "edited")
+        assert store.make_key(TEXTS, make_vectorizer()) != key
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test that the store drops the oldest entries beyond its size limit."""
+        # Given: A store that fits roughly one entry
+        store = FeatureStore(str(tmp_path / "store"), max_bytes=1)
+        first = store.make_key(TEXTS, make_vectorizer())
+        store.fit_transform(TEXTS, make_vectorizer())
+        os.utime(os.path.join(store.root, first), (0, 0))
+
+        # When: Adding a second entry
+        store.fit_transform(TEXTS, make_vectorizer(max_features=60))
+
+        # Then: Only the newer entry remains
+        assert store.get(first) is None
+        assert len(os.listdir(store.root)) == 1
+
+    def test_parse_caches_parsed_features_only(self, store, monkeypatch):
+        """Test the parsed-only entries used by the ETL and batch scoring."""
+        # Given: Parsed features stored from one set of row labels
+        fresh = store.parse(TEXTS)
+
+        # When: Parsing the same text under other row labels (with a counting parser)
+        calls = []
+        monkeypatch.setattr(fs, 'process_text_features', lambda s: calls.append(1) or process_text_features(s))
+        shifted = TEXTS.set_axis(TEXTS.index + 1000)
+        cached = store.parse(shifted)
+
+        # Then: Loaded from the store, relabelled, equal to a fresh parse
+        assert calls == []
+        assert cached.index.equals(shifted.index)
+        assert list(cached.columns) == list(fresh.columns)
+        assert all(list(cached[col]) == list(fresh[col]) for col in fresh.columns)
+        assert store.make_parsed_key(TEXTS) != store.make_key(TEXTS, make_vectorizer())
+
+    def test_directory_is_scanned_only_when_the_limit_may_be_exceeded(self, store, monkeypatch):
+        """Test that puts under the size limit do not re-list the store each time."""
+        # Given: A store far below its limit, with a counting directory scan
+        scans = []
+        original = FeatureStore._entries
+        monkeypatch.setattr(FeatureStore, '_entries', lambda self: scans.append(1) or original(self))
+
+        # When: Adding several parsed-feature entries
+        for i in range(5):
+            store.parse(TEXTS + f" {i}")
+
+        # Then: One initial scan, no eviction
+        assert len(scans) == 1
+        assert len(os.listdir(store.root)) == 5
@@ -0,0 +1,133 @@
+"""
+Unit tests for the concurrent image downloader.
+Tests dedup, retries, resume and the per-host limit against a local HTTP server.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from image_fetcher import ImageFetcher, iter_manifest
+
+IMAGE_A = b'\x89PNG fake image A' * 100
+IMAGE_B = b'\xff\xd8 fake image B' * 100
+
+
+class ImageServer(BaseHTTPRequestHandler):
+    """Stand-in image host: fixed images, a 404, a flaky URL and a slow URL."""
+    flaky_calls = 0
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        if self.path.startswith('/slow/'):
+            with cls.lock:
+                cls.active += 1
+                cls.max_active = max(cls.max_active, cls.active)
+            time.sleep(0.05)
+            with cls.lock:
+                cls.active -= 1
+            return self.reply(200, self.path.encode() * 10, 'image/jpeg')
+        if self.path == '/flaky.jpg':
+            cls.flaky_calls += 1
+            if cls.flaky_calls == 1:
+                return self.reply(503, b'busy', 'text/plain')
+            return self.reply(200, IMAGE_B, 'image/jpeg')
+        images = {'/a.png': IMAGE_A, '/copy-of-a.png': IMAGE_A, '/b.jpg': IMAGE_B, '/a-as-jpeg': IMAGE_A}
+        if self.path in images:
+            return self.reply(200, images[self.path], 'image/png' if 'png' in self.path else 'image/jpeg')
+        self.reply(404, b'not found', 'text/plain')
+
+    def reply(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), ImageServer)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+class TestImageFetcher:
+    """Test suite for downloading into the content-addressed store."""
+
+    def test_downloads_dedups_and_reports(self, server, tmp_path):
+        """Test that identical images are stored once and failures are counted."""
+        # Given: Two URLs with the same image, another image and a broken link
+        fetcher = ImageFetcher(str(tmp_path), workers=4, backoff=0)
+        items = [(1, f"{server}/a.png"), (2, f"{server}/copy-of-a.png"),
+                 (3, f"{server}/b.jpg"), (4, f"{server}/missing.jpg"), (5, None)]
+
+        # When: Fetching
+        stats = fetcher.fetch(items)
+
+        # Then: Two files on disk, one duplicate, two failures, all in the manifest
+        assert stats['downloaded'] == 2 and stats['duplicates'] == 1 and stats['failed'] == 2
+        records = {r['sample_id']: r for r in iter_manifest(fetcher.manifest_path, status=None)}
+        assert records[1]['sha256'] == records[2]['sha256']
+        assert records[1]['path'].endswith('.png') and records[3]['path'].endswith('.jpg')
+        assert records[4]['status'] == 'failed' and records[5]['error'] == 'missing url'
+        with open(tmp_path / records[3]['path'], 'rb') as f:
+            assert f.read() == IMAGE_B
+
+    def test_rerun_resumes_from_manifest(self, server, tmp_path):
+        """Test that a second run skips finished items without new requests."""
+        # Given: One completed run
+        items = [(1, f"{server}/a.png"), (2, f"{server}/b.jpg")]
+        ImageFetcher(str(tmp_path), backoff=0).fetch(items)
+
+        # When: Running again with one extra item pointing at a known URL
+        fetcher = ImageFetcher(str(tmp_path), backoff=0)
+        stats = fetcher.fetch(items + [(3, f"{server}/a.png")])
+
+        # Then: Everything is a cache hit and only the new item is added to the manifest
+        assert stats['cached'] == 3 and stats['downloaded'] == 0
+        assert stats['cache_hit_rate'] == 1.0
+        # (records are appended in completion order)
+        assert sorted(r['sample_id'] for r in iter_manifest(fetcher.manifest_path)) == [1, 2, 3]
+
+    def test_same_bytes_with_another_type_are_not_stored_twice(self, server, tmp_path):
+        """Test that the dedup check uses the content hash, not the extension."""
+        # Given: The same image served once as PNG and once as JPEG
+        fetcher = ImageFetcher(str(tmp_path), workers=1, backoff=0)
+
+        # When: Fetching both
+        stats = fetcher.fetch([(1, f"{server}/a.png"), (2, f"{server}/a-as-jpeg")])
+
+        # Then: One file, which both records point to
+        records = list(iter_manifest(fetcher.manifest_path))
+        assert stats['downloaded'] == 1 and stats['duplicates'] == 1
+        assert records[0]['path'] == records[1]['path']
+        assert len(list((tmp_path / records[0]['sha256'][:2]).iterdir())) == 1
+
+    def test_retries_server_errors(self, server, tmp_path):
+        """Test that a 503 is retried through the pooled session."""
+        stats = ImageFetcher(str(tmp_path), backoff=0).fetch([(1, f"{server}/flaky.jpg")])
+
+        assert stats['downloaded'] == 1 and stats['failed'] == 0
+
+    def test_per_host_limit(self, server, tmp_path):
+        """Test that no more than per_host requests reach one host at a time."""
+        # Given: Many workers but two slots per host
+        fetcher = ImageFetcher(str(tmp_path), workers=8, per_host=2)
+        ImageServer.max_active = 0
+
+        # When: Fetching slow images
+        stats = fetcher.fetch([(i, f"{server}/slow/{i}.jpg") for i in range(12)])
+
+        # Then: All arrive, never more than two at once
+        assert stats['downloaded'] == 12
+        assert ImageServer.max_active == 2
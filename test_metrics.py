@@ -0,0 +1,106 @@
+"""
+Unit tests for the request metrics registry.
+Tests the Prometheus rendering, cross-worker aggregation and the per-request recording cost.
+"""
+import subprocess
+import sys
+import time
+
+from metrics import RequestMetrics, merge_snapshots, write_snapshot
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+class TestRequestMetrics:
+    """Test suite for RequestMetrics."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test le buckets, +Inf, sum and count in the exposition format."""
+        # Given: Three observations in different buckets
+        metrics = RequestMetrics(stages=('parse',), buckets=(0.001, 0.01))
+        for seconds in (0.0005, 0.005, 0.5):
+            metrics.observe('parse', seconds)
+
+        # When: Rendering
+        text = metrics.render('abc123')
+
+        # Then: Bucket counts accumulate up to the total
+        assert 'pricing_stage_latency_seconds_bucket{stage="parse",le="0.001"} 1' in text
+        assert 'pricing_stage_latency_seconds_bucket{stage="parse",le="0.01"} 2' in text
+        assert 'pricing_stage_latency_seconds_bucket{stage="parse",le="+Inf"} 3' in text
+        assert 'pricing_stage_latency_seconds_count{stage="parse"} 3' in text
+        assert 'pricing_model_info{version="abc123"} 1' in text
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes and backslashes in error types cannot break the format."""
+        metrics = RequestMetrics()
+        metrics.error('Bad"Type\\')
+
+        assert 'pricing_errors_total{type="Bad\\"Type\\\\"} 1' in metrics.render('v')
+
+    def test_recording_overhead_is_microseconds(self):
+        """Test that one request's worth of recording stays within a few microseconds."""
+        metrics = RequestMetrics()
+        stages = (('process_text_features', 1e-4), ('vectorizer_transform', 1e-4),
+                  ('assembly', 1e-5), ('model_predict', 1e-4))
+        n = 20000
+
+        start = time.perf_counter()
+        for _ in range(n):
+            metrics.request_started('/predict')
+            metrics.observe('parse', 1e-5)
+            metrics.observe_stages(stages)
+            metrics.observe('serialization', 1e-5)
+            metrics.request_finished()
+        per_request_us = (time.perf_counter() - start) / n * 1e6
+
+        # Generous bound for slow CI machines; typically ~5us
+        assert per_request_us < 50
+
+
+class TestWorkerAggregation:
+    """Test suite for summing metrics across serve.py workers."""
+
+    def test_shared_dir_sums_every_workers_snapshot(self, tmp_path):
+        """Test that a scrape of one worker reports the totals of all of them."""
+        # Given: Another worker's published snapshot, and this worker's own counts
+        other = RequestMetrics(stages=('parse',), buckets=(0.001,))
+        other.request_started('/predict')
+        other.observe('parse', 0.0005)
+        other.error('ValueError')
+        snapshot = other.snapshot()
+        snapshot['pid'] = exited_pid()
+        write_snapshot(str(tmp_path), snapshot)
+        metrics = RequestMetrics(stages=('parse',), buckets=(0.001,), shared_dir=str(tmp_path))
+        metrics.request_started('/predict')
+        metrics.observe('parse', 0.01)
+
+        # When: Rendering
+        text = metrics.render('v')
+
+        # Then: Counters and histograms are summed; the exited worker's in-flight request is not
+        assert 'pricing_requests_total{endpoint="/predict"} 2' in text
+        assert 'pricing_errors_total{type="ValueError"} 1' in text
+        assert 'pricing_stage_latency_seconds_bucket{stage="parse",le="0.001"} 1' in text
+        assert 'pricing_stage_latency_seconds_count{stage="parse"} 2' in text
+        assert 'pricing_requests_in_flight 1' in text
+        assert 'pricing_workers 1' in text
+
+    def test_merge_keeps_extra_histograms_by_name(self):
+        """Test that micro-batch histograms from several workers are added up."""
+        from micro_batcher import Histogram
+
+        sizes = Histogram((1, 8))
+        sizes.observe(4)
+        extra = (('pricing_micro_batch_size', 'Batch sizes.', sizes, 1.0),)
+        first, second = RequestMetrics().snapshot(extra), RequestMetrics().snapshot(extra)
+        second['pid'] = exited_pid()
+
+        merged = merge_snapshots([first, second])
+
+        assert len(merged['extra']) == 1
+        assert merged['extra'][0]['counts'] == [0, 2, 0] and merged['extra'][0]['count'] == 2
@@ -0,0 +1,114 @@
+"""
+Unit tests for the asyncio micro-batcher.
+Tests request coalescing, result routing, batch limits and per-item errors.
+"""
+import asyncio
+
+from micro_batcher import MicroBatcher
+
+
+class RecordingPredictor:
+    """predict_fn stand-in that records the batches it receives."""
+    
+    def __init__(self):
+        self.batches = []
+    
+    def __call__(self, items):
+        self.batches.append(list(items))
+        return [ValueError(f"bad item {x}") if x < 0 else x * 10 for x in items]
+
+
+async def submit_all(batcher, items):
+    return await asyncio.gather(*(batcher.submit(x) for x in items), return_exceptions=True)
+
+
+class TestMicroBatcher:
+    """Test suite for MicroBatcher."""
+    
+    def test_concurrent_requests_share_one_batch(self):
+        """Test that calls arriving within the window are predicted together."""
+        # Given: A batcher with a generous window
+        predictor = RecordingPredictor()
+        batcher = MicroBatcher(predictor, max_batch_size=64, max_wait_ms=50)
+        
+        # When: Submitting ten requests concurrently
+        results = asyncio.run(submit_all(batcher, list(range(10))))
+        
+        # Then: One predict call, and each caller gets its own result
+        assert predictor.batches == [list(range(10))]
+        assert results == [x * 10 for x in range(10)]
+    
+    def test_max_batch_size_splits_batches(self):
+        """Test that no batch exceeds max_batch_size."""
+        # Given: A batcher limited to 4 items per batch
+        predictor = RecordingPredictor()
+        batcher = MicroBatcher(predictor, max_batch_size=4, max_wait_ms=50)
+        
+        # When: Submitting ten requests concurrently
+        results = asyncio.run(submit_all(batcher, list(range(10))))
+        
+        # Then: Batches of at most 4, results still routed in order
+        assert [len(b) for b in predictor.batches] == [4, 4, 2]
+        assert results == [x * 10 for x in range(10)]
+    
+    def test_item_error_only_fails_that_caller(self):
+        """Test that an Exception result is raised to its own caller only."""
+        # Given: A batch containing one bad item
+        batcher = MicroBatcher(RecordingPredictor(), max_wait_ms=20)
+        
+        # When: Submitting it with good items
+        results = asyncio.run(submit_all(batcher, [1, -1, 2]))
+        
+        # Then: Only the middle caller sees the error
+        assert results[0] == 10 and results[2] == 20
+        assert isinstance(results[1], ValueError)
+    
+    def test_predict_fn_failure_fails_whole_batch(self):
+        """Test that a crashing predict_fn is surfaced to every caller."""
+        # Given: A predictor that always raises
+        def broken(items):
+            raise RuntimeError("model unavailable")
+        batcher = MicroBatcher(broken, max_wait_ms=10)
+        
+        # When: Submitting two requests
+        results = asyncio.run(submit_all(batcher, [1, 2]))
+        
+        # Then: Both should fail with the predictor's error
+        assert all(isinstance(r, RuntimeError) for r in results)
+    
+    def test_short_result_list_fails_every_caller(self):
+        """Test that callers are not left waiting when predict_fn drops results."""
+        # Given: A predictor that returns one result fewer than it was given
+        batcher = MicroBatcher(lambda items: [x * 10 for x in items][:-1], max_wait_ms=20)
+        
+        # When: Submitting three requests
+        results = asyncio.run(asyncio.wait_for(submit_all(batcher, [1, 2, 3]), timeout=5))
+        
+        # Then: All three fail instead of hanging
+        assert all(isinstance(r, RuntimeError) for r in results)
+    
+    def test_stats_record_batch_size_and_queue_wait(self):
+        """Test that batch size and queue wait histograms are filled."""
+        # Given: A batcher that has served one batch of three
+        batcher = MicroBatcher(RecordingPredictor(), max_wait_ms=20)
+        asyncio.run(submit_all(batcher, [1, 2, 3]))
+        
+        # When: Reading stats
+        stats = batcher.stats()
+        
+        # Then: One batch of 3 and three queue-wait observations
+        assert stats['batch_size']['count'] == 1
+        assert stats['batch_size']['mean'] == 3
+        assert stats['queue_wait_ms']['count'] == 3
+    
+    def test_rebinds_to_new_event_loop(self):
+        """Test that the batcher keeps working when served from a new event loop."""
+        # Given: A batcher already used on one loop
+        batcher = MicroBatcher(RecordingPredictor(), max_wait_ms=5)
+        asyncio.run(submit_all(batcher, [1]))
+        
+        # When: Used again from a fresh loop
+        results = asyncio.run(submit_all(batcher, [2]))
+        
+        # Then: Should still answer
+        assert results == [20]
@@ -0,0 +1,133 @@
+"""
+Unit tests for the in-process prediction cache.
+Tests key normalization, LRU eviction, TTL expiry and artifact versioning.
+"""
+import os
+
+from prediction_cache import PredictionCache, artifact_fingerprint, normalize_catalog_content
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests."""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestPredictionCache:
+    """Test suite for PredictionCache."""
+    
+    def test_hit_after_put(self):
+        """Test that a stored price is returned and counted as a hit."""
+        # Given: A cache with one entry
+        cache = PredictionCache(max_size=10)
+        cache.put("Pack of 12 Apple iPhones", "v1", 42.0)
+        
+        # When: Looking it up again
+        result = cache.get("Pack of 12 Apple iPhones", "v1")
+        
+        # Then: Should hit
+        assert result == 42.0
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 0
+    
+    def test_normalized_text_shares_entry(self):
+        """Test that case and trailing whitespace do not change the key."""
+        # Given: A cached description
+        cache = PredictionCache(max_size=10)
+        cache.put("Pack of 12 Apple iPhones", "v1", 42.0)
+        
+        # When: Looking up a differently-cased variant
+        result = cache.get("PACK OF 12 apple iphones  \n", "v1")
+        
+        # Then: Should hit the same entry
+        assert result == 42.0
+    
+    def test_normalization_keeps_leading_and_inner_whitespace(self):
+        """Test that whitespace the features depend on is not normalized away."""
+        # Given: Texts whose parsed features differ ("Pack  of" does not match the IPQ pattern)
+        # When: Normalizing
+        # Then: Should stay distinct
+        assert normalize_catalog_content("Pack  of 3") != normalize_catalog_content("Pack of 3")
+        assert normalize_catalog_content(" item: x") != normalize_catalog_content("item: x")
+    
+    def test_version_change_misses(self):
+        """Test that entries from another artifact version are not returned."""
+        # Given: An entry stored under v1
+        cache = PredictionCache(max_size=10)
+        cache.put("Kirkland olive oil", "v1", 10.0)
+        
+        # When: Looking it up under v2
+        result = cache.get("Kirkland olive oil", "v2")
+        
+        # Then: Should miss
+        assert result is None
+        assert cache.stats()['misses'] == 1
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted at the size bound."""
+        # Given: A full cache of two where 'a' was used most recently
+        cache = PredictionCache(max_size=2)
+        cache.put("a", "v1", 1.0)
+        cache.put("b", "v1", 2.0)
+        cache.get("a", "v1")
+        
+        # When: Adding a third entry
+        cache.put("c", "v1", 3.0)
+        
+        # Then: 'b' should be gone
+        assert cache.get("b", "v1") is None
+        assert cache.get("a", "v1") == 1.0
+        assert cache.get("c", "v1") == 3.0
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['size'] == 2
+    
+    def test_ttl_expiry(self):
+        """Test that entries older than the TTL are treated as misses."""
+        # Given: A cache with a 60 second TTL
+        clock = FakeClock()
+        cache = PredictionCache(max_size=10, ttl_seconds=60, clock=clock)
+        cache.put("a", "v1", 1.0)
+        
+        # When: Time passes beyond the TTL
+        clock.now = 61.0
+        
+        # Then: Should miss and drop the entry
+        assert cache.get("a", "v1") is None
+        assert cache.stats()['size'] == 0
+    
+    def test_zero_size_disables_cache(self):
+        """Test that max_size=0 never stores anything."""
+        cache = PredictionCache(max_size=0)
+        cache.put("a", "v1", 1.0)
+        
+        assert cache.get("a", "v1") is None
+        assert cache.stats()['size'] == 0
+
+
+class TestArtifactFingerprint:
+    """Test suite for artifact version detection."""
+    
+    def test_fingerprint_changes_when_file_changes(self, tmp_path):
+        """Test that rewriting an artifact changes the fingerprint."""
+        # Given: An artifact file and its fingerprint
+        path = tmp_path / "model.pkl"
+        path.write_bytes(b"old")
+        before = artifact_fingerprint([str(path)])
+        
+        # When: The file is rewritten
+        path.write_bytes(b"new model")
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+        
+        # Then: The fingerprint should differ
+        assert artifact_fingerprint([str(path)]) != before
+    
+    def test_fingerprint_is_stable(self, tmp_path):
+        """Test that an untouched artifact keeps its fingerprint."""
+        path = tmp_path / "model.pkl"
+        path.write_bytes(b"model")
+        
+        assert artifact_fingerprint([str(path)]) == artifact_fingerprint([str(path)])
@@ -0,0 +1,108 @@
+"""
+Unit tests for the streaming bulk-scoring CLI.
+Tests chunked scoring against a direct predict and resuming a partial run.
+"""
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_engineering import build_features
+from score_csv import score_csv
+
+TEXTS = [
+    "Pack of 12 Apple iPhones 16GB",
+    "Item Name: McCormick Ground Cinnamon, 2.37 oz (Case of 6)",
+    "Twinings Earl Grey tea, Count: 100 bags",
+    "Value: 3, Bulk pack of Kirkland's paper towels",
+    "",
+    "Sony headphones",
+]
+
+
+@pytest.fixture
+def catalog_csv(tmp_path):
+    texts = [f"{TEXTS[i % len(TEXTS)]} {i}" for i in range(53)]
+    df = pd.DataFrame({'sample_id': np.arange(1000, 1053), 'catalog_content': texts})
+    df.loc[7, 'catalog_content'] = None
+    path = tmp_path / "catalog.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def expected_prices(path):
+    model, vectorizer = joblib.load('model.pkl'), joblib.load('vectorizer.pkl')
+    df = pd.read_csv(path)
+    return np.expm1(model.predict(build_features(df['catalog_content'], vectorizer)))
+
+
+class TestScoreCsv:
+    """Test suite for score_csv."""
+
+    def test_chunked_scores_match_direct_predict(self, catalog_csv, tmp_path):
+        """Test that chunked, parallel scoring keeps input order and prices."""
+        # Given: A catalog larger than one chunk
+        output = tmp_path / "out.csv"
+
+        # When: Scoring it in chunks of 10 with two workers
+        stats = score_csv(str(catalog_csv), str(output), chunksize=10, workers=2)
+
+        # Then: Every row is priced, in order, as a single direct predict would
+        result = pd.read_csv(output)
+        assert list(result.columns) == ['sample_id', 'price']
+        assert result['sample_id'].tolist() == list(range(1000, 1053))
+        np.testing.assert_allclose(result['price'], expected_prices(catalog_csv), rtol=1e-12)
+        assert stats['rows'] == 53 and stats['chunks'] == 6
+        assert not (tmp_path / "out.csv.progress").exists()
+
+    def test_rescoring_reuses_the_feature_store(self, catalog_csv, tmp_path):
+        """Test that a second run loads parsed features and prices identically."""
+        # Given: One run that filled a feature store
+        store = tmp_path / "store"
+        score_csv(str(catalog_csv), str(tmp_path / "first.csv"), chunksize=10, workers=1,
+                  feature_store_dir=str(store))
+
+        # When: Scoring the same file again
+        score_csv(str(catalog_csv), str(tmp_path / "second.csv"), chunksize=10, workers=1,
+                  feature_store_dir=str(store))
+
+        # Then: One entry per chunk, and the cached run matches a direct predict
+        assert len(list(store.iterdir())) == 6
+        result = pd.read_csv(tmp_path / "second.csv")
+        np.testing.assert_allclose(result['price'], expected_prices(catalog_csv), rtol=1e-12)
+
+    def test_resumes_from_last_completed_chunk(self, catalog_csv, tmp_path):
+        """Test that a crashed run continues after its last checkpoint."""
+        # Given: A run that checkpointed 2 chunks and then died mid-write
+        output = tmp_path / "out.csv"
+        score_csv(str(catalog_csv), str(output), chunksize=10, workers=1)
+        full = output.read_text()
+        lines = full.splitlines(keepends=True)
+        checkpoint = "".join(lines[:21])
+        output.write_text(checkpoint + lines[21][:5])
+        (tmp_path / "out.csv.progress").write_text(json.dumps({
+            'input': str(catalog_csv), 'chunksize': 10, 'chunks_done': 2,
+            'rows_done': 20, 'output_bytes': len(checkpoint.encode()),
+        }))
+
+        # When: Running again
+        stats = score_csv(str(catalog_csv), str(output), chunksize=10, workers=1)
+
+        # Then: Only the remaining chunks are scored and the output is complete
+        assert stats['skipped_chunks'] == 2
+        assert stats['rows'] == 33
+        assert output.read_text() == full
+
+    def test_progress_from_other_input_is_rejected(self, catalog_csv, tmp_path):
+        """Test that a checkpoint is not applied to a different run."""
+        output = tmp_path / "out.csv"
+        output.write_text("sample_id,price\n")
+        (tmp_path / "out.csv.progress").write_text(json.dumps({
+            'input': "/elsewhere.csv", 'chunksize': 10, 'chunks_done': 1,
+            'rows_done': 10, 'output_bytes': 16,
+        }))
+
+        with pytest.raises(ValueError):
+            score_csv(str(catalog_csv), str(output), chunksize=10, workers=1)
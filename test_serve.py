@@ -0,0 +1,45 @@
+"""
+Unit tests for the pre-fork launcher.
+Tests the worker restart backoff and crash-rate limit.
+"""
+from serve import RestartLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRestartLimiter:
+    """Test suite for RestartLimiter."""
+
+    def test_backoff_grows_then_gives_up(self):
+        """Test exponential delays and giving up after too many exits in the window."""
+        # Given: At most 3 restarts per minute
+        clock = FakeClock()
+        limiter = RestartLimiter(max_restarts=3, window_seconds=60, base_delay=0.5, max_delay=1.5,
+                                 clock=clock)
+
+        # When: Workers keep exiting a second apart
+        delays = []
+        for _ in range(4):
+            delays.append(limiter.record_exit())
+            clock.now += 1
+
+        # Then: Capped exponential delays, then None
+        assert delays == [0.5, 1.0, 1.5, None]
+
+    def test_old_exits_leave_the_window(self):
+        """Test that occasional crashes far apart are always restarted promptly."""
+        clock = FakeClock()
+        limiter = RestartLimiter(max_restarts=2, window_seconds=60, clock=clock)
+
+        delays = []
+        for _ in range(5):
+            delays.append(limiter.record_exit())
+            clock.now += 120
+
+        assert delays == [limiter.base_delay] * 5
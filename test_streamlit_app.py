@@ -0,0 +1,47 @@
+"""
+Unit tests for the Streamlit app's scoring helpers.
+Tests chunked bulk scoring against the API's prediction path.
+"""
+import numpy as np
+
+import app as api
+import streamlit_app
+from benchmark import synthetic_catalog
+
+
+class TestBulkScoring:
+    """Test suite for score_catalog."""
+    
+    def test_chunks_match_single_pass(self):
+        """Test that chunked prices equal the API's and progress reaches 1."""
+        # Given: Loaded artifacts and more rows than one chunk
+        model, pipeline = streamlit_app.load_model()
+        texts = synthetic_catalog(25, seed=4)
+        progress = []
+        
+        # When: Scoring in chunks of 10
+        prices = streamlit_app.score_catalog(texts, model, pipeline, chunk_size=10,
+                                             on_progress=progress.append)
+        
+        # Then: Same prices as one API pass, progress after every chunk
+        np.testing.assert_allclose(prices, api.predict_prices(texts), rtol=1e-12)
+        assert progress == [0.4, 0.8, 1.0]
+    
+    def test_missing_descriptions_are_priced(self):
+        """Test that empty cells from a CSV do not break a chunk."""
+        model, pipeline = streamlit_app.load_model()
+        
+        prices = streamlit_app.score_catalog(["Twinings Earl Grey tea", None, float("nan")], model, pipeline)
+        
+        assert prices.shape == (3,)
+        assert np.all(np.isfinite(prices))
+    
+    def test_single_prediction_is_cached_by_text(self):
+        """Test that a repeated description is served from st.cache_data."""
+        model, pipeline = streamlit_app.load_model()
+        streamlit_app.cached_predict_price.clear()
+        
+        first = streamlit_app.cached_predict_price("Kirkland olive oil 2 pack", model, pipeline)
+        second = streamlit_app.cached_predict_price("Kirkland olive oil 2 pack", None, None)
+        
+        assert first == second == streamlit_app.predict_price("Kirkland olive oil 2 pack", model, pipeline)
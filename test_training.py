@@ -0,0 +1,133 @@
+"""
+Unit tests for out-of-core LightGBM training.
+Tests the streamed feature rows, the held-out split, binary Dataset reuse
+and the SMAPE metric and tuned parameters used by tune.py.
+"""
+import json
+import os
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import training
+from feature_engineering import assemble_features, process_text_features
+from training import (
+    FeatureSequence, build_datasets, dataset_cache_key, load_tuned_params, parsed_matrix, smape,
+    smape_metric, split_rows, train_out_of_core
+)
+from tree_predictor import make_predictor
+
+WORDS = ["tea", "coffee", "Pack of", "12", "Apple", "bulk", "oz", "Count:", "3", "Sony", "case"]
+
+
+@pytest.fixture(scope="module")
+def features():
+    rng = np.random.default_rng(3)
+    texts = pd.Series([" ".join(rng.choice(WORDS, rng.integers(1, 8))) for _ in range(1500)])
+    parsed = process_text_features(texts)
+    tfidf = TfidfVectorizer(ngram_range=(1, 2)).fit_transform(texts)
+    # A learnable target: quantity and a couple of words drive the price
+    label = (np.log1p(parsed['item_quantity'].to_numpy())
+             + texts.str.contains('coffee').to_numpy() + rng.normal(0, 0.1, len(texts)))
+    return parsed, tfidf, label
+
+
+class TestFeatureSequence:
+    """Test suite for the streamed feature rows."""
+
+    def test_rows_match_assembled_matrix(self, features):
+        """Test that ints, slices and lists give the same rows as assemble_features."""
+        parsed, tfidf, _ = features
+        rows = np.array([5, 17, 18, 400, 1499])
+        dense = assemble_features(parsed, tfidf)[rows].toarray()
+        seq = FeatureSequence(parsed_matrix(parsed), tfidf, rows)
+
+        np.testing.assert_array_equal(seq[1], dense[1])
+        np.testing.assert_array_equal(seq[1:4], dense[1:4])
+        np.testing.assert_array_equal(seq[[0, 4]], dense[[0, 4]])
+
+    def test_split_is_a_partition(self):
+        """Test that train and validation rows are disjoint and cover every row."""
+        train_rows, valid_rows = split_rows(1000, 0.2, seed=1)
+
+        assert len(valid_rows) == 200
+        assert np.array_equal(np.sort(np.concatenate([train_rows, valid_rows])), np.arange(1000))
+
+
+class TestTrainOutOfCore:
+    """Test suite for train_out_of_core."""
+
+    def test_early_stopping_and_binary_reuse(self, features, tmp_path, monkeypatch):
+        """Test that a rerun reuses the saved binary Datasets and gives the same model."""
+        parsed, tfidf, label = features
+        kwargs = dict(num_boost_round=300, early_stopping_rounds=10, valid_fraction=0.2,
+                      cache_dir=str(tmp_path), feature_key="features-v1")
+
+        # Given: A first run that builds and saves the Datasets
+        first = train_out_of_core(parsed, tfidf, label, **kwargs)
+        assert sorted(f.split('.')[-2] for f in os.listdir(tmp_path)) == ['train', 'valid']
+
+        # When: Training again without being able to build Datasets from features
+        monkeypatch.setattr(training, 'FeatureSequence', None)
+        second = train_out_of_core(parsed, tfidf, label, **kwargs)
+
+        # Then: Both models stopped early and predict identically
+        X = assemble_features(parsed, tfidf)
+        assert first.num_trees() < 300
+        np.testing.assert_array_equal(first.predict(X), second.predict(X))
+
+    def test_changed_labels_rebuild_the_binary_datasets(self, features, tmp_path):
+        """Test that new prices for the same texts are never trained from stale cached labels."""
+        # Given: Binary Datasets cached for one set of labels
+        parsed, tfidf, label = features
+        params = {'verbose': -1}
+        key = dataset_cache_key("features-v1", label, params, 0.2, 42)
+        build_datasets(parsed, tfidf, label, params, 0.2, cache_dir=str(tmp_path), cache_key=key)
+
+        # When: Building again with the same features but changed labels
+        new_label = label + 1.0
+        new_key = dataset_cache_key("features-v1", new_label, params, 0.2, 42)
+        train, _ = build_datasets(parsed, tfidf, new_label, params, 0.2, cache_dir=str(tmp_path),
+                                  cache_key=new_key)
+
+        # Then: A new key, and the Dataset carries the new labels
+        assert new_key != key
+        train_rows, _ = split_rows(len(label), 0.2, 42)
+        np.testing.assert_allclose(train.get_label(), new_label[train_rows])
+        assert len(os.listdir(tmp_path)) == 4
+
+    def test_booster_is_servable(self, features):
+        """Test that the trained Booster works with the API's predictor wrappers."""
+        parsed, tfidf, label = features
+        booster = train_out_of_core(parsed, tfidf, label, num_boost_round=20, valid_fraction=0)
+        X = assemble_features(parsed, tfidf)[:50]
+
+        numpy_model = make_predictor(booster, 'numpy')
+
+        np.testing.assert_allclose(numpy_model.predict(X), booster.predict(X), rtol=1e-9, atol=1e-12)
+
+
+class TestTuningHelpers:
+    """Test suite for the helpers shared with tune.py."""
+
+    def test_smape_metric_scores_prices(self):
+        """Test that the feval undoes log1p before computing SMAPE."""
+        prices = np.array([10.0, 20.0, 5.0])
+        dataset = lgb.Dataset(np.zeros((3, 1)), label=np.log1p(prices)).construct()
+
+        name, value, higher_is_better = smape_metric(np.log1p(prices * 1.1), dataset)
+
+        assert name == 'smape' and higher_is_better is False
+        assert value == pytest.approx(smape(prices, prices * 1.1))
+
+    def test_load_tuned_params(self, tmp_path):
+        """Test reading tune.py output, and None before any tuning run."""
+        path = tmp_path / 'tuned_params.json'
+        assert load_tuned_params(str(path)) is None
+
+        path.write_text(json.dumps({'params': {'num_leaves': 63}, 'num_boost_round': 812, 'smape': 41.2}))
+
+        assert load_tuned_params(str(path))['params'] == {'num_leaves': 63}
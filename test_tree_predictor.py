@@ -0,0 +1,123 @@
+"""
+Unit tests for the array-backed tree ensemble evaluator.
+Tests parity with native LightGBM, missing-value handling and export round trips.
+"""
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from feature_engineering import build_features
+from tree_predictor import NumpyTreeEnsemble, HybridPredictor, make_predictor
+
+
+@pytest.fixture(scope="module")
+def served_model():
+    return joblib.load('model.pkl')
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["nan_missing", "zero_missing"])
+def model_with_missing_values(request):
+    """Small model trained on data with NaNs and zeros (NaN- and Zero-type missing splits)."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 6))
+    X[rng.random(X.shape) < 0.2] = np.nan
+    X[:, 3] = np.where(rng.random(2000) < 0.5, 0.0, X[:, 3])
+    y = np.nan_to_num(X[:, 0]) * 2 + np.isnan(X[:, 1]) + (X[:, 3] == 0) + rng.normal(size=2000) * 0.1
+    model = lgb.LGBMRegressor(n_estimators=50, num_leaves=15, verbose=-1,
+                              zero_as_missing=request.param)
+    model.fit(X, y)
+    return model, X
+
+
+class TestNumpyTreeEnsembleParity:
+    """Test suite for parity with LightGBM's own predict."""
+    
+    @pytest.mark.parametrize("batch_size", [1, 32, 200])
+    def test_parity_on_random_sparse_input(self, served_model, batch_size):
+        """Test that predictions match native LightGBM to 1e-9."""
+        # Given: The served model and random TF-IDF-like sparse rows
+        ensemble = NumpyTreeEnsemble.from_model(served_model)
+        X = sparse.random(batch_size, ensemble.n_features_in_, density=0.01, format='csr',
+                          random_state=batch_size)
+        
+        # When: Predicting with both
+        expected = served_model.predict(X)
+        result = ensemble.predict(X)
+        
+        # Then: Should agree to 1e-9
+        np.testing.assert_allclose(result, expected, rtol=0, atol=1e-9)
+    
+    def test_parity_on_real_features(self, served_model):
+        """Test parity on features built from catalog text."""
+        # Given: Features from the real pipeline
+        vectorizer = joblib.load('vectorizer.pkl')
+        texts = pd.Series(["Pack of 12 Apple iPhones", "McCormick cinnamon 2.37 oz", "Kirkland case of 6"])
+        X = build_features(texts, vectorizer)
+        
+        # When: Predicting with both
+        ensemble = NumpyTreeEnsemble.from_model(served_model)
+        
+        # Then: Should agree to 1e-9
+        np.testing.assert_allclose(ensemble.predict(X), served_model.predict(X), rtol=0, atol=1e-9)
+    
+    def test_parity_with_missing_values(self, model_with_missing_values):
+        """Test that NaN and zero handling mirrors LightGBM's missing-value rules."""
+        # Given: A model trained on data with NaNs and zeros
+        model, X = model_with_missing_values
+        
+        # When: Predicting with both
+        ensemble = NumpyTreeEnsemble.from_model(model)
+        
+        # Then: Should agree to 1e-9
+        np.testing.assert_allclose(ensemble.predict(X), model.predict(X), rtol=0, atol=1e-9)
+    
+    def test_wrong_feature_count_raises(self, served_model):
+        """Test that a matrix of the wrong width is rejected."""
+        ensemble = NumpyTreeEnsemble.from_model(served_model)
+        
+        with pytest.raises(ValueError):
+            ensemble.predict(np.zeros((1, 5)))
+
+
+class TestExportAndBackends:
+    """Test suite for the export format and serving backends."""
+    
+    def test_save_load_round_trip(self, served_model, tmp_path):
+        """Test that exported tables reload to an identical predictor."""
+        # Given: An exported ensemble
+        ensemble = NumpyTreeEnsemble.from_model(served_model)
+        path = tmp_path / "model_trees.npz"
+        ensemble.save(path)
+        
+        # When: Loading it back
+        loaded = NumpyTreeEnsemble.load(path)
+        
+        # Then: Predictions should be identical
+        X = sparse.random(10, ensemble.n_features_in_, density=0.01, format='csr', random_state=0)
+        assert np.array_equal(loaded.predict(X), ensemble.predict(X))
+    
+    def test_make_predictor_backends(self, served_model):
+        """Test that each backend name builds the expected predictor."""
+        assert make_predictor(served_model, 'lightgbm') is served_model
+        assert isinstance(make_predictor(served_model, 'numpy'), NumpyTreeEnsemble)
+        assert isinstance(make_predictor(served_model, 'auto'), HybridPredictor)
+        with pytest.raises(ValueError):
+            make_predictor(served_model, 'onnx')
+    
+    def test_hybrid_routes_by_batch_size(self, served_model):
+        """Test that 'auto' uses numpy for small batches and LightGBM for large ones."""
+        # Given: A hybrid predictor with a 4-row threshold and spies on both paths
+        hybrid = make_predictor(served_model, 'auto', max_numpy_rows=4)
+        calls = []
+        hybrid.ensemble.predict = lambda X: calls.append('numpy') or np.zeros(X.shape[0])
+        hybrid.model = type('Native', (), {'predict': lambda self, X: calls.append('lightgbm') or np.zeros(X.shape[0])})()
+        
+        # When: Predicting a small and a large batch
+        hybrid.predict(np.zeros((2, hybrid.n_features_in_)))
+        hybrid.predict(np.zeros((10, hybrid.n_features_in_)))
+        
+        # Then: Each should take its own path
+        assert calls == ['numpy', 'lightgbm']
@@ -0,0 +1,72 @@
+"""
+Unit tests for the parallel Optuna search.
+Runs a few trials on a synthetic catalog against SQLite storage and checks pruning.
+"""
+import json
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+
+optuna = pytest.importorskip('optuna')
+
+from tune import SmapePruningCallback, suggest_params, tune  # noqa: E402
+
+WORDS = ["tea", "coffee", "Pack of", "12", "Apple", "bulk", "oz", "Count:", "3", "Sony", "case"]
+
+
+@pytest.fixture
+def train_csv(tmp_path):
+    rng = np.random.default_rng(5)
+    texts = [" ".join(rng.choice(WORDS, rng.integers(1, 8))) for _ in range(400)]
+    prices = [5.0 + 20 * ("coffee" in t) + rng.uniform(0, 2) for t in texts]
+    path = tmp_path / "train.csv"
+    pd.DataFrame({'sample_id': range(400), 'catalog_content': texts, 'price': prices}).to_csv(path, index=False)
+    return path
+
+
+def callback_env(iteration, value):
+    return lgb.callback.CallbackEnv(model=None, params={}, iteration=iteration, begin_iteration=0,
+                                    end_iteration=100, evaluation_result_list=[('valid', 'smape', value, False)])
+
+
+class TestTune:
+    """Test suite for tune()."""
+
+    def test_trials_run_in_workers_and_best_params_are_written(self, train_csv, tmp_path, monkeypatch):
+        """Test a small two-worker study end to end."""
+        # Given: A synthetic catalog and a throwaway feature store and study database
+        monkeypatch.setenv("FEATURE_STORE_DIR", str(tmp_path / "store"))
+        output = tmp_path / "tuned_params.json"
+
+        # When: Running three trials across two workers
+        result = tune(trials=3, jobs=2, storage=f"sqlite:///{tmp_path / 'optuna.db'}",
+                      num_boost_round=40, early_stopping_rounds=10, output_path=str(output),
+                      train_path=str(train_csv))
+
+        # Then: Every trial is stored and the best one's full parameter set is written
+        with open(output) as f:
+            written = json.load(f)
+        assert written == result and written['trials'] == 3
+        assert set(written['params']) == set(suggest_params(optuna.trial.FixedTrial(written['params'])))
+        assert 1 <= written['num_boost_round'] <= 40
+        assert 0 <= written['smape'] <= 200
+
+
+class TestSmapePruningCallback:
+    """Test suite for the pruning callback."""
+
+    def test_reports_every_period_and_prunes(self):
+        """Test that SMAPE is reported on period boundaries and a pruned trial stops."""
+        # Given: A trial whose pruner prunes any SMAPE above 10
+        study = optuna.create_study(pruner=optuna.pruners.ThresholdPruner(upper=10.0))
+        trial = study.ask()
+        callback = SmapePruningCallback(trial, period=5)
+
+        # When/Then: Off-period rounds are ignored, a good value passes, a bad one prunes
+        callback(callback_env(3, 50.0))
+        callback(callback_env(4, 5.0))
+        with pytest.raises(optuna.TrialPruned):
+            callback(callback_env(9, 50.0))
+        assert study.trials[0].intermediate_values == {5: 5.0, 10: 50.0}
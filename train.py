@@ -1,36 +1,93 @@
+import argparse
 import pandas as pd
 import numpy as np
 import joblib  # Standard tool for saving ML models
 import lightgbm as lgb
 from sklearn.feature_extraction.text import TfidfVectorizer
-from feature_engineering import process_text_features # Import your own code!
+from feature_engineering import assemble_features # Import your own code!
+from feature_store import FeatureStore
+from config import get_feature_store_dir, get_feature_store_max_bytes
+from training import DEFAULT_PARAMS, load_tuned_params, train_out_of_core
+from cross_validation import cross_validate
+from feature_pipeline import PIPELINE_PATH, FeaturePipeline
+from artifact_bundle import BUNDLE_PATH, write_bundle
+
+parser = argparse.ArgumentParser(description="Train the pricing model")
+parser.add_argument('--out-of-core', action='store_true',
+                    help="Stream features into a cached binary lgb.Dataset instead of fitting in memory")
+parser.add_argument('--valid-fraction', type=float, default=0.1,
+                    help="Held-out share for early stopping (out-of-core mode)")
+parser.add_argument('--num-boost-round', type=int, default=500)
+parser.add_argument('--early-stopping-rounds', type=int, default=50)
+parser.add_argument('--cv', type=int, default=0, metavar='K',
+                    help="Train K folds in parallel, report OOF SMAPE and save their averaged ensemble")
+parser.add_argument('--ignore-tuned', action='store_true',
+                    help="Use the default parameters even if tune.py has written tuned_params.json")
+args = parser.parse_args()
+if args.cv and args.out_of_core:
+    parser.error("--cv trains on the in-memory matrix and cannot be combined with --out-of-core")
+
+# Parameters found by tune.py, when it has been run; the tuned round count
+# replaces the default 500 unless --num-boost-round is given explicitly
+tuned = None if args.ignore_tuned else load_tuned_params()
+params = {**DEFAULT_PARAMS, **(tuned['params'] if tuned else {})}
+num_boost_round = args.num_boost_round
+if tuned and num_boost_round == parser.get_default('num_boost_round'):
+    num_boost_round = tuned['num_boost_round']
+if tuned:
+    print(f"Using tuned parameters (validation SMAPE {tuned['smape']:.3f})")
 
 # 1. Load Data
 print("Loading data...")
 train_df = pd.read_csv('train.csv') # Ensure train.csv is in this folder
 y_train = np.log1p(train_df['price'])
 
-# 2. Feature Engineering (Regex/Parsing)
-print("Generating regex features...")
-X_parsed = process_text_features(train_df['catalog_content'])
-
-# 3. TF-IDF (The Turbocharger)
-print("Fitting TF-IDF...")
+# 2 & 3. Feature Engineering (Regex/Parsing) and TF-IDF (The Turbocharger)
+# Cached on disk by input data + feature code + TF-IDF settings, so reruns
+# after a model-only change skip straight to training
+print("Generating regex + TF-IDF features...")
+store = FeatureStore(get_feature_store_dir(), get_feature_store_max_bytes())
 tfidf = TfidfVectorizer(ngram_range=(1, 3), max_features=2000, stop_words='english')
-X_tfidf = tfidf.fit_transform(train_df['catalog_content'].fillna(''))
+feature_key = store.make_key(train_df['catalog_content'], tfidf)
+X_parsed, X_tfidf, tfidf = store.fit_transform(train_df['catalog_content'], tfidf, key=feature_key)
 
-# 4. Combine Features
-# Note: For this API demo, we are SKIPPING embeddings to keep it lightweight. 
-# If you want embeddings, you'd load the .npy files here.
-X_final = np.hstack([X_parsed.values, X_tfidf.toarray()])
+if args.out_of_core:
+    # 4 & 5. Stream [parsed | TF-IDF] batches into a binary lgb.Dataset (saved
+    # in the feature store entry and reused next time) and train with early
+    # stopping on a held-out split; the full matrix is never built in RAM
+    print("Training LightGBM out of core...")
+    model = train_out_of_core(X_parsed, X_tfidf, y_train, params, num_boost_round=num_boost_round,
+                              early_stopping_rounds=args.early_stopping_rounds,
+                              valid_fraction=args.valid_fraction,
+                              cache_dir=store.path(feature_key), feature_key=feature_key)
+else:
+    # 4. Combine Features
+    # Note: For this API demo, we are SKIPPING embeddings to keep it lightweight. 
+    # If you want embeddings, you'd load the .npy files here.
+    # Kept sparse (CSR) end to end: LightGBM trains on it directly.
+    X_final = assemble_features(X_parsed, X_tfidf)
 
-# 5. Train Model
-print("Training LightGBM...")
-model = lgb.LGBMRegressor(n_estimators=500, learning_rate=0.05, seed=42)
-model.fit(X_final, y_train)
+    if args.cv:
+        # 5. K-fold CV: folds train in parallel over shared-memory features;
+        # the fold models are averaged into the served model
+        print(f"Running {args.cv}-fold cross-validation...")
+        cv = cross_validate(X_final, y_train, n_splits=args.cv, params=params,
+                            num_boost_round=num_boost_round)
+        print(f"OOF SMAPE: {cv.smape:.3f} (folds: {', '.join(f'{s:.3f}' for s in cv.fold_scores)})")
+        np.save('oof_predictions.npy', np.expm1(cv.oof))
+        model = cv.ensemble()
+    else:
+        # 5. Train Model
+        print("Training LightGBM...")
+        model = lgb.LGBMRegressor(n_estimators=num_boost_round, **params)
+        model.fit(X_final, y_train)
 
 # 6. Save Artifacts (CRITICAL STEP)
-print("Saving model and vectorizer...")
+print("Saving model, vectorizer and feature pipeline...")
 joblib.dump(model, 'model.pkl')
 joblib.dump(tfidf, 'vectorizer.pkl')
-print("✅ Done! 'model.pkl' and 'vectorizer.pkl' are ready.")
\ No newline at end of file
+# Serving-side featurizer with the column layout the model was trained on
+FeaturePipeline(tfidf).save(PIPELINE_PATH)
+# Memory-mapped bundle (vocabulary, idf, model text and tree arrays) loaded by the API
+write_bundle(model, tfidf, BUNDLE_PATH)
+print(f"✅ Done! 'model.pkl', 'vectorizer.pkl', '{PIPELINE_PATH}' and '{BUNDLE_PATH}/' are ready.")
\ No newline at end of file
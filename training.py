@@ -0,0 +1,243 @@
+"""
+Out-of-core LightGBM training helpers.
+Feeds LightGBM the cached (memory-mapped) parsed and TF-IDF features through
+an lgb.Sequence, one dense row batch at a time, so the full feature matrix is
+never materialized. The constructed Datasets are saved in LightGBM's binary
+format next to the feature store entry and reused by later runs.
+"""
+import hashlib
+import json
+import numbers
+import os
+from typing import Optional, Tuple
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Defaults matching the in-memory LGBMRegressor in train.py
+DEFAULT_PARAMS = {
+    'objective': 'regression',
+    'learning_rate': 0.05,
+    'seed': 42,
+    'verbose': -1,
+}
+
+# Best parameters found by tune.py, picked up by train.py when present
+TUNED_PARAMS_PATH = 'tuned_params.json'
+
+# Dataset parameters that change how the binary file is built
+DATASET_PARAM_KEYS = ('max_bin', 'min_data_in_bin', 'bin_construct_sample_cnt',
+                      'zero_as_missing', 'use_missing', 'feature_pre_filter', 'seed')
+
+
+def parsed_matrix(features_parsed: pd.DataFrame) -> np.ndarray:
+    """The numeric parsed columns, in the order assemble_features stacks them."""
+    return features_parsed.drop(columns=['brand'], errors='ignore').to_numpy(dtype=np.float64)
+
+
+class FeatureSequence(lgb.Sequence):
+    """
+    Row access to [parsed | TF-IDF] for a subset of rows, densified per batch.
+
+    Rows match assemble_features(features_parsed, features_tfidf)[rows].
+    """
+
+    def __init__(self, parsed: np.ndarray, tfidf: sparse.csr_matrix, rows: np.ndarray,
+                 batch_size: int = 4096):
+        self.parsed = parsed
+        self.tfidf = tfidf
+        self.rows = np.asarray(rows)
+        self.batch_size = batch_size
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _dense(self, positions) -> np.ndarray:
+        selected = self.rows[positions]
+        return np.hstack([self.parsed[selected], self.tfidf[selected].toarray()])
+
+    def __getitem__(self, idx):
+        if isinstance(idx, numbers.Integral):
+            return self._dense([idx])[0]
+        if isinstance(idx, slice):
+            return self._dense(np.arange(*idx.indices(len(self))))
+        if isinstance(idx, list):
+            return self._dense(idx)
+        raise TypeError(f"Sequence index must be integer, slice or list, got {type(idx).__name__}")
+
+
+def split_rows(n_rows: int, valid_fraction: float, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Shuffle row ids into sorted train and held-out validation sets.
+
+    Args:
+        n_rows: Number of rows
+        valid_fraction: Share of rows held out (0 for none)
+        seed: Shuffle seed
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Train rows and validation rows
+    """
+    order = np.random.default_rng(seed).permutation(n_rows)
+    n_valid = int(round(n_rows * valid_fraction))
+    return np.sort(order[n_valid:]), np.sort(order[:n_valid])
+
+
+def dataset_cache_key(feature_key: str, label, params: dict, valid_fraction: float, seed: int) -> str:
+    """
+    Name for the binary Datasets built from one feature set, label, split and binning setup.
+
+    The label is part of the key because the feature key only covers the text:
+    changed prices with unchanged descriptions must not reuse the old targets.
+    """
+    label = np.ascontiguousarray(label, dtype=np.float64)
+    relevant = {k: params[k] for k in DATASET_PARAM_KEYS if k in params}
+    payload = json.dumps({'features': feature_key, 'params': relevant,
+                          'label': hashlib.sha256(label.tobytes()).hexdigest(), 'rows': len(label),
+                          'valid_fraction': valid_fraction, 'split_seed': seed}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def dataset_paths(cache_dir: str, cache_key: str) -> Tuple[str, str]:
+    """Paths of the train and validation binary Datasets for a cache key."""
+    return (os.path.join(cache_dir, f"lgb-{cache_key}.train.bin"),
+            os.path.join(cache_dir, f"lgb-{cache_key}.valid.bin"))
+
+
+def smape(y_true, y_pred) -> float:
+    """
+    Symmetric mean absolute percentage error, in percent (0 to 200).
+
+    Args:
+        y_true: Actual prices
+        y_pred: Predicted prices
+
+    Returns:
+        float: SMAPE; pairs where both values are 0 count as exact
+    """
+    y_true, y_pred = np.asarray(y_true, dtype=np.float64), np.asarray(y_pred, dtype=np.float64)
+    denominator = np.abs(y_true) + np.abs(y_pred)
+    ratio = np.divide(2 * np.abs(y_pred - y_true), denominator,
+                      out=np.zeros_like(denominator), where=denominator != 0)
+    return float(100 * ratio.mean())
+
+
+def smape_metric(preds: np.ndarray, dataset: lgb.Dataset):
+    """
+    LightGBM feval: SMAPE (percent) on the price scale for a log1p(price) target.
+
+    Returns:
+        Tuple[str, float, bool]: ('smape', value, is_higher_better=False)
+    """
+    return 'smape', smape(np.expm1(dataset.get_label()), np.expm1(preds)), False
+
+
+def load_tuned_params(path: str = TUNED_PARAMS_PATH) -> Optional[dict]:
+    """
+    Read the parameters written by tune.py.
+
+    Args:
+        path: JSON file from tune.py
+
+    Returns:
+        Optional[dict]: {'params': {...}, 'num_boost_round': int, ...}, or None if not tuned yet
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_datasets(features_parsed: pd.DataFrame, features_tfidf, label, params: dict = None,
+                   valid_fraction: float = 0.1, seed: int = 42, cache_dir: Optional[str] = None,
+                   cache_key: Optional[str] = None, batch_size: int = 4096):
+    """
+    Build (or reload) the training and validation Datasets.
+
+    Args:
+        features_parsed: Output of process_text_features
+        features_tfidf: TF-IDF matrix aligned with features_parsed
+        label: Training target (log price), one value per row
+        params: LightGBM parameters used for binning
+        valid_fraction: Share of rows held out for early stopping
+        seed: Split seed
+        cache_dir: Where binary Datasets are saved/reused (None disables)
+        cache_key: Name of the binary files, from dataset_cache_key
+        batch_size: Rows densified at a time while constructing
+
+    Returns:
+        Tuple[lgb.Dataset, Optional[lgb.Dataset]]: Train and validation (None if valid_fraction is 0)
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    train_bin = valid_bin = None
+    if cache_dir and cache_key:
+        train_bin, valid_bin = dataset_paths(cache_dir, cache_key)
+        if os.path.exists(train_bin) and (valid_fraction == 0 or os.path.exists(valid_bin)):
+            print(f"Reusing binary Datasets {cache_key}")
+            train = lgb.Dataset(train_bin, params=params)
+            valid = lgb.Dataset(valid_bin, reference=train, params=params) if valid_fraction else None
+            return train, valid
+
+    parsed = parsed_matrix(features_parsed)
+    tfidf = sparse.csr_matrix(features_tfidf)
+    label = np.asarray(label, dtype=np.float64)
+    train_rows, valid_rows = split_rows(len(label), valid_fraction, seed)
+
+    train = lgb.Dataset(FeatureSequence(parsed, tfidf, train_rows, batch_size),
+                        label=label[train_rows], params=params)
+    valid = None
+    if len(valid_rows):
+        valid = lgb.Dataset(FeatureSequence(parsed, tfidf, valid_rows, batch_size),
+                            label=label[valid_rows], reference=train, params=params)
+    train.construct()
+    if valid is not None:
+        valid.construct()
+
+    if train_bin:
+        # Write to a temporary name first so an interrupted save is never reused
+        for dataset, path in ((train, train_bin), (valid, valid_bin)):
+            if dataset is not None:
+                dataset.save_binary(path + '.tmp')
+                os.replace(path + '.tmp', path)
+    return train, valid
+
+
+def train_out_of_core(features_parsed: pd.DataFrame, features_tfidf, label, params: dict = None,
+                      num_boost_round: int = 500, early_stopping_rounds: int = 50,
+                      valid_fraction: float = 0.1, seed: int = 42, cache_dir: Optional[str] = None,
+                      feature_key: Optional[str] = None) -> lgb.Booster:
+    """
+    Train a LightGBM Booster from streamed feature batches, with early stopping on a held-out split.
+
+    Args:
+        features_parsed: Output of process_text_features
+        features_tfidf: TF-IDF matrix aligned with features_parsed
+        label: Training target (log price)
+        params: LightGBM parameters (merged over DEFAULT_PARAMS)
+        num_boost_round: Maximum boosting rounds
+        early_stopping_rounds: Stop after this many rounds without validation improvement
+        valid_fraction: Share of rows held out (0 trains on everything, without early stopping)
+        seed: Split seed
+        cache_dir: Directory for the binary Datasets (e.g. the feature store entry)
+        feature_key: Feature store key the Datasets were built from
+
+    Returns:
+        lgb.Booster: The trained model (best iteration when early stopping fired)
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    cache_key = dataset_cache_key(feature_key, label, params, valid_fraction, seed) if feature_key else None
+    train, valid = build_datasets(features_parsed, features_tfidf, label, params, valid_fraction,
+                                  seed, cache_dir, cache_key)
+    callbacks = [lgb.log_evaluation(period=50)]
+    valid_sets = []
+    if valid is not None:
+        valid_sets = [valid]
+        callbacks.append(lgb.early_stopping(early_stopping_rounds, verbose=True))
+    booster = lgb.train(params, train, num_boost_round=num_boost_round,
+                        valid_sets=valid_sets, valid_names=['valid'], callbacks=callbacks)
+    if booster.best_iteration:
+        # Serve the best round only
+        booster = lgb.Booster(model_str=booster.model_to_string(num_iteration=booster.best_iteration))
+    return booster
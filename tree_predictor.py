@@ -0,0 +1,364 @@
+"""
+Array-backed evaluator for the served LightGBM model.
+Converts a trained booster into flat node tables (feature index, threshold,
+left/right child, leaf value) and evaluates all trees over a batch with
+vectorized numpy, skipping the sklearn wrapper and the LightGBM C API.
+
+Usage:
+    python tree_predictor.py export model.pkl model_trees.npz
+    python tree_predictor.py benchmark model.pkl
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+from scipy import sparse
+
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+_MISSING_TYPES = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+# LightGBM's kZeroThreshold: |x| <= this counts as zero for missing_type 'Zero'
+K_ZERO_THRESHOLD = 1e-35
+# Objectives whose prediction is the raw tree sum
+_IDENTITY_OBJECTIVES = ('regression', 'regression_l1', 'huber', 'fair', 'quantile', 'mape')
+# Rows evaluated together; bounds the (rows x internal nodes) decision matrix
+ROW_BLOCK = 64
+
+ARRAY_FIELDS = ('split_feature', 'threshold', 'default_left', 'missing_type',
+                'left_child', 'right_child', 'leaf_value', 'root')
+
+
+class NumpyTreeEnsemble:
+    """
+    Tree ensemble stored as flat node tables.
+
+    Internal nodes of all trees are numbered 0..n_internal-1 and leaves
+    n_internal..n_internal+n_leaves-1, so a child id >= n_internal is a
+    leaf. root holds each tree's starting node.
+
+    Prediction first evaluates every split condition for a block of rows in
+    one vectorized step, then walks all (row, tree) pairs down together;
+    leaves point to themselves, so max_depth steps reach every leaf.
+    """
+
+    def __init__(self, split_feature, threshold, default_left, missing_type,
+                 left_child, right_child, leaf_value, root, n_features, max_depth,
+                 average_output=False):
+        self.split_feature = split_feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.missing_type = missing_type
+        self.left_child = left_child
+        self.right_child = right_child
+        self.leaf_value = leaf_value
+        self.root = root
+        self.n_features_in_ = int(n_features)
+        self.max_depth = int(max_depth)
+        self.average_output = bool(average_output)
+
+        # Transition table: next = _next[node + n_nodes * went_left]
+        n_internal = len(split_feature)
+        self._n_nodes = n_internal + len(leaf_value)
+        leaves = np.arange(n_internal, self._n_nodes, dtype=np.int32)
+        self._next = np.concatenate([right_child, leaves, left_child, leaves]).astype(np.int32)
+        self._node_value = np.concatenate([np.zeros(n_internal), leaf_value])
+        self._all_missing_none = not np.any(missing_type != MISSING_NONE)
+
+    @property
+    def n_trees(self):
+        return len(self.root)
+
+    @classmethod
+    def from_booster(cls, booster):
+        """
+        Build the tables from a lightgbm.Booster (via dump_model()).
+
+        Args:
+            booster: A trained lightgbm.Booster
+
+        Returns:
+            NumpyTreeEnsemble: The array-backed equivalent
+
+        Raises:
+            ValueError: If the model uses features this evaluator does not support
+        """
+        dump = booster.dump_model()
+        if dump['num_tree_per_iteration'] != 1:
+            raise ValueError("Only single-output models are supported")
+        objective = dump['objective'].split()[0]
+        if objective not in _IDENTITY_OBJECTIVES:
+            raise ValueError(f"Objective '{objective}' needs an output transform; not supported")
+
+        tree_info = dump['tree_info']
+        n_internal = sum(t['num_leaves'] - 1 for t in tree_info)
+        n_leaves = sum(t['num_leaves'] for t in tree_info)
+
+        split_feature = np.zeros(n_internal, dtype=np.int32)
+        threshold = np.zeros(n_internal, dtype=np.float64)
+        default_left = np.zeros(n_internal, dtype=bool)
+        missing_type = np.zeros(n_internal, dtype=np.int8)
+        left_child = np.zeros(n_internal, dtype=np.int32)
+        right_child = np.zeros(n_internal, dtype=np.int32)
+        leaf_value = np.zeros(n_leaves, dtype=np.float64)
+        root = np.zeros(len(tree_info), dtype=np.int32)
+
+        internal_base, leaf_base, max_depth = 0, 0, 0
+        for t, info in enumerate(tree_info):
+            def node_id(node):
+                if 'split_index' in node:
+                    return internal_base + node['split_index']
+                return n_internal + leaf_base + node.get('leaf_index', 0)
+
+            tree = info['tree_structure']
+            root[t] = node_id(tree)
+            stack = [(tree, 0)]
+            while stack:
+                node, depth = stack.pop()
+                max_depth = max(max_depth, depth)
+                if 'split_index' not in node:
+                    leaf_value[node_id(node) - n_internal] = node['leaf_value']
+                    continue
+                if node['decision_type'] != '<=':
+                    raise ValueError("Categorical splits are not supported")
+                i = node_id(node)
+                split_feature[i] = node['split_feature']
+                threshold[i] = node['threshold']
+                default_left[i] = node['default_left']
+                missing_type[i] = _MISSING_TYPES[node['missing_type']]
+                left_child[i] = node_id(node['left_child'])
+                right_child[i] = node_id(node['right_child'])
+                stack.extend([(node['left_child'], depth + 1), (node['right_child'], depth + 1)])
+            internal_base += info['num_leaves'] - 1
+            leaf_base += info['num_leaves']
+
+        return cls(split_feature, threshold, default_left, missing_type, left_child,
+                   right_child, leaf_value, root, n_features=dump['max_feature_idx'] + 1,
+                   max_depth=max_depth, average_output=dump.get('average_output', False))
+
+    @classmethod
+    def from_model(cls, model):
+        """Build from an LGBMRegressor (or anything with .booster_), a Booster or a fold ensemble."""
+        if hasattr(model, 'boosters'):
+            return cls.average([cls.from_booster(b) for b in model.boosters])
+        return cls.from_booster(getattr(model, 'booster_', model))
+
+    @classmethod
+    def average(cls, ensembles):
+        """
+        Merge ensembles into one whose prediction is the mean of theirs.
+
+        The mean of K tree sums is the sum over all trees with every leaf
+        value divided by K, so the trees are simply concatenated.
+
+        Args:
+            ensembles: NumpyTreeEnsembles over the same features
+
+        Returns:
+            NumpyTreeEnsemble: The merged tables
+        """
+        if any(e.average_output for e in ensembles):
+            raise ValueError("Averaging ensembles with average_output is not supported")
+        n_internal = sum(len(e.split_feature) for e in ensembles)
+        internal_base, leaf_base, parts = 0, 0, []
+        for e in ensembles:
+            e_internal = len(e.split_feature)
+
+            def remap(ids, e_internal=e_internal, internal_base=internal_base, leaf_base=leaf_base):
+                return np.where(ids < e_internal, ids + internal_base,
+                                n_internal + leaf_base + (ids - e_internal)).astype(np.int32)
+
+            parts.append((remap(e.left_child), remap(e.right_child), remap(e.root)))
+            internal_base += e_internal
+            leaf_base += len(e.leaf_value)
+
+        def concat(field):
+            return np.concatenate([getattr(e, field) for e in ensembles])
+
+        return cls(concat('split_feature'), concat('threshold'), concat('default_left'),
+                   concat('missing_type'), np.concatenate([p[0] for p in parts]),
+                   np.concatenate([p[1] for p in parts]),
+                   concat('leaf_value') / len(ensembles), np.concatenate([p[2] for p in parts]),
+                   n_features=ensembles[0].n_features_in_,
+                   max_depth=max(e.max_depth for e in ensembles))
+
+    def to_arrays(self):
+        """Return the tables (plus metadata) as a dict of numpy arrays."""
+        arrays = {name: getattr(self, name) for name in ARRAY_FIELDS}
+        arrays['n_features'] = np.array(self.n_features_in_)
+        arrays['max_depth'] = np.array(self.max_depth)
+        arrays['average_output'] = np.array(self.average_output)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(**{name: arrays[name] for name in ARRAY_FIELDS},
+                   n_features=int(arrays['n_features']),
+                   max_depth=int(arrays['max_depth']),
+                   average_output=bool(arrays['average_output']))
+
+    def save(self, path):
+        """Write the tables to an uncompressed .npz file."""
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls.from_arrays({k: arrays[k] for k in arrays.files})
+
+    def predict(self, X):
+        """
+        Predict for a batch.
+
+        Args:
+            X: Feature matrix (dense array or scipy sparse), shape (n_rows, n_features)
+
+        Returns:
+            np.ndarray: Raw predictions, shape (n_rows,)
+        """
+        if not sparse.issparse(X):
+            X = np.asarray(X, dtype=np.float64)
+            if X.ndim == 1:
+                X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], ROW_BLOCK):
+            block = X if X.shape[0] <= ROW_BLOCK else X[start:start + ROW_BLOCK]
+            block = block.toarray() if sparse.issparse(block) else block
+            out[start:start + len(block)] = self._predict_block(block)
+        if self.average_output:
+            out /= self.n_trees
+        return out
+
+    def _predict_block(self, X):
+        n_rows, n_trees, n_nodes = X.shape[0], self.n_trees, self._n_nodes
+
+        # 1. Every split decision for every row at once, stored as the offset
+        #    into the transition table (n_nodes = go left, 0 = go right)
+        went_left = self._decide(X[:, self.split_feature])
+        offsets = np.full((n_rows, n_nodes), n_nodes, dtype=np.int32)  # leaves: stay put
+        offsets[:, :len(self.split_feature)] = went_left * np.int32(n_nodes)
+        offsets = offsets.ravel()
+
+        # 2. Walk all (row, tree) pairs down one level per step
+        row_base = np.repeat(np.arange(n_rows, dtype=np.int32) * np.int32(n_nodes), n_trees)
+        node = np.tile(self.root, n_rows)
+        for _ in range(self.max_depth):
+            node = self._next[offsets[row_base + node] + node]
+
+        # 3. Sum leaf values per row
+        return self._node_value[node].reshape(n_rows, n_trees).sum(axis=1)
+
+    def _decide(self, fval):
+        if self._all_missing_none and not np.isnan(fval).any():
+            return fval <= self.threshold
+        # Mirrors LightGBM's NumericalDecision
+        is_nan = np.isnan(fval)
+        fval = np.where(is_nan & (self.missing_type != MISSING_NAN), 0.0, fval)
+        missing = ((self.missing_type == MISSING_ZERO) & (np.abs(fval) <= K_ZERO_THRESHOLD)) | \
+                  ((self.missing_type == MISSING_NAN) & is_nan)
+        return np.where(missing, self.default_left, fval <= self.threshold)
+
+
+class HybridPredictor:
+    """
+    Uses the numpy evaluator for small batches, where LightGBM's per-call
+    overhead dominates, and native LightGBM for larger ones.
+    """
+
+    def __init__(self, model, ensemble, max_numpy_rows):
+        self.model = model
+        self.ensemble = ensemble
+        self.max_numpy_rows = max_numpy_rows
+        self.n_features_in_ = ensemble.n_features_in_
+
+    def predict(self, X):
+        if X.shape[0] <= self.max_numpy_rows:
+            return self.ensemble.predict(X)
+        return self.model.predict(X)
+
+
+def make_predictor(model, backend='lightgbm', max_numpy_rows=4):
+    """
+    Wrap a trained model for serving.
+
+    Args:
+        model: A trained LGBMRegressor
+        backend: 'lightgbm' (native), 'numpy' (NumpyTreeEnsemble) or 'auto' (HybridPredictor)
+        max_numpy_rows: Largest batch 'auto' sends to the numpy evaluator
+
+    Returns:
+        An object with a predict(X) method
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    if backend == 'lightgbm':
+        return model
+    if backend == 'numpy':
+        return NumpyTreeEnsemble.from_model(model)
+    if backend == 'auto':
+        return HybridPredictor(model, NumpyTreeEnsemble.from_model(model), max_numpy_rows)
+    raise ValueError(f"Unknown predictor backend: {backend}")
+
+
+def benchmark(model, batch_sizes=(1, 32, 1024), repeats=20, seed=0):
+    """
+    Time native LightGBM against NumpyTreeEnsemble on random sparse inputs.
+
+    Args:
+        model: A trained LGBMRegressor
+        batch_sizes: Batch sizes to time
+        repeats: Timed calls per batch size (best-of is reported)
+        seed: RNG seed for the synthetic inputs
+
+    Returns:
+        list: One dict per batch size with per-call milliseconds and max abs difference
+    """
+    ensemble = NumpyTreeEnsemble.from_model(model)
+    rng = np.random.default_rng(seed)
+    results = []
+    for n in batch_sizes:
+        X = sparse.random(n, ensemble.n_features_in_, density=0.01, format='csr',
+                          random_state=rng, dtype=np.float64)
+        timings = {}
+        for name, fn in (('lightgbm', model.predict), ('numpy', ensemble.predict)):
+            fn(X)  # warm-up
+            best = float('inf')
+            for _ in range(repeats):
+                start = time.perf_counter()
+                fn(X)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best * 1000.0
+        diff = float(np.max(np.abs(model.predict(X) - ensemble.predict(X))))
+        results.append({'batch_size': n, 'lightgbm_ms': timings['lightgbm'],
+                        'numpy_ms': timings['numpy'], 'max_abs_diff': diff})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or benchmark the numpy tree predictor")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help="Convert model.pkl into flat tree tables (.npz)")
+    export.add_argument('model', nargs='?', default='model.pkl')
+    export.add_argument('output', nargs='?', default='model_trees.npz')
+    bench = sub.add_parser('benchmark', help="Compare native LightGBM and numpy latency")
+    bench.add_argument('model', nargs='?', default='model.pkl')
+    bench.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 1024])
+    bench.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    if args.command == 'export':
+        ensemble = NumpyTreeEnsemble.from_model(model)
+        ensemble.save(args.output)
+        print(f"✅ Exported {ensemble.n_trees} trees to '{args.output}'")
+    else:
+        print(f"{'batch':>6} {'lightgbm ms':>12} {'numpy ms':>10} {'max |diff|':>12}")
+        for r in benchmark(model, args.batch_sizes, args.repeats):
+            print(f"{r['batch_size']:>6} {r['lightgbm_ms']:>12.3f} {r['numpy_ms']:>10.3f} "
+                  f"{r['max_abs_diff']:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
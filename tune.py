@@ -0,0 +1,168 @@
+"""
+Parallel LightGBM hyperparameter search with Optuna.
+Features come from the feature store and the train/validation lgb.Datasets
+are built once and saved in LightGBM's binary format; each worker process
+loads them and runs trials against a shared SQLite study, so searches can be
+resumed and any number of workers can join. Trials report validation SMAPE
+every few rounds and unpromising ones are pruned early. The best parameters
+are written to tuned_params.json, which train.py picks up.
+
+Usage:
+    python tune.py --trials 200 --jobs 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import lightgbm as lgb
+import numpy as np
+import optuna
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from config import get_feature_store_dir, get_feature_store_max_bytes
+from feature_store import FeatureStore
+from training import (
+    DEFAULT_PARAMS, TUNED_PARAMS_PATH, build_datasets, dataset_cache_key, dataset_paths, smape_metric
+)
+
+# Binning is fixed by the shared Dataset; min_data_in_leaf may still vary per trial
+DATASET_PARAMS = {**DEFAULT_PARAMS, 'feature_pre_filter': False}
+
+
+def suggest_params(trial: optuna.Trial) -> dict:
+    """The search space (binning parameters are excluded: the Dataset is shared)."""
+    return {
+        'num_leaves': trial.suggest_int('num_leaves', 15, 255, log=True),
+        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.2, log=True),
+        'min_data_in_leaf': trial.suggest_int('min_data_in_leaf', 5, 200, log=True),
+        'feature_fraction': trial.suggest_float('feature_fraction', 0.3, 1.0),
+        'bagging_fraction': trial.suggest_float('bagging_fraction', 0.5, 1.0),
+        'bagging_freq': 1,
+        'lambda_l1': trial.suggest_float('lambda_l1', 1e-8, 10.0, log=True),
+        'lambda_l2': trial.suggest_float('lambda_l2', 1e-8, 10.0, log=True),
+    }
+
+
+class SmapePruningCallback:
+    """Reports validation SMAPE to the trial every period rounds and prunes when told to."""
+
+    def __init__(self, trial: optuna.Trial, period: int = 25):
+        self.trial = trial
+        self.period = period
+
+    def __call__(self, env) -> None:
+        if (env.iteration + 1) % self.period:
+            return
+        for data_name, metric, value, _ in env.evaluation_result_list:
+            if data_name == 'valid' and metric == 'smape':
+                self.trial.report(value, env.iteration + 1)
+                if self.trial.should_prune():
+                    raise optuna.TrialPruned(f"SMAPE {value:.3f} at round {env.iteration + 1}")
+
+
+def _run_worker(storage: str, study_name: str, n_trials: int, train_bin: str, valid_bin: str,
+                num_threads: int, num_boost_round: int, early_stopping_rounds: int) -> int:
+    # Each process loads the binary Datasets once and reuses them for all its trials
+    train = lgb.Dataset(train_bin, params=DATASET_PARAMS)
+    valid = lgb.Dataset(valid_bin, reference=train, params=DATASET_PARAMS)
+    study = optuna.load_study(study_name=study_name, storage=storage)
+
+    def objective(trial):
+        params = {**DATASET_PARAMS, **suggest_params(trial), 'metric': 'None',
+                  'num_threads': num_threads}
+        booster = lgb.train(params, train, num_boost_round=num_boost_round, valid_sets=[valid],
+                            valid_names=['valid'], feval=smape_metric,
+                            callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False),
+                                       SmapePruningCallback(trial)])
+        trial.set_user_attr('best_iteration', booster.best_iteration or num_boost_round)
+        return booster.best_score['valid']['smape']
+
+    study.optimize(objective, n_trials=n_trials)
+    return n_trials
+
+
+def tune(trials: int = 100, jobs: int = None, storage: str = 'sqlite:///optuna.db',
+         study_name: str = 'lightgbm-smape', num_boost_round: int = 2000,
+         early_stopping_rounds: int = 50, valid_fraction: float = 0.1,
+         output_path: str = TUNED_PARAMS_PATH, train_path: str = 'train.csv') -> dict:
+    """
+    Run a parallel study and write the best parameters for train.py.
+
+    Args:
+        trials: Total trials across all workers
+        jobs: Worker processes (default: CPU count, capped at trials)
+        storage: Optuna storage URL shared by the workers
+        study_name: Study to create or resume
+        num_boost_round: Maximum rounds per trial
+        early_stopping_rounds: Rounds without SMAPE improvement before a trial stops
+        valid_fraction: Held-out share used for SMAPE
+        output_path: Where the best parameters are written
+        train_path: Training CSV (catalog_content and price)
+
+    Returns:
+        dict: The contents written to output_path
+    """
+    # 1. Features (from the store) and the shared binary Datasets, built once
+    train_df = pd.read_csv(train_path)
+    store = FeatureStore(get_feature_store_dir(), get_feature_store_max_bytes())
+    tfidf = TfidfVectorizer(ngram_range=(1, 3), max_features=2000, stop_words='english')
+    feature_key = store.make_key(train_df['catalog_content'], tfidf)
+    X_parsed, X_tfidf, _ = store.fit_transform(train_df['catalog_content'], tfidf, key=feature_key)
+    label = np.log1p(train_df['price'].to_numpy())
+    # Keyed by the label as well, so changed prices are never tuned against stale targets
+    cache_key = dataset_cache_key(feature_key, label, DATASET_PARAMS, valid_fraction, seed=42)
+    build_datasets(X_parsed, X_tfidf, label, DATASET_PARAMS, valid_fraction,
+                   cache_dir=store.path(feature_key), cache_key=cache_key)
+    train_bin, valid_bin = dataset_paths(store.path(feature_key), cache_key)
+    del train_df, X_parsed, X_tfidf, label
+
+    # 2. One study in shared storage; workers split the trials and the cores
+    study = optuna.create_study(
+        study_name=study_name, storage=storage, direction='minimize', load_if_exists=True,
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=100))
+    cpus = os.cpu_count() or 1
+    jobs = max(1, min(trials, jobs or cpus))
+    num_threads = max(1, cpus // jobs)
+    shares = [trials // jobs + (i < trials % jobs) for i in range(jobs)]
+    # Spawned, not forked: this process already ran LightGBM's OpenMP threads
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(_run_worker, storage, study_name, n, train_bin, valid_bin, num_threads,
+                               num_boost_round, early_stopping_rounds) for n in shares]
+        for future in futures:
+            future.result()
+
+    # 3. Best trial -> config read by train.py
+    best = study.best_trial
+    result = {
+        'params': {**suggest_params(optuna.trial.FixedTrial(best.params))},
+        'num_boost_round': best.user_attrs['best_iteration'],
+        'smape': best.value,
+        'study_name': study_name,
+        'trials': len(study.trials),
+    }
+    with open(output_path, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Best SMAPE {best.value:.3f} after {len(study.trials)} trials; wrote {output_path}")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune LightGBM hyperparameters in parallel")
+    parser.add_argument('--trials', type=int, default=100)
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--storage', default='sqlite:///optuna.db')
+    parser.add_argument('--study-name', default='lightgbm-smape')
+    parser.add_argument('--num-boost-round', type=int, default=2000)
+    parser.add_argument('--early-stopping-rounds', type=int, default=50)
+    parser.add_argument('--output', default=TUNED_PARAMS_PATH)
+    parser.add_argument('--train', default='train.csv', help="Training CSV")
+    args = parser.parse_args(argv)
+    tune(args.trials, args.jobs, args.storage, args.study_name, args.num_boost_round,
+         args.early_stopping_rounds, output_path=args.output, train_path=args.train)
+
+
+if __name__ == '__main__':
+    main()